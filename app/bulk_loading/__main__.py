@@ -0,0 +1,149 @@
+"""
+Bulk loading of users and advertisements with ``COPY FROM STDIN``, generated or imported from CSV / NDJSON files:
+
+    $ python -m app.bulk_loading --users 100000 --advs 10000000 --truncate      # generate
+    $ python -m app.bulk_loading --users-file users.csv --advs-file advs.ndjson  # import
+
+Imported users have a bcrypt ``password_hash`` (loaded as is) or a plain ``password`` (hashed row by row, which is
+slow). Rows without ``id`` get ids from the sequence. All the rows are loaded in one transaction; by default the
+indexes are built and the foreign keys are checked once after loading (``--no-defer-indexes`` keeps them).
+"""
+import argparse
+import contextlib
+import pathlib
+import random
+import sys
+import time
+from typing import IO, Iterable, Optional
+
+import sqlalchemy
+
+import app.domain.errors
+import app.orm
+from app.bulk_loading import copying, sources
+from app.orm import partitioning, table_mapper
+from app.pass_hashing_and_validation import pass_hashing
+
+
+DEFAULT_PASSWORD = "load_test_password"
+FILE_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+class Progress:
+    """
+    Reports the loaded rows of every table to ``stream``, at most once per ``interval`` seconds.
+    """
+    def __init__(self, totals: dict[str, Optional[int]], interval: float = 1.0, stream: IO[str] = sys.stderr):
+        self.totals = totals
+        self.interval = interval
+        self.stream = stream
+        self.started_at = self.table_started_at = self.reported_at = time.monotonic()
+        self.table: Optional[str] = None
+
+    def __call__(self, table_name: str, loaded: int) -> None:
+        now = time.monotonic()
+        if table_name != self.table:
+            self.table, self.table_started_at = table_name, self.reported_at
+        total: Optional[int] = self.totals.get(table_name)
+        if now - self.reported_at < self.interval and loaded != total:
+            return
+        self.reported_at = now
+        share = f" ({loaded / total:.0%})" if total else ""
+        rate = loaded / max(now - self.table_started_at, 1e-9)
+        print(f"{table_name}: {loaded:,}{f'/{total:,}' if total else ''} rows{share}, {rate:,.0f} rows/s, "
+              f"{now - self.started_at:.0f} s", file=self.stream)
+
+
+def file_format(path: pathlib.Path, forced: Optional[str]) -> str:
+    if forced is not None:
+        return forced
+    if path.suffix not in FILE_FORMATS:
+        raise app.domain.errors.ValidationError(f"Unknown format of {path}, set it with --format.")
+    return FILE_FORMATS[path.suffix]
+
+
+def next_id(engine: sqlalchemy.engine.Engine, table: sqlalchemy.Table) -> int:
+    with engine.connect() as conn:
+        max_id = sqlalchemy.func.coalesce(sqlalchemy.func.max(table.c.id), 0)
+        return conn.execute(sqlalchemy.select(max_id + 1)).scalar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Loads users and advertisements with COPY.")
+    parser.add_argument("--dsn", default=app.orm.POSTGRES_DSN)
+    users = parser.add_mutually_exclusive_group()
+    users.add_argument("--users", type=int, help="number of users to generate")
+    users.add_argument("--users-file", type=pathlib.Path, help="CSV or NDJSON file of users to import")
+    advs = parser.add_mutually_exclusive_group()
+    advs.add_argument("--advs", type=int, help="number of advertisements to generate")
+    advs.add_argument("--advs-file", type=pathlib.Path, help="CSV or NDJSON file of advertisements to import")
+    parser.add_argument("--format", choices=sources.FORMATS, help="format of the files, by default by the extension")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="password of the generated users")
+    parser.add_argument("--owners", type=int,
+                        help="generated advertisements are owned by the users 1..OWNERS, by default by all the users")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated texts")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows per COPY statement")
+    parser.add_argument("--truncate", action="store_true",
+                        help="delete the rows of the loaded tables first (deleting users deletes their advertisements)")
+    parser.add_argument("--no-defer-indexes", action="store_true",
+                        help="keep the indexes and foreign keys during loading")
+    parser.add_argument("--maintenance-work-mem", help="memory for building the indexes, e.g. 1GB")
+    args = parser.parse_args()
+    if args.users is None and args.users_file is None and args.advs is None and args.advs_file is None:
+        parser.error("nothing to load, set --users / --users-file and/or --advs / --advs-file")
+
+    engine = sqlalchemy.create_engine(args.dsn)
+    loads: list[tuple[sqlalchemy.Table, Iterable[dict]]] = []
+    totals: dict[str, Optional[int]] = {}
+    with contextlib.ExitStack() as files:
+        try:
+            table_mapper.mapper.metadata.create_all(bind=engine)
+            # --truncate empties the loaded tables only: without loaded users, the existing ones own the advertisements.
+            users_truncated: bool = args.truncate and (args.users is not None or args.users_file is not None)
+            first_user_id: int = 1 if users_truncated else next_id(engine=engine, table=table_mapper.user_table)
+            if args.users is not None:
+                loads.append((table_mapper.user_table, sources.generate_users(
+                    count=args.users, password_hash=pass_hashing.hash_password(args.password), first_id=first_user_id
+                )))
+                totals[table_mapper.user_table.name] = args.users
+            elif args.users_file is not None:
+                file: IO[str] = files.enter_context(args.users_file.open(newline=""))
+                loads.append((table_mapper.user_table, sources.prepare_users(
+                    sources.read_rows(file=file, file_format=file_format(path=args.users_file, forced=args.format))
+                )))
+            if args.advs is not None:
+                owners: int = args.owners or (first_user_id + (args.users or 0) - 1)
+                if owners < 1:
+                    raise app.domain.errors.ValidationError("There are no users to own the advertisements.")
+                first_adv_id: int = 1 if args.truncate else next_id(engine=engine, table=table_mapper.adv_table)
+                with engine.begin() as conn:  # loaded into their partitions directly, not moved there afterwards
+                    partitioning.create_partitions(
+                        conn=conn, first_month=sources.adv_creation_date(first_adv_id),
+                        last_month=sources.adv_creation_date(first_adv_id + args.advs - 1)
+                    )
+                loads.append((table_mapper.adv_table, sources.generate_advs(
+                    count=args.advs, users=owners, rnd=random.Random(args.seed), first_id=first_adv_id
+                )))
+                totals[table_mapper.adv_table.name] = args.advs
+            elif args.advs_file is not None:
+                file = files.enter_context(args.advs_file.open(newline=""))
+                loads.append((table_mapper.adv_table, sources.prepare_advs(
+                    sources.read_rows(file=file, file_format=file_format(path=args.advs_file, forced=args.format))
+                )))
+            started_at = time.monotonic()
+            loaded: dict[str, int] = copying.bulk_load(
+                engine=engine, loads=loads, chunk_size=args.chunk_size, defer_indexes=not args.no_defer_indexes,
+                truncate=args.truncate, maintenance_work_mem=args.maintenance_work_mem, progress=Progress(totals)
+            )
+        except app.domain.errors.ValidationError as e:
+            sys.exit(f"Nothing is loaded: {e.message}")
+        except sqlalchemy.exc.DBAPIError as e:
+            sys.exit(f"Nothing is loaded: {e.orig}")
+        finally:
+            engine.dispose()
+    print(", ".join(f"{table_name}: {count:,} rows" for table_name, count in loaded.items())
+          + f" loaded in {time.monotonic() - started_at:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import contextlib
+import datetime
+import io
+import itertools
+from typing import Callable, Iterable, Iterator, Optional
+
+import sqlalchemy
+
+import app.domain.errors
+from app.orm import partitioning, table_mapper
+
+
+COPY_NULL = r"\N"
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def format_value(value) -> str:
+    """
+    Formats a value for the text format of ``COPY``: ``None`` is ``\\N``, and backslashes, tabs and line breaks
+    are escaped.
+    """
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def encode_chunk(rows: list[dict], columns: list[str]) -> str:
+    """
+    Encodes the rows as ``COPY`` text lines of the ``columns``. A missing value is ``NULL``.
+    """
+    valid_columns = set(columns)
+    lines: list[str] = []
+    for row in rows:
+        if unknown := row.keys() - valid_columns:
+            raise app.domain.errors.ValidationError(
+                f"Columns {sorted(unknown)} are not loaded: every row must have the columns of the first one "
+                f"({columns}) or some of them."
+            )
+        lines.append("\t".join(format_value(row.get(column)) for column in columns) + "\n")
+    return "".join(lines)
+
+
+def chunked(rows: Iterable[dict], chunk_size: int) -> Iterator[list[dict]]:
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        yield chunk
+
+
+def copy_rows(cursor, table: sqlalchemy.Table, rows: Iterable[dict], chunk_size: int,
+              progress: Optional[Callable[[str, int], None]] = None) -> int:
+    """
+    Loads the rows into ``table`` with ``COPY ... FROM STDIN``, a statement per ``chunk_size`` rows, so that
+    neither the rows nor their text are held in memory at once. The loaded columns are the columns of the table
+    present in the first row; the columns left out get their defaults (e.g. ``id`` is taken from the sequence).
+    Returns the number of loaded rows, reported to ``progress(table_name, loaded_rows)`` after every chunk.
+
+    :param cursor: DB-API cursor of ``psycopg2`` (``copy_expert()``)
+    """
+    rows = iter(rows)
+    first_row: Optional[dict] = next(rows, None)
+    if first_row is None:
+        return 0
+    columns: list[str] = [column.name for column in table.columns if column.name in first_row]
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    statement = f'COPY "{table.name}" ({column_list}) FROM STDIN'
+    loaded = 0
+    for chunk in chunked(itertools.chain((first_row,), rows), chunk_size):
+        cursor.copy_expert(statement, io.StringIO(encode_chunk(rows=chunk, columns=columns)))
+        loaded += len(chunk)
+        if progress is not None:
+            progress(table.name, loaded)
+    return loaded
+
+
+@contextlib.contextmanager
+def deferred_indexes(conn: sqlalchemy.engine.Connection, tables: Iterable[sqlalchemy.Table]) -> Iterator[None]:
+    """
+    Drops the secondary indexes of the tables (primary keys are kept) and creates them again after the block:
+    building an index once over all the rows is much faster than updating it row by row. Unique indexes are
+    checked on creation. Meant to be used in a transaction, so that an error restores the dropped indexes.
+    """
+    indexes: list[sqlalchemy.Index] = [index for table in tables for index in sorted(table.indexes, key=_index_name)]
+    for index in indexes:
+        conn.execute(sqlalchemy.text(f'DROP INDEX IF EXISTS "{index.name}"'))
+    yield
+    for index in indexes:
+        index.create(bind=conn)
+
+
+def _index_name(index: sqlalchemy.Index) -> str:
+    return index.name or ""
+
+
+@contextlib.contextmanager
+def deferred_foreign_keys(conn: sqlalchemy.engine.Connection,
+                          tables: Iterable[sqlalchemy.Table]) -> Iterator[None]:
+    """
+    Drops the foreign keys of the tables and adds them again after the block, which checks all the loaded rows
+    in one pass instead of a lookup per row. Meant to be used in a transaction, like ``deferred_indexes()``.
+    """
+    tables = list(tables)
+    inspector = sqlalchemy.inspect(conn)
+    for table in tables:
+        for foreign_key in inspector.get_foreign_keys(table.name):
+            conn.execute(sqlalchemy.text(f'ALTER TABLE "{table.name}" DROP CONSTRAINT "{foreign_key["name"]}"'))
+    yield
+    for table in tables:
+        for constraint in table.foreign_key_constraints:
+            conn.execute(sqlalchemy.schema.AddConstraint(constraint))
+
+
+def check_unique_ids(conn: sqlalchemy.engine.Connection, table: sqlalchemy.Table, shown: int = 10) -> None:
+    """
+    Raises ``ValidationError`` if some ids of the table are taken by several rows. The primary key of a partitioned
+    table includes the partition key (``adv`` is keyed by ``(id, creation_date)``), so it does not keep the loaded
+    ids from repeating each other or the ids of the existing rows. The check reads the primary key index only.
+    """
+    duplicates: list[int] = list(conn.execute(sqlalchemy.text(
+        f'SELECT id FROM "{table.name}" GROUP BY id HAVING count(*) > 1 ORDER BY id LIMIT {shown}'
+    )).scalars())
+    if duplicates:
+        raise app.domain.errors.ValidationError(
+            f"Ids of {table.name} are taken by several rows (the first of them: {duplicates})."
+        )
+
+
+def reset_sequences(conn: sqlalchemy.engine.Connection, tables: Iterable[sqlalchemy.Table]) -> None:
+    """
+    Moves the ``id`` sequences of the tables past the loaded ids, so that the rows created afterwards get new ids.
+    """
+    for table in tables:
+        conn.execute(sqlalchemy.text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+            f"(SELECT coalesce(max(id), 0) + 1 FROM \"{table.name}\"), false)"
+        ))
+
+
+def analyze(conn: sqlalchemy.engine.Connection, tables: Iterable[sqlalchemy.Table]) -> None:
+    """
+    Updates the planner statistics of the tables, which are stale after a bulk load until autovacuum gets to them.
+    """
+    for table in tables:
+        conn.execute(sqlalchemy.text(f'ANALYZE "{table.name}"'))
+
+
+def bulk_load(engine: sqlalchemy.engine.Engine, loads: list[tuple[sqlalchemy.Table, Iterable[dict]]],
+              chunk_size: int, defer_indexes: bool = True, truncate: bool = False,
+              maintenance_work_mem: Optional[str] = None,
+              progress: Optional[Callable[[str, int], None]] = None) -> dict[str, int]:
+    """
+    Loads the rows into their tables (in the order of ``loads``) in one transaction: either all of them are loaded,
+    or none. Loaded advertisements must not repeat the ids of each other or of the existing ones. Advertisements
+    of the months without a partition are moved to new partitions of their months.
+    Returns the numbers of loaded rows by table names.
+
+    :param defer_indexes: build the indexes and check the foreign keys of the tables after loading
+    :param truncate: delete the rows of the tables (and of the tables referencing them) before loading
+    :param maintenance_work_mem: memory for building the indexes, e.g. ``"1GB"``
+    """
+    tables: list[sqlalchemy.Table] = [table for table, _ in loads]
+    with engine.begin() as conn:
+        if truncate:
+            table_list = ", ".join(f'"{table.name}"' for table in tables)
+            conn.execute(sqlalchemy.text(f"TRUNCATE {table_list} CASCADE"))
+        if maintenance_work_mem is not None:
+            conn.execute(sqlalchemy.text("SELECT set_config('maintenance_work_mem', :value, true)"),
+                         {"value": maintenance_work_mem})
+        with contextlib.ExitStack() as stack:
+            if defer_indexes:
+                stack.enter_context(deferred_foreign_keys(conn=conn, tables=tables))
+                stack.enter_context(deferred_indexes(conn=conn, tables=tables))
+            cursor = conn.connection.cursor()
+            loaded: dict[str, int] = {
+                table.name: copy_rows(cursor=cursor, table=table, rows=rows, chunk_size=chunk_size, progress=progress)
+                for table, rows in loads
+            }
+            if table_mapper.adv_table in tables:
+                check_unique_ids(conn=conn, table=table_mapper.adv_table)
+                # The rows of the months without a partition went to the default one.
+                partitioning.split_default_partition(conn)
+        reset_sequences(conn=conn, tables=tables)
+        analyze(conn=conn, tables=tables)
+    return loaded
@@ -0,0 +1,130 @@
+import csv
+import datetime
+import json
+import random
+from typing import IO, Iterable, Iterator, Optional
+
+import app.domain.errors
+from app.pass_hashing_and_validation import pass_hashing
+
+
+WORDS = (
+    "bicycle", "sofa", "laptop", "guitar", "apartment", "garage", "puppy", "kitten", "tires", "camera", "piano",
+    "wardrobe", "tent", "skis", "phone", "lessons", "repair", "delivery", "vintage", "garden",
+)
+FORMATS = ("csv", "ndjson")
+# "password" is hashed on loading (slow: bcrypt takes a fraction of a second per row), "password_hash" is loaded
+# as is.
+USER_COLUMNS = ("id", "name", "email", "password", "password_hash", "creation_date")
+ADV_COLUMNS = ("id", "title", "description", "creation_date", "user_id")
+REQUIRED_USER_COLUMNS = ("name", "email")
+REQUIRED_ADV_COLUMNS = ("title", "user_id")
+BCRYPT_HASH_LENGTH = 60
+GENERATED_SINCE = datetime.datetime(2024, 1, 1)
+
+
+def user_email(user_id: int) -> str:
+    return f"load_user_{user_id}@example.com"
+
+
+def adv_owner_id(adv_id: int, users: int) -> int:
+    return (adv_id - 1) % users + 1
+
+
+def adv_creation_date(adv_id: int, started_at: datetime.datetime = GENERATED_SINCE) -> datetime.datetime:
+    return started_at + datetime.timedelta(minutes=adv_id)
+
+
+def read_csv(file: IO[str]) -> Iterator[dict]:
+    """
+    Yields the rows of a CSV file with a header line; empty values are ``None``.
+    """
+    for row in csv.DictReader(file):
+        yield {column: value if value != "" else None for column, value in row.items()}
+
+
+def read_ndjson(file: IO[str]) -> Iterator[dict]:
+    """
+    Yields the objects of a file with a JSON object per line; blank lines are skipped.
+    """
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise app.domain.errors.ValidationError(f"Line {line_number}: invalid JSON ({e.msg}).")
+        if not isinstance(row, dict):
+            raise app.domain.errors.ValidationError(f"Line {line_number}: a JSON object is expected.")
+        yield row
+
+
+def read_rows(file: IO[str], file_format: str) -> Iterator[dict]:
+    if file_format == "csv":
+        return read_csv(file)
+    return read_ndjson(file)
+
+
+def _check_columns(row: dict, row_number: int, valid_columns: tuple[str, ...],
+                   required_columns: tuple[str, ...]) -> None:
+    if unknown := [column for column in row if column not in valid_columns]:
+        raise app.domain.errors.ValidationError(
+            f"Row {row_number}: unknown columns {unknown}. Valid columns are: {list(valid_columns)}."
+        )
+    if missing := [column for column in required_columns if row.get(column) is None]:
+        raise app.domain.errors.ValidationError(f"Row {row_number}: missing values of {missing}.")
+
+
+def prepare_users(rows: Iterable[dict]) -> Iterator[dict]:
+    """
+    Checks the imported users and yields them with the columns of the ``user`` table: a ``password_hash`` (bcrypt)
+    becomes the ``password`` as is, and a plain ``password`` is hashed.
+    """
+    for row_number, row in enumerate(rows, start=1):
+        _check_columns(row=row, row_number=row_number, valid_columns=USER_COLUMNS,
+                       required_columns=REQUIRED_USER_COLUMNS)
+        row = dict(row)
+        password_hash: Optional[str] = row.pop("password_hash", None)
+        password: Optional[str] = row.pop("password", None)
+        if password_hash is not None:
+            if not password_hash.startswith("$2") or len(password_hash) != BCRYPT_HASH_LENGTH:
+                raise app.domain.errors.ValidationError(f"Row {row_number}: password_hash is not a bcrypt hash.")
+            row["password"] = password_hash
+        elif password is not None:
+            row["password"] = pass_hashing.hash_password(password)
+        else:
+            raise app.domain.errors.ValidationError(f"Row {row_number}: password or password_hash is required.")
+        yield row
+
+
+def prepare_advs(rows: Iterable[dict]) -> Iterator[dict]:
+    """
+    Checks the imported advertisements and yields them.
+    """
+    for row_number, row in enumerate(rows, start=1):
+        _check_columns(row=row, row_number=row_number, valid_columns=ADV_COLUMNS,
+                       required_columns=REQUIRED_ADV_COLUMNS)
+        yield row
+
+
+def generate_users(count: int, password_hash: str, first_id: int = 1,
+                   started_at: datetime.datetime = GENERATED_SINCE) -> Iterator[dict]:
+    """
+    Yields ``count`` users with ids from ``first_id``, emails made by ``user_email()`` and the same password
+    (hashed once by the caller).
+    """
+    for user_id in range(first_id, first_id + count):
+        yield {"id": user_id, "name": f"load_user_{user_id}", "email": user_email(user_id), "password": password_hash,
+               "creation_date": started_at + datetime.timedelta(minutes=user_id)}
+
+
+def generate_advs(count: int, users: int, rnd: random.Random, first_id: int = 1,
+                  started_at: datetime.datetime = GENERATED_SINCE) -> Iterator[dict]:
+    """
+    Yields ``count`` advertisements with ids from ``first_id``, owned by the users ``1..users``
+    (see ``adv_owner_id()``), with titles and descriptions made of ``WORDS``, created a minute after each other
+    (see ``adv_creation_date()``).
+    """
+    for adv_id in range(first_id, first_id + count):
+        yield {"id": adv_id, "title": " ".join(rnd.sample(WORDS, 2)), "description": " ".join(rnd.choices(WORDS, k=12)),
+               "user_id": adv_owner_id(adv_id, users), "creation_date": adv_creation_date(adv_id, started_at)}
@@ -30,3 +30,42 @@ class AlreadyExistsError(Exception):
     def __init__(self, message_prefix: Optional[str] = ""):
         self.base_message = "with the provided params already existsts."
         self.message = message_prefix + self.base_message
+
+
+class ConflictError(Exception):
+    def __init__(
+            self, message: Optional[str] = "The resource was modified by another request. Reload it and try again."
+    ):
+        self.message = message
+
+
+class TooManyRequestsError(Exception):
+    def __init__(self, message: Optional[str] = "Too many requests.", retry_after: Optional[int] = None):
+        self.message = message
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(Exception):
+    def __init__(self, message: Optional[str] = "The request took too long to process. Try again later."):
+        self.message = message
+
+
+class OverloadedError(Exception):
+    def __init__(self, message: Optional[str] = "The service is overloaded. Try again later.", retry_after: int = 1):
+        self.message = message
+        self.retry_after = retry_after
+
+
+class IdempotencyKeyMismatchError(Exception):
+    def __init__(self, message: Optional[str] = "The Idempotency-Key was already used for another request."):
+        self.message = message
+
+
+class RequestInProgressError(Exception):
+    def __init__(
+            self, message: Optional[str] = "A request with the same Idempotency-Key is being processed. "
+                                           "Try again later.",
+            retry_after: int = 1
+    ):
+        self.message = message
+        self.retry_after = retry_after
@@ -10,30 +10,48 @@ class Base:
 class User(Base):
     def __init__(
             self, name: str, email: str, password: str, id: Optional[int] = None,
-            creation_date: Optional[datetime] = None
+            creation_date: Optional[datetime] = None, version: int = 1
     ):
         self.id = id
         self.name = name
         self.email = email
         self.password = password
         self.creation_date = creation_date
+        self.version = version
 
 
 class Advertisement(Base):
     def __init__(
             self, title: str, description: str, user_id: int, id: Optional[int] = None,
-            creation_date: Optional[datetime] = None
+            creation_date: Optional[datetime] = None, version: int = 1
     ):
         self.id = id
         self.title = title
         self.description = description
         self.user_id = user_id
         self.creation_date = creation_date
+        self.version = version
 
     def __repr__(self):
         return f'{self.title}\n{self.description}'
 
 
+class IdempotencyRecord(Base):
+    """
+    A request made with an ``Idempotency-Key``: the hash of the request, and its response once it is completed.
+    """
+    def __init__(
+            self, key: str, request_hash: str, expires_at: datetime, status_code: Optional[int] = None,
+            response: Optional[bytes] = None, creation_date: Optional[datetime] = None
+    ):
+        self.key = key
+        self.request_hash = request_hash
+        self.expires_at = expires_at
+        self.status_code = status_code
+        self.response = response
+        self.creation_date = creation_date
+
+
 class Model(str, enum.Enum):
     USER = "user"
     ADVERTISEMENT = "advertisement"
@@ -1,4 +1,5 @@
 from app.domain.models import User, Advertisement
+from app.monitoring import timing
 
 
 def create_user(**user_data) -> User:
@@ -10,11 +11,17 @@ def create_adv(**adv_params) -> Advertisement:
 
 
 def update_instance(instance: User | Advertisement, new_attrs: dict) -> User | Advertisement:
+    changed = False
     for attr, value in new_attrs.items():
-        setattr(instance, attr, value)
+        if getattr(instance, attr, None) != value:
+            setattr(instance, attr, value)
+            changed = True
+    if changed:
+        instance.version += 1
     return instance
 
 
+@timing.timed("serialization")
 def get_params(model: User | Advertisement) -> dict[str, str | int]:
     if isinstance(model, User):
         return {
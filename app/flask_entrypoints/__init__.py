@@ -1,8 +1,129 @@
 import flask, os
 from dotenv import load_dotenv
 
+from app.flask_entrypoints.json_provider import init_json_provider
+from app.monitoring import slow_queries
+
 
 load_dotenv()
 
+from app.orm import partitioning  # noqa: E402 (reads the environment loaded above)
+
 adv = flask.Flask('adv')
-adv.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
\ No newline at end of file
+adv.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
+adv.config["JWT_COMPACT_CLAIMS"] = os.getenv("JWT_COMPACT_CLAIMS", "false").lower() == "true"
+adv.config["JWT_VERIFIED_CACHE_SIZE"] = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", 10_000))
+adv.config["JWT_VERIFIED_CACHE_MAX_TTL"] = int(os.getenv("JWT_VERIFIED_CACHE_MAX_TTL", 3600))
+adv.config["JWT_REVOCATION_STORE"] = os.getenv("JWT_REVOCATION_STORE", "shared")
+adv.config["LOGIN_THROTTLE_STORE"] = os.getenv("LOGIN_THROTTLE_STORE", "shared")
+adv.config["LOGIN_THROTTLE_WINDOW"] = int(os.getenv("LOGIN_THROTTLE_WINDOW", 60))
+adv.config["LOGIN_THROTTLE_EMAIL_LIMIT"] = int(os.getenv("LOGIN_THROTTLE_EMAIL_LIMIT", 5))
+adv.config["LOGIN_THROTTLE_IP_LIMIT"] = int(os.getenv("LOGIN_THROTTLE_IP_LIMIT", 30))
+adv.config["SEARCH_CACHE_SIZE"] = int(os.getenv("SEARCH_CACHE_SIZE", 1024))
+adv.config["SEARCH_CACHE_TTL"] = int(os.getenv("SEARCH_CACHE_TTL", 10))
+adv.config["SEARCH_CACHE_MAX_AGE"] = int(os.getenv("SEARCH_CACHE_MAX_AGE", 10))
+adv.config["CACHE_POLICIES"] = {
+    "search_advs_by_text": {
+        "Cache-Control": f'public, max-age={adv.config["SEARCH_CACHE_MAX_AGE"]}, stale-while-revalidate=30',
+        "Vary": "Accept-Encoding"
+    },
+    "get_adv_params": {"Cache-Control": "private, no-cache", "Vary": "Authorization"},
+    "get_advs_batch": {"Cache-Control": "private, no-cache", "Vary": "Authorization"},
+    "get_user_data": {"Cache-Control": "private, no-cache", "Vary": "Authorization"},
+    "get_related_advs": {"Cache-Control": "private, no-cache", "Vary": "Authorization"},
+    "export_related_advs": {"Cache-Control": "private, no-store"},
+}
+adv.config["COMPRESSION_MIN_SIZE"] = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+adv.config["COMPRESSION_GZIP_LEVEL"] = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+adv.config["COMPRESSION_BROTLI_QUALITY"] = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+adv.config["REQUEST_TIMING_ENABLED"] = os.getenv("REQUEST_TIMING_ENABLED", "false").lower() == "true"
+adv.config["SERVER_TIMING_HEADER"] = os.getenv("SERVER_TIMING_HEADER", "false").lower() == "true"
+adv.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+adv.config["QUERY_BUDGET_ENABLED"] = os.getenv("QUERY_BUDGET_ENABLED", "false").lower() == "true"
+adv.config["QUERY_BUDGET_STRICT"] = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+adv.config["QUERY_BUDGET_DEFAULT"] = int(os.getenv("QUERY_BUDGET_DEFAULT", 8))
+adv.config["QUERY_REPEAT_THRESHOLD"] = int(os.getenv("QUERY_REPEAT_THRESHOLD", 3))
+adv.config["QUERY_BUDGETS"] = {
+    "login": 2,
+    "create_user": 3,
+    "get_user_data": 3,
+    "update_user": 4,
+    "delete_user": 6,
+    "create_adv": 3,
+    "get_adv_params": 3,
+    "get_advs_batch": 2,
+    "update_adv": 4,
+    "delete_adv": 4,
+    "search_advs_by_text": 6,
+    "get_related_advs": 8,
+}
+adv.config["PROFILING_ENABLED"] = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+adv.config["PROFILING_SAMPLE_RATE"] = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+adv.config["PROFILING_TOKEN"] = os.getenv("PROFILING_TOKEN")
+adv.config["PROFILING_DIR"] = os.getenv("PROFILING_DIR", "/tmp/adv_profiles")
+adv.config["PROFILING_INTERVAL"] = float(os.getenv("PROFILING_INTERVAL", 0.005))
+adv.config["PROFILING_MAX_DURATION"] = float(os.getenv("PROFILING_MAX_DURATION", 10))
+adv.config["PROFILING_MAX_CONCURRENT"] = int(os.getenv("PROFILING_MAX_CONCURRENT", 1))
+adv.config["PROFILING_MAX_PER_MINUTE"] = int(os.getenv("PROFILING_MAX_PER_MINUTE", 6))
+adv.config["PROFILING_MAX_FILES"] = int(os.getenv("PROFILING_MAX_FILES", 1000))
+adv.config["SLOW_QUERY_THRESHOLD_MS"] = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+adv.config["SLOW_QUERY_EXPLAIN_SAMPLE_RATE"] = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.0))
+# Seconds a request may take, enforced on its database statements; searches get less time than writes.
+adv.config["REQUEST_DEADLINE_DEFAULT"] = float(os.getenv("REQUEST_DEADLINE_DEFAULT", 10))
+adv.config["REQUEST_DEADLINES"] = {
+    "search_advs_by_text": float(os.getenv("REQUEST_DEADLINE_SEARCH", 2)),
+    "get_related_advs": float(os.getenv("REQUEST_DEADLINE_SEARCH", 2)),
+    "get_adv_params": 3.0,
+    "get_advs_batch": 3.0,
+    "get_user_data": 3.0,
+    "login": 5.0,
+    "export_related_advs": float(os.getenv("REQUEST_DEADLINE_EXPORT", 600)),
+}
+# The deadlines are capped by REQUEST_DEADLINE_MAX, which gunicorn.conf.py sets below the timeout of sync workers:
+# a sync worker is killed when its request takes longer. Long exports need a threaded worker (GUNICORN_THREADS > 1).
+adv.config["REQUEST_DEADLINE_MAX"] = float(os.getenv("REQUEST_DEADLINE_MAX", "inf"))
+# Concurrent requests of a worker process; the limits only bind with threaded workers (GUNICORN_THREADS > 1).
+adv.config["ADMISSION_ENABLED"] = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+adv.config["ADMISSION_DEFAULT_LIMIT"] = int(os.getenv("ADMISSION_DEFAULT_LIMIT", 16))
+adv.config["ADMISSION_ROUTE_LIMITS"] = {
+    "login": int(os.getenv("ADMISSION_LOGIN_LIMIT", 2)),
+    "search_advs_by_text": int(os.getenv("ADMISSION_SEARCH_LIMIT", 4)),
+    "export_related_advs": int(os.getenv("ADMISSION_EXPORT_LIMIT", 2)),
+}
+adv.config["ADMISSION_MAX_IN_FLIGHT"] = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 32))
+adv.config["ADMISSION_LOW_PRIORITY_SHARE"] = float(os.getenv("ADMISSION_LOW_PRIORITY_SHARE", 0.75))
+adv.config["ADMISSION_QUEUE_TIME_LOW"] = float(os.getenv("ADMISSION_QUEUE_TIME_LOW", 0.1))
+adv.config["ADMISSION_QUEUE_TIME_NORMAL"] = float(os.getenv("ADMISSION_QUEUE_TIME_NORMAL", 0.5))
+adv.config["ADMISSION_QUEUE_TIME_HIGH"] = float(os.getenv("ADMISSION_QUEUE_TIME_HIGH", 1.0))
+adv.config["ADMISSION_EXEMPT"] = ("get_metrics",)
+adv.config["BATCH_MAX_IDS"] = int(os.getenv("BATCH_MAX_IDS", 100))
+adv.config["BATCH_MAX_OPERATIONS"] = int(os.getenv("BATCH_MAX_OPERATIONS", 20))
+adv.config["EXPORT_BATCH_SIZE"] = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+adv.config["EXPORT_CHUNK_SIZE"] = int(os.getenv("EXPORT_CHUNK_SIZE", 65536))
+# Exports of more rows than the deadline of the request allows at this rate are rejected before they start.
+adv.config["EXPORT_ROWS_PER_SECOND"] = int(os.getenv("EXPORT_ROWS_PER_SECOND", 20000))
+adv.config["IDEMPOTENCY_ENABLED"] = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+adv.config["IDEMPOTENCY_KEY_TTL"] = int(os.getenv("IDEMPOTENCY_KEY_TTL", 86400))
+adv.config["IDEMPOTENCY_LOCK_TIMEOUT"] = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+adv.config["IDEMPOTENCY_SWEEP_INTERVAL"] = int(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", 60))
+adv.config["IDEMPOTENCY_SWEEP_BATCH_SIZE"] = int(os.getenv("IDEMPOTENCY_SWEEP_BATCH_SIZE", 1000))
+adv.config["IDEMPOTENCY_SWEEP_MAX_BATCHES"] = int(os.getenv("IDEMPOTENCY_SWEEP_MAX_BATCHES", 10))
+# Statements added to the query budget of a request with an Idempotency-Key: claiming the key and storing the response.
+adv.config["IDEMPOTENCY_QUERY_BUDGET"] = 4
+# The partitions of the advertisements are created ADV_PARTITION_MONTHS_AHEAD months ahead, as read by
+# app.orm.partitioning (also used by its maintenance CLI).
+adv.config["ADV_PARTITION_MAINTENANCE_ENABLED"] = \
+    os.getenv("ADV_PARTITION_MAINTENANCE_ENABLED", "true").lower() == "true"
+adv.config["ADV_PARTITION_MONTHS_AHEAD"] = partitioning.MONTHS_AHEAD
+adv.config["ADV_PARTITION_CHECK_INTERVAL"] = int(os.getenv("ADV_PARTITION_CHECK_INTERVAL", 3600))
+adv.config["ADV_PARTITION_LOCK_TIMEOUT_MS"] = int(os.getenv("ADV_PARTITION_LOCK_TIMEOUT_MS", 200))
+# One statement per operation, plus loading the advertisements to update or delete.
+adv.config["QUERY_BUDGETS"]["run_batch"] = adv.config["BATCH_MAX_OPERATIONS"] + 1
+
+init_json_provider(adv)
+slow_queries.configure(adv.config)
+
+# Registers the request hooks first, so that they run last.
+from app.flask_entrypoints import (  # noqa: E402
+    request_timing, metrics, admission, query_budget, profiling, deadlines, partitions
+)
@@ -0,0 +1,78 @@
+import time
+from typing import Optional
+
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+
+from app.flask_entrypoints import adv
+from app.service_layer.admission import AdmissionController, Priority
+
+
+admission_controller = AdmissionController(
+    route_limits=adv.config["ADMISSION_ROUTE_LIMITS"],
+    default_limit=adv.config["ADMISSION_DEFAULT_LIMIT"],
+    max_in_flight=adv.config["ADMISSION_MAX_IN_FLIGHT"],
+    low_priority_share=adv.config["ADMISSION_LOW_PRIORITY_SHARE"],
+    max_queue_times={
+        Priority.LOW: adv.config["ADMISSION_QUEUE_TIME_LOW"],
+        Priority.NORMAL: adv.config["ADMISSION_QUEUE_TIME_NORMAL"],
+        Priority.HIGH: adv.config["ADMISSION_QUEUE_TIME_HIGH"],
+    },
+)
+
+
+def has_verified_token() -> bool:
+    """
+    Checks the access token of the request, if any; the claims of a token verified before are taken from the cache
+    of verified tokens (see ``CachingJWTManager``), so the check does not verify the signature again.
+    """
+    try:
+        return verify_jwt_in_request(optional=True) is not None
+    except (JWTExtendedException, PyJWTError):  # invalid, expired or revoked token
+        return False
+
+
+def get_priority() -> Priority:
+    """
+    Requests with a valid access token get a higher priority, modifying ones the highest; requests without one,
+    or with a token that does not verify, get the lowest.
+    """
+    if "Authorization" not in request.headers or not has_verified_token():
+        return Priority.LOW
+    if request.method in ("POST", "PATCH", "PUT", "DELETE"):
+        return Priority.HIGH
+    return Priority.NORMAL
+
+
+def get_upstream_queue_time() -> float:
+    """
+    Returns the seconds the request has waited before reaching the app, according to the ``X-Request-Start``
+    header set by a reverse proxy (``t=<seconds>``, milliseconds or microseconds since the epoch), or 0.
+    """
+    header: Optional[str] = request.headers.get("X-Request-Start")
+    if not header:
+        return 0.0
+    try:
+        started_at = float(header.removeprefix("t="))
+    except ValueError:
+        return 0.0
+    while started_at > 1e11:  # milliseconds or microseconds
+        started_at /= 1000
+    return max(0.0, time.time() - started_at)
+
+
+@adv.before_request
+def admit_request():
+    if not adv.config["ADMISSION_ENABLED"] or request.endpoint in (None, *adv.config["ADMISSION_EXEMPT"]):
+        return
+    admission_controller.admit(route=request.endpoint, priority=get_priority(), queued_for=get_upstream_queue_time())
+    g.admitted_route = request.endpoint
+
+
+@adv.teardown_request
+def release_request(exc: Optional[BaseException]):
+    route: Optional[str] = g.pop("admitted_route", None)
+    if route is not None:
+        admission_controller.release(route)
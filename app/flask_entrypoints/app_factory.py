@@ -0,0 +1,18 @@
+import flask
+
+import app.orm.table_mapper
+from app.flask_entrypoints import adv
+
+
+def create_app() -> flask.Flask:
+    """
+    Maps the domain models to the tables and registers the views, error handlers and request hooks of the app.
+    Safe to call more than once. A pre-fork server should call it once in the master process (``preload_app``),
+    so that the workers inherit the initialized app; the engine is initialized per worker (``app.orm.init_engine``).
+
+    :return: Flask app
+    :rtype: flask.Flask
+    """
+    app.orm.table_mapper.start_mapping()
+    from app.flask_entrypoints import views  # noqa: F401 (registers the views on import)
+    return adv
@@ -1,12 +1,242 @@
-from typing import Any
-from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity
+import hashlib
+import math
+import multiprocessing
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import jwt as pyjwt
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, get_jwt
+from flask_jwt_extended.config import config
 
 import app.domain.errors
 from app.flask_entrypoints import adv
+from app.flask_entrypoints.caching import TTLLRUCache, BloomFilter
 from app.domain.models import UserColumns
+from app.service_layer import throttling
+
+
+class RevokedTokens:
+    """
+    Identifiers (``jti``) of revoked tokens, kept until the tokens expire. Lookups go to a Bloom filter first,
+    so a token that was never revoked is accepted without touching the store. The store is kept in the memory
+    of the current process: suitable for a single worker and for tests, as the other workers do not see
+    the revocations.
+    """
+    def __init__(self, bloom_filter_size_bits: int = 1 << 20):
+        self._bloom_filter = BloomFilter(size_bits=bloom_filter_size_bits)
+        self._store: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._purge_expired()
+            self._store[jti] = expires_at
+            self._bloom_filter.add(jti)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None or jti not in self._bloom_filter:
+            return False
+        return self._store.get(jti, 0) > time.time()
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        expired = [jti for jti, expires_at in self._store.items() if expires_at <= now]
+        if not expired:
+            return
+        for jti in expired:
+            del self._store[jti]
+        self._bloom_filter.clear()
+        for jti in self._store:
+            self._bloom_filter.add(jti)
+
+
+class SharedRevokedTokens:
+    """
+    Identifiers (``jti``) of revoked tokens, kept until the tokens expire in an anonymous shared memory block,
+    so that a token revoked by one worker is rejected by all of them. The block and its lock must be created
+    in the master process before the workers are forked (e.g. with ``gunicorn --preload``).
+
+    The identifiers are kept as 64-bit fingerprints with their expiry times in a table of ``slots`` slots, an
+    identifier taking one of the ``probes`` slots following its hash. Lookups go to a Bloom filter in shared
+    memory first, so a token that was never revoked is accepted without taking the lock. The filter is rebuilt from
+    the table when revoked tokens expire; of the two filters, the lookups use the one which is not being rebuilt.
+    """
+    _fields = 2  # fingerprint, expiry time
+
+    def __init__(self, slots: int = 65_536, probes: int = 16, bloom_filter_size_bits: int = 1 << 20):
+        self.slots = slots
+        self.probes = probes
+        self._table = multiprocessing.RawArray("q", slots * self._fields)
+        self._bloom_filters = [
+            BloomFilter(
+                size_bits=bloom_filter_size_bits,
+                bits=multiprocessing.RawArray("B", (bloom_filter_size_bits + 7) // 8)
+            ) for _ in range(2)
+        ]
+        self._active_filter = multiprocessing.RawValue("i", 0)
+        self._next_purge_at = multiprocessing.RawValue("d", math.inf)
+        self._lock = multiprocessing.Lock()
+
+    @staticmethod
+    def _fingerprint(jti: str) -> int:
+        return int.from_bytes(hashlib.blake2b(jti.encode(), digest_size=8).digest(), "big", signed=True)
+
+    def _offsets(self, fingerprint: int) -> list[int]:
+        first_slot = fingerprint % self.slots
+        return [(first_slot + probe) % self.slots * self._fields for probe in range(self.probes)]
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        """
+        Raises ``OverloadedError`` if all the slots the token may take are held by other unexpired tokens.
+        """
+        fingerprint = self._fingerprint(jti)
+        table = self._table
+        with self._lock:
+            now = time.time()
+            if now >= self._next_purge_at.value:
+                self._purge_expired(now=now)
+            offset: Optional[int] = next(
+                (offset for offset in self._offsets(fingerprint)
+                 if table[offset] == fingerprint or table[offset + 1] <= now),
+                None
+            )
+            if offset is None:
+                raise app.domain.errors.OverloadedError(message="Too many tokens are revoked. Try again later.")
+            if table[offset] != fingerprint:
+                table[offset], table[offset + 1] = fingerprint, 0
+            table[offset + 1] = max(table[offset + 1], math.ceil(expires_at))
+            self._bloom_filters[self._active_filter.value].add(str(fingerprint))
+            self._next_purge_at.value = min(self._next_purge_at.value, math.ceil(expires_at))
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None:
+            return False
+        fingerprint = self._fingerprint(jti)
+        if str(fingerprint) not in self._bloom_filters[self._active_filter.value]:
+            return False
+        now = time.time()
+        table = self._table
+        with self._lock:
+            return any(
+                table[offset] == fingerprint and table[offset + 1] > now for offset in self._offsets(fingerprint)
+            )
+
+    def _purge_expired(self, now: float) -> None:
+        table = self._table
+        rebuilt_filter = self._bloom_filters[1 - self._active_filter.value]
+        rebuilt_filter.clear()
+        next_purge_at = math.inf
+        for offset in range(0, len(table), self._fields):
+            if table[offset + 1] > now:
+                rebuilt_filter.add(str(table[offset]))
+                next_purge_at = min(next_purge_at, table[offset + 1])
+        self._active_filter.value = 1 - self._active_filter.value
+        self._next_purge_at.value = next_purge_at
+
+
+class CachingJWTManager(JWTManager):
+    """
+    ``JWTManager``, which keeps the claims of verified tokens in a bounded LRU cache until the tokens expire,
+    so that a token reused for many requests is verified once. With ``JWT_COMPACT_CLAIMS`` access tokens
+    are encoded without the claims ``flask_jwt_extended`` restores by default on decoding ("type", "fresh");
+    the configured "nbf", "aud", "iss" and "csrf" (for tokens in cookies) claims are kept.
+    """
+    def __init__(self, app=None, cache_size: int = 10_000):
+        self.verified_tokens = TTLLRUCache(max_size=cache_size)
+        super().__init__(app=app)
+
+    def _decode_jwt_from_config(self, encoded_token: str, csrf_value=None, allow_expired: bool = False) -> dict:
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        token_digest: bytes = hashlib.sha256(encoded_token.encode()).digest()
+        claims: Optional[dict] = self.verified_tokens.get(token_digest)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+            expires_at = claims.get("exp", time.time() + adv.config["JWT_VERIFIED_CACHE_MAX_TTL"])
+            self.verified_tokens.set(token_digest, claims, expires_at=expires_at)
+        return dict(claims)
+
+    def _encode_jwt_from_config(self, identity: Any, token_type: str, claims=None, fresh=False, expires_delta=None,
+                                headers=None) -> str:
+        if not adv.config["JWT_COMPACT_CLAIMS"] or token_type != "access" or fresh:
+            return super()._encode_jwt_from_config(identity, token_type, claims, fresh, expires_delta, headers)
+        header_overrides = self._jwt_additional_header_callback(identity)
+        if headers is not None:
+            header_overrides.update(headers)
+        now = datetime.now(timezone.utc)
+        token_data = {
+            config.identity_claim_key: self._user_identity_callback(identity), "iat": now,
+            "jti": secrets.token_urlsafe(12)
+        }
+        if config.encode_nbf:
+            token_data["nbf"] = now
+        if config.jwt_in_cookies and config.cookie_csrf_protect:
+            token_data["csrf"] = secrets.token_urlsafe(12)
+        if config.encode_audience:
+            token_data["aud"] = config.encode_audience
+        if config.encode_issuer:
+            token_data["iss"] = config.encode_issuer
+        if expires_delta is None:
+            expires_delta = config.access_expires
+        if expires_delta:
+            token_data["exp"] = now + expires_delta
+        token_data.update(self._user_claims_callback(identity))
+        if claims is not None:
+            token_data.update(claims)
+        return pyjwt.encode(
+            token_data, self._encode_key_callback(identity), config.algorithm, json_encoder=config.json_encoder,
+            headers=header_overrides
+        )
+
+
+jwt = CachingJWTManager(app=adv, cache_size=adv.config["JWT_VERIFIED_CACHE_SIZE"])
+
+
+def create_revoked_tokens() -> RevokedTokens | SharedRevokedTokens:
+    """
+    Creates the store of revoked tokens configured by ``JWT_REVOCATION_STORE``. The "shared" store keeps them
+    in shared memory, so it must be created before the server forks its workers to be shared by them.
+
+    :return: store of revoked tokens
+    :rtype: RevokedTokens | SharedRevokedTokens
+    """
+    if adv.config["JWT_REVOCATION_STORE"] == "shared":
+        return SharedRevokedTokens()
+    return RevokedTokens()
+
+
+revoked_tokens = create_revoked_tokens()
 
 
-jwt = JWTManager(app=adv)
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header: dict, jwt_payload: dict) -> bool:
+    return revoked_tokens.is_revoked(jwt_payload.get("jti"))
+
+
+def create_login_throttle() -> throttling.LoginThrottle:
+    """
+    Creates the login throttle configured by ``LOGIN_THROTTLE_*`` settings. The "shared" store keeps counters in
+    shared memory, so the throttle must be created before the server forks its workers to be shared by them.
+
+    :return: login throttle
+    :rtype: throttling.LoginThrottle
+    """
+    if adv.config["LOGIN_THROTTLE_STORE"] == "shared":
+        store = throttling.SharedMemoryThrottleStore()
+    else:
+        store = throttling.LocalThrottleStore()
+    return throttling.LoginThrottle(
+        store=store,
+        email_limit=adv.config["LOGIN_THROTTLE_EMAIL_LIMIT"],
+        ip_limit=adv.config["LOGIN_THROTTLE_IP_LIMIT"],
+        window=adv.config["LOGIN_THROTTLE_WINDOW"]
+    )
+
+
+login_throttle = create_login_throttle()
 
 
 def get_access_token(identity: UserColumns) -> str:
@@ -31,6 +261,15 @@ def get_authenticated_user_identity() -> Any:
     return get_jwt_identity()
 
 
+def revoke_current_token() -> None:
+    """
+    Revokes the access token of the current request until it expires.
+    """
+    claims: dict = get_jwt()
+    expires_at = claims.get("exp", time.time() + adv.config["JWT_VERIFIED_CACHE_MAX_TTL"])
+    revoked_tokens.revoke(jti=claims["jti"], expires_at=expires_at)
+
+
 def check_current_user(user_id: int | None = None, get_cuid: bool = True) -> int | None:
     current_user_id: int = get_jwt_identity()
     if user_id is None or user_id == current_user_id:
@@ -0,0 +1,187 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Optional
+
+from flask import Response, current_app, make_response, request
+
+from app.flask_entrypoints import adv, compression
+
+
+class TTLLRUCache:
+    """
+    Thread-safe LRU cache with a bounded number of entries, each of which is valid until its own expiry time.
+    """
+    def __init__(self, max_size: int, default_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        if expires_at is None and self.default_ttl is not None:
+            expires_at = time.time() + self.default_ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BloomFilter:
+    """
+    Probabilistic set: ``in`` never gives false negatives and gives false positives with a probability
+    determined by ``size_bits`` and ``hash_count``.
+    """
+    def __init__(self, size_bits: int = 1 << 20, hash_count: int = 7, bits=None):
+        """
+        ``bits`` is a buffer of ``size_bits`` bits to keep the filter in, e.g. a ``multiprocessing.RawArray``
+        shared by processes; by default the filter has its own one.
+        """
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self._bits = bits if bits is not None else bytearray((size_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return ((first + i * second) % self.size_bits for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def clear(self) -> None:
+        self._bits[:] = bytes(len(self._bits))
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    status: int
+    mimetype: str
+    headers: dict[str, str] = field(default_factory=dict)
+    encoded_bodies: dict[str, bytes] = field(default_factory=dict)
+
+
+class ResponseCache:
+    """
+    Cache of already encoded response bodies of a read endpoint, keyed by the request path and query string.
+    Only successful responses are cached. The cache is local to a worker process, so writes affecting cached
+    data must call ``clear()``, and other workers see them after ``ttl`` seconds at the latest.
+
+    Compressed variants of a cached body are cached along with it, so each variant is compressed once.
+    """
+    cached_headers = ("Cache-Control", "ETag", "Vary")
+
+    def __init__(self, max_size: int, ttl: float):
+        self._entries = TTLLRUCache(max_size=max_size, default_ttl=ttl)
+
+    def cached(self, view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key: str = request.full_path
+            cached_response: Optional[CachedResponse] = self._entries.get(key)
+            if cached_response is None:
+                response: Response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                cached_response = CachedResponse(
+                    body=response.get_data(), status=200, mimetype=response.mimetype,
+                    headers={name: value for name, value in response.headers.items() if name in self.cached_headers}
+                )
+                self._entries.set(key, cached_response)
+            response = current_app.response_class(
+                cached_response.body, status=cached_response.status, mimetype=cached_response.mimetype,
+                headers=cached_response.headers
+            )
+            return compression.compress_response(response, encoded_bodies=cached_response.encoded_bodies)
+        return wrapper
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def make_etag(resource: str, resource_id: int, version: int) -> str:
+    """
+    Returns a strong entity tag of a resource version (unquoted, as ``Response.set_etag()`` expects).
+    """
+    return f"{resource}-{resource_id}-v{version}"
+
+
+def get_matching_etag(etag: str) -> Optional[str]:
+    """
+    Returns the entity tag from ``If-None-Match`` matching ``etag`` or its compressed variant, if any.
+    """
+    for candidate in (etag, *(f"{etag}-{encoding}" for encoding in compression.supported_encodings())):
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def get_if_match_version(resource: str, resource_id: int) -> Optional[int]:
+    """
+    Returns the version of the resource from the ``If-Match`` entity tag made by ``make_etag()`` (or of its
+    compressed variant), ``None`` if the header is absent or is "*", and ``0``, which matches no version,
+    if the header has no tag of the resource.
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    prefix: str = f"{resource}-{resource_id}-v"
+    for etag in request.if_match.as_set():
+        version: str = etag[len(prefix):].split("-", 1)[0] if etag.startswith(prefix) else ""
+        if version.isdigit():
+            return int(version)
+    return 0
+
+
+def not_modified_response(etag: str) -> Response:
+    response: Response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+@adv.after_request
+def apply_cache_policy(response: Response) -> Response:
+    """
+    Sets the headers of the cache policy configured for the endpoint (``CACHE_POLICIES``) on successful and
+    "Not Modified" responses, unless the view has set them itself.
+    """
+    cache_policy: Optional[dict[str, str]] = adv.config["CACHE_POLICIES"].get(request.endpoint)
+    if cache_policy is None or response.status_code not in (200, 304):
+        return response
+    if "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = cache_policy["Cache-Control"]
+    for header in cache_policy.get("Vary", "").split(","):
+        if header.strip():
+            response.vary.add(header.strip())
+    return response
@@ -0,0 +1,76 @@
+import gzip
+from typing import Optional
+
+from flask import Response, request
+
+from app.flask_entrypoints import adv
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html"}
+
+
+def supported_encodings() -> list[str]:
+    if brotli is not None:
+        return ["br", "gzip"]
+    return ["gzip"]
+
+
+def negotiate_encoding() -> Optional[str]:
+    """
+    Returns the best content coding supported by both the server and the client (``Accept-Encoding``).
+    """
+    return request.accept_encodings.best_match(supported_encodings())
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=adv.config["COMPRESSION_BROTLI_QUALITY"])
+    return gzip.compress(body, compresslevel=adv.config["COMPRESSION_GZIP_LEVEL"], mtime=0)
+
+
+def is_compressible(response: Response) -> bool:
+    return (
+        response.status_code == 200 and
+        not response.direct_passthrough and
+        not response.is_streamed and
+        "Content-Encoding" not in response.headers and
+        response.mimetype in COMPRESSIBLE_MIMETYPES and
+        response.content_length is not None and
+        response.content_length >= adv.config["COMPRESSION_MIN_SIZE"]
+    )
+
+
+def compress_response(response: Response, encoded_bodies: Optional[dict[str, bytes]] = None) -> Response:
+    """
+    Compresses the response body with the content coding negotiated with the client. If ``encoded_bodies`` is
+    passed (e.g. by a response cache), an already compressed body is taken from it or stored in it.
+
+    A strong ETag gets the content coding as a suffix, as the compressed body is a different representation.
+    """
+    if not is_compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding: Optional[str] = negotiate_encoding()
+    if encoding is None:
+        return response
+    encoded_body: Optional[bytes] = encoded_bodies.get(encoding) if encoded_bodies is not None else None
+    if encoded_body is None:
+        encoded_body = compress(body=response.get_data(), encoding=encoding)
+        if encoded_bodies is not None:
+            encoded_bodies[encoding] = encoded_body
+    response.set_data(encoded_body)
+    response.headers["Content-Encoding"] = encoding
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+@adv.after_request
+def compress_after_request(response: Response) -> Response:
+    return compress_response(response)
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from flask import g, request
+
+from app.flask_entrypoints import adv
+from app.service_layer import deadlines
+
+
+@adv.before_request
+def set_request_deadline():
+    timeout: Optional[float] = adv.config["REQUEST_DEADLINES"].get(
+        request.endpoint, adv.config["REQUEST_DEADLINE_DEFAULT"]
+    )
+    if timeout:
+        timeout = min(timeout, adv.config["REQUEST_DEADLINE_MAX"])
+        g.request_deadline_token = deadlines.set_deadline(timeout=timeout)
+
+
+@adv.teardown_request
+def reset_request_deadline(exc: Optional[BaseException]):
+    token = g.pop("request_deadline_token", None)
+    if token is not None:
+        deadlines.reset_deadline(token)
@@ -1,16 +1,34 @@
+from typing import Optional
+
 from flask import jsonify
 
+import app.domain.errors
 from app.flask_entrypoints import adv
 
 
 class HttpError(Exception):
-    def __init__(self, status_code: int, description: str | list | set):
+    def __init__(self, status_code: int, description: str | list | set, headers: Optional[dict[str, str]] = None):
         self.status_code = status_code
         self.description = description
+        self.headers = headers
 
 
 @adv.errorhandler(HttpError)
 def error_handler(error):
     response = jsonify({"errors": error.description})
     response.status_code = error.status_code
+    if error.headers:
+        response.headers.update(error.headers)
     return response
+
+
+@adv.errorhandler(app.domain.errors.DeadlineExceededError)
+def deadline_exceeded_handler(error):
+    return error_handler(HttpError(status_code=504, description=error.message))
+
+
+@adv.errorhandler(app.domain.errors.OverloadedError)
+def overloaded_handler(error):
+    return error_handler(
+        HttpError(status_code=503, description=error.message, headers={"Retry-After": str(error.retry_after)})
+    )
@@ -0,0 +1,48 @@
+import csv
+import io
+from typing import Iterable, Iterator
+
+from app.flask_entrypoints import adv
+
+
+EXPORT_MIMETYPES: dict[str, str] = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def encode_ndjson(rows: Iterable[dict], chunk_size: int) -> Iterator[bytes]:
+    """
+    Encodes the rows as JSON lines, yielding chunks of about ``chunk_size`` bytes as the rows come.
+    """
+    chunk: list[bytes] = []
+    size = 0
+    for row in rows:
+        line: bytes = adv.json.dumps(row).encode() + b"\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def encode_csv(rows: Iterable[dict], columns: list[str], chunk_size: int) -> Iterator[bytes]:
+    """
+    Encodes the rows as CSV with a header line, yielding chunks of about ``chunk_size`` bytes as the rows come.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode(rows: Iterable[dict], export_format: str, columns: list[str], chunk_size: int) -> Iterator[bytes]:
+    if export_format == "csv":
+        return encode_csv(rows=rows, columns=columns, chunk_size=chunk_size)
+    return encode_ndjson(rows=rows, chunk_size=chunk_size)
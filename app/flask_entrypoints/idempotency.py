@@ -0,0 +1,125 @@
+import functools
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from flask import Response, current_app, g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+import app.domain.errors
+from app.domain import models
+from app.flask_entrypoints import adv
+from app.flask_entrypoints.error_handlers import HttpError
+from app.flask_entrypoints.request_uow import get_request_uow
+from app.service_layer import idempotency
+from app.service_layer.unit_of_work import UnitOfWork
+
+
+MAX_KEY_LENGTH = 255
+
+logger = logging.getLogger("adv.idempotency")
+_sweep_lock = threading.Lock()
+_next_sweep_at: float = 0.0
+
+
+def get_identity() -> Any:
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # the view does not require an access token
+        return None
+
+
+def release_key(key: str) -> None:
+    """
+    Releases the key of a failed request. If it cannot be released (e.g. the deadline of the request is exceeded),
+    it is released by ``IDEMPOTENCY_LOCK_TIMEOUT``.
+    """
+    try:
+        idempotency.release_key(key=key, uow=get_request_uow())
+    except Exception:
+        logger.exception("Releasing the idempotency key %s failed.", key)
+
+
+def sweep_if_due() -> None:
+    """
+    Deletes the expired idempotency keys, at most once per ``IDEMPOTENCY_SWEEP_INTERVAL`` seconds in a process.
+    """
+    global _next_sweep_at
+    if time.monotonic() < _next_sweep_at or not _sweep_lock.acquire(blocking=False):
+        return
+    try:
+        _next_sweep_at = time.monotonic() + adv.config["IDEMPOTENCY_SWEEP_INTERVAL"]
+        deleted: int = idempotency.sweep_expired(
+            uow=UnitOfWork(), batch_size=adv.config["IDEMPOTENCY_SWEEP_BATCH_SIZE"],
+            max_batches=adv.config["IDEMPOTENCY_SWEEP_MAX_BATCHES"]
+        )
+        logger.debug("%s expired idempotency keys are deleted.", deleted)
+    except Exception:
+        logger.exception("Sweeping the expired idempotency keys failed.")
+    finally:
+        _sweep_lock.release()
+
+
+def idempotent(view: Callable) -> Callable:
+    """
+    Makes a view safe to retry with the ``Idempotency-Key`` header: the first request with a key runs the view and
+    stores its response, and the retries with the key get the stored response (``Idempotent-Replayed: true``)
+    without running the view again. Keys are scoped by the endpoint and the authenticated user (the client address
+    for anonymous requests).
+
+    A response with a server error status, or an error raised by the view, releases the key for a retry.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key_header: Optional[str] = request.headers.get("Idempotency-Key")
+        if key_header is None or not adv.config["IDEMPOTENCY_ENABLED"]:
+            return view(*args, **kwargs)
+        if not 0 < len(key_header) <= MAX_KEY_LENGTH:
+            raise HttpError(
+                status_code=400, description=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters long."
+            )
+        g.query_budget_extra = g.get("query_budget_extra", 0) + adv.config["IDEMPOTENCY_QUERY_BUDGET"]
+        identity: Any = get_identity()
+        # Anonymous requests (e.g. signing up) are scoped by the client address instead of the user.
+        scope: str = f"user {identity}" if identity is not None else f"ip {request.remote_addr}"
+        key = f"{request.endpoint}:{scope}:{key_header}"
+        uow: UnitOfWork = get_request_uow()
+        try:
+            record: Optional[models.IdempotencyRecord] = idempotency.claim_key(
+                key=key, request_hash=idempotency.request_fingerprint(
+                    method=request.method, path=request.path, body=request.get_data()
+                ),
+                lock_timeout=adv.config["IDEMPOTENCY_LOCK_TIMEOUT"], uow=uow
+            )
+        except app.domain.errors.IdempotencyKeyMismatchError as e:
+            raise HttpError(status_code=422, description=e.message)
+        except app.domain.errors.RequestInProgressError as e:
+            raise HttpError(status_code=409, description=e.message, headers={"Retry-After": str(e.retry_after)})
+        if record is not None:
+            response: Response = current_app.response_class(
+                record.response, status=record.status_code, mimetype="application/json"
+            )
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+        try:
+            # The changes of the view are only flushed in the savepoint, and committed by save_response() in one
+            # transaction with the response, so that a retry never finds the changes without the response.
+            with uow.savepoint():
+                response = make_response(view(*args, **kwargs))
+                if response.status_code >= 500:
+                    uow.rollback()
+            if response.status_code >= 500 or response.is_streamed:
+                release_key(key=key)
+            else:
+                idempotency.save_response(
+                    key=key, status_code=response.status_code, response=response.get_data(),
+                    ttl=adv.config["IDEMPOTENCY_KEY_TTL"], uow=uow
+                )
+        except BaseException:
+            release_key(key=key)
+            raise
+        # Runs after the response is sent, outside of the request deadline and query budget.
+        response.call_on_close(sweep_if_due)
+        return response
+    return wrapper
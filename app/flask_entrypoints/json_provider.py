@@ -0,0 +1,48 @@
+from typing import Any
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+
+from app.monitoring import timing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by ``orjson``, which serializes ``datetime`` / ``date`` / ``UUID`` / dataclasses natively
+    and produces ``bytes``, so responses are built without an intermediate ``str``. Calls with stdlib-specific
+    keyword arguments (e.g. ``indent``) fall back to the default provider.
+    """
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def dumpb(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=self.default)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        with timing.span("json"):
+            body: bytes = self.dumpb(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app: Flask) -> None:
+    """
+    Sets ``OrjsonProvider`` as the JSON provider of the app if ``orjson`` is installed. Otherwise the app keeps
+    Flask's default provider.
+    """
+    if orjson is None:
+        return
+    app.json_provider_class = OrjsonProvider
+    app.json = OrjsonProvider(app)
@@ -0,0 +1,41 @@
+import hmac
+import time
+from typing import Optional
+
+from flask import Response, g, request
+
+from app.flask_entrypoints import adv
+from app.flask_entrypoints.error_handlers import HttpError
+from app.monitoring import metrics
+
+
+@adv.before_request
+def start_request_metrics():
+    g.request_started_at = time.perf_counter()
+
+
+@adv.after_request
+def record_request_metrics(response: Response) -> Response:
+    started_at = g.pop("request_started_at", None)
+    if started_at is not None and request.endpoint != "get_metrics":
+        metrics.observe_request(
+            endpoint=request.endpoint, method=request.method, status=response.status_code,
+            duration=time.perf_counter() - started_at
+        )
+    return response
+
+
+@adv.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Exports the metrics to the clients sending the ``METRICS_TOKEN`` as a bearer token (e.g. Prometheus with
+    ``authorization`` in its scrape config). The endpoint is not found if no token is configured.
+    """
+    token: Optional[str] = adv.config["METRICS_TOKEN"]
+    if not token:
+        raise HttpError(status_code=404, description="Not found.")
+    authorization: str = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        raise HttpError(status_code=401, description="Invalid metrics token.", headers={"WWW-Authenticate": "Bearer"})
+    body, content_type = metrics.export()
+    return Response(body, content_type=content_type)
@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+
+import sqlalchemy
+from flask import Response
+
+import app.orm
+from app.flask_entrypoints import adv
+from app.orm import partitioning
+
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+logger = logging.getLogger("adv.partitions")
+_check_lock = threading.Lock()
+_next_check_at: float = 0.0
+
+
+def ensure_partitions_if_due() -> None:
+    """
+    Creates the partitions of the advertisements for the coming months, if missing, at most once per
+    ``ADV_PARTITION_CHECK_INTERVAL`` seconds in a process. If the table stays locked for
+    ``ADV_PARTITION_LOCK_TIMEOUT_MS`` milliseconds, the partitions are left to the next check.
+    """
+    global _next_check_at
+    if time.monotonic() < _next_check_at or not _check_lock.acquire(blocking=False):
+        return
+    try:
+        _next_check_at = time.monotonic() + adv.config["ADV_PARTITION_CHECK_INTERVAL"]
+        with app.orm.engine.begin() as conn:
+            # Creating a partition locks the table exclusively: waiting behind a long transaction would queue all
+            # the queries of the table behind the DDL, so it gives up quickly and is retried by the next check.
+            conn.execute(sqlalchemy.text("SELECT set_config('lock_timeout', :timeout, true)"),
+                         {"timeout": f"{adv.config['ADV_PARTITION_LOCK_TIMEOUT_MS']}ms"})
+            # Only creates the partitions: moving the rows out of the default partition (ensure_partitions()) locks
+            # the table, and is left to the maintenance by cron.
+            created: list[str] = partitioning.create_partitions_ahead(
+                conn=conn, months_ahead=adv.config["ADV_PARTITION_MONTHS_AHEAD"]
+            )
+        if created:
+            logger.info("Partitions %s are created.", ", ".join(created))
+    except sqlalchemy.exc.OperationalError as e:
+        if getattr(e.orig, "pgcode", None) == LOCK_NOT_AVAILABLE:
+            logger.info("The advertisements table is locked, its partitions will be created by the next check.")
+        else:
+            logger.exception("Creating the partitions of the advertisements failed.")
+    except Exception:
+        logger.exception("Creating the partitions of the advertisements failed.")
+    finally:
+        _check_lock.release()
+
+
+@adv.after_request
+def schedule_partition_check(response: Response) -> Response:
+    if adv.config["ADV_PARTITION_MAINTENANCE_ENABLED"]:
+        # Runs after the response is sent, outside of the request deadline and query budget.
+        response.call_on_close(ensure_partitions_if_due)
+    return response
@@ -0,0 +1,68 @@
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from flask import Response, g, request
+
+from app.flask_entrypoints import adv
+from app.monitoring import profiling
+
+
+logger = logging.getLogger("adv.profiling")
+profiling_budget = profiling.ProfilingBudget(
+    max_concurrent=adv.config["PROFILING_MAX_CONCURRENT"], max_per_minute=adv.config["PROFILING_MAX_PER_MINUTE"]
+)
+
+
+def is_profiling_requested() -> bool:
+    """
+    A request is profiled if it carries the ``X-Profile`` header with the ``PROFILING_TOKEN``, or if it is sampled
+    with the probability ``PROFILING_SAMPLE_RATE``.
+    """
+    token: Optional[str] = adv.config["PROFILING_TOKEN"]
+    header: Optional[str] = request.headers.get("X-Profile")
+    if token and header and hmac.compare_digest(header.encode(), token.encode()):
+        return True
+    return random.random() < adv.config["PROFILING_SAMPLE_RATE"]
+
+
+@adv.before_request
+def start_profiling():
+    if not adv.config["PROFILING_ENABLED"] or not is_profiling_requested() or not profiling_budget.try_acquire():
+        return
+    sampler = profiling.StackSampler(
+        thread_id=threading.get_ident(), interval=adv.config["PROFILING_INTERVAL"],
+        max_duration=adv.config["PROFILING_MAX_DURATION"], root=f"{request.method} {request.endpoint}"
+    )
+    g.profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.endpoint}-{os.getpid()}-{random.getrandbits(32):08x}"
+    g.stack_sampler = sampler
+    sampler.start()
+
+
+@adv.after_request
+def add_profile_id(response: Response) -> Response:
+    profile_id: Optional[str] = g.get("profile_id")
+    if profile_id is not None:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+@adv.teardown_request
+def finish_profiling(exc: Optional[BaseException]):
+    sampler: Optional[profiling.StackSampler] = g.pop("stack_sampler", None)
+    if sampler is None:
+        return
+    try:
+        sampler.stop()
+        path: Optional[str] = profiling.write_profile(
+            directory=adv.config["PROFILING_DIR"], name=g.pop("profile_id"), folded=sampler.folded(),
+            max_files=adv.config["PROFILING_MAX_FILES"]
+        )
+        if path is None:
+            logger.warning("The profile is dropped: %s holds too many profiles.", adv.config["PROFILING_DIR"])
+    finally:
+        profiling_budget.release()
@@ -0,0 +1,43 @@
+import logging
+
+from flask import Response, g, request
+
+from app.flask_entrypoints import adv
+from app.monitoring import query_budget
+
+
+logger = logging.getLogger("adv.queries")
+
+
+@adv.before_request
+def start_query_counting():
+    if adv.config["QUERY_BUDGET_ENABLED"]:
+        g.query_counting_token = query_budget.start()
+
+
+@adv.after_request
+def check_query_budget(response: Response) -> Response:
+    """
+    Logs the number of SQL statements and round trips of the request, the statement shapes repeated within it
+    and an exceeded budget of the endpoint (``QUERY_BUDGETS``, plus the ``g.query_budget_extra`` statements
+    allowed to the request, e.g. for an ``Idempotency-Key``). With ``QUERY_BUDGET_STRICT`` (test mode) an exceeded
+    budget raises ``QueryBudgetExceededError`` instead.
+    """
+    token = g.pop("query_counting_token", None)
+    if token is None:
+        return response
+    queries: query_budget.RequestQueries = query_budget.finish(token)
+    extra = {"endpoint": request.endpoint, "method": request.method, "queries": queries.as_dict()}
+    logger.debug("%s %s %s", request.method, request.path, queries.as_dict(), extra=extra)
+    for shape, count in queries.repeated_shapes(threshold=adv.config["QUERY_REPEAT_THRESHOLD"]).items():
+        logger.warning("%s %s repeated a statement %s times: %s", request.method, request.path, count, shape,
+                       extra=extra)
+    budget: int = adv.config["QUERY_BUDGETS"].get(request.endpoint, adv.config["QUERY_BUDGET_DEFAULT"])
+    budget += g.get("query_budget_extra", 0)
+    try:
+        query_budget.check_budget(queries=queries, budget=budget, name=f"{request.method} {request.path}")
+    except query_budget.QueryBudgetExceededError as e:
+        if adv.config["QUERY_BUDGET_STRICT"]:
+            raise
+        logger.warning(e.message, extra=extra)
+    return response
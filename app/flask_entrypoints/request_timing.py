@@ -0,0 +1,33 @@
+import logging
+
+from flask import Response, g, request
+
+from app.flask_entrypoints import adv
+from app.monitoring import timing
+
+
+logger = logging.getLogger("adv.timing")
+
+
+@adv.before_request
+def start_request_timing():
+    if adv.config["REQUEST_TIMING_ENABLED"]:
+        g.request_timing_token = timing.start()
+
+
+@adv.after_request
+def finish_request_timing(response: Response) -> Response:
+    token = g.pop("request_timing_token", None)
+    if token is None:
+        return response
+    timings: timing.RequestTimings = timing.finish(token)
+    if adv.config["SERVER_TIMING_HEADER"]:
+        response.headers["Server-Timing"] = timings.server_timing_header()
+    logger.info(
+        "%s %s %s", request.method, request.path, response.status_code,
+        extra={
+            "endpoint": request.endpoint, "method": request.method, "status": response.status_code,
+            "timings": timings.as_dict()
+        }
+    )
+    return response
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from flask import g
+
+from app.flask_entrypoints import adv
+from app.service_layer.unit_of_work import UnitOfWork
+
+
+def get_request_uow() -> UnitOfWork:
+    """
+    Returns the unit of work of the current request, shared by all the service layer calls of the request.
+    """
+    uow: Optional[UnitOfWork] = g.get("uow")
+    if uow is None:
+        uow = g.uow = UnitOfWork(scoped=True)
+    return uow
+
+
+@adv.teardown_request
+def close_request_uow(exc: Optional[BaseException]):
+    uow: Optional[UnitOfWork] = g.pop("uow", None)
+    if uow is not None:
+        uow.close()
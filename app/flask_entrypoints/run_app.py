@@ -1,7 +1,4 @@
-import app.orm.table_mapper
-from app.flask_entrypoints import adv, views
+from app.flask_entrypoints.app_factory import create_app
 
 if __name__ == "__main__":
-    app.orm.table_mapper.start_mapping()
-
-    adv.run(debug=True)
+    create_app().run(debug=True)
@@ -1,22 +1,32 @@
-from flask import request, jsonify, Response
+from typing import Optional
+
+from flask import request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required
 
 import app.domain.errors
 import app.repository.filtering
-from app.flask_entrypoints import adv, authentication
-from app.service_layer import app_manager
+from app.flask_entrypoints import adv, authentication, caching, exporting
+from app.flask_entrypoints.idempotency import idempotent
+from app.service_layer import app_manager, deadlines
 from app.pass_hashing_and_validation import pass_hashing, validation
 from app.flask_entrypoints.error_handlers import HttpError
 
+from app.flask_entrypoints.request_uow import get_request_uow
 from app.service_layer.unit_of_work import UnitOfWork
 
 
+search_advs_cache = caching.ResponseCache(
+    max_size=adv.config["SEARCH_CACHE_SIZE"], ttl=adv.config["SEARCH_CACHE_TTL"]
+)
+
+
 @adv.route("/users/", methods=["POST"])
+@idempotent
 def create_user():
     try:
         new_user_id: int = app_manager.create_user(
-            user_data=request.json, validate_func=validation.validate_data_for_user_creation,
-            hash_pass_func=pass_hashing.hash_password, uow=UnitOfWork()
+            user_data=request.get_data(), validate_func=validation.validate_data_for_user_creation,
+            hash_pass_func=pass_hashing.hash_password, uow=get_request_uow()
         )
         return jsonify({"user_id": new_user_id}), 201
     except app.domain.errors.ValidationError as e:
@@ -27,12 +37,23 @@ def create_user():
 
 @adv.route("/users/<int:user_id>/", methods=["GET"])
 @jwt_required()
-def get_user_data(user_id: int) -> tuple[Response, int]:
+def get_user_data(user_id: int) -> Response | tuple[Response, int]:
     try:
-        user_data: dict = app_manager.get_user_data(
-            user_id=user_id, check_current_user_func=authentication.check_current_user, uow=UnitOfWork()
+        if request.if_none_match:  # a conditional request checks the version only, with a cheaper query
+            user_version: int = app_manager.get_user_version(
+                user_id=user_id, check_current_user_func=authentication.check_current_user, uow=get_request_uow()
+            )
+            matching_etag: str | None = caching.get_matching_etag(
+                etag=caching.make_etag(resource="user", resource_id=user_id, version=user_version)
+            )
+            if matching_etag:
+                return caching.not_modified_response(etag=matching_etag)
+        user_data, user_version = app_manager.get_user_data_with_version(
+            user_id=user_id, check_current_user_func=authentication.check_current_user, uow=get_request_uow()
         )
-        return jsonify(user_data), 200
+        response: Response = jsonify(user_data)
+        response.set_etag(caching.make_etag(resource="user", resource_id=user_id, version=user_version))
+        return response, 200
     except app.domain.errors.CurrentUserError as e:
         raise HttpError(status_code=403, description=e.message)
     except app.domain.errors.NotFoundError as e:
@@ -48,13 +69,16 @@ def update_user(user_id: int):
         updated_user_data: dict = app_manager.update_user(
             user_id=user_id, check_current_user_func=authentication.check_current_user,
             validate_func=validation.validate_data_for_user_updating, hash_pass_func=pass_hashing.hash_password,
-            new_data=request.json, uow=UnitOfWork()
+            new_data=request.get_data(), uow=get_request_uow(),
+            expected_version=caching.get_if_match_version(resource="user", resource_id=user_id)
         )
         return jsonify({"modified_data": updated_user_data}), 200
     except app.domain.errors.CurrentUserError as e:
         raise HttpError(status_code=403, description=e.message)
     except app.domain.errors.ValidationError as e:
         raise HttpError(status_code=400, description=str(e))
+    except app.domain.errors.ConflictError as e:
+        raise HttpError(status_code=409, description=e.message)
 
 
 @adv.route("/users/<int:user_id>/", methods=["DELETE"])
@@ -62,11 +86,14 @@ def update_user(user_id: int):
 def delete_user(user_id: int):
     try:
         deleted_user_params: dict[str, str | int] = app_manager.delete_user(
-            user_id=user_id, check_current_user_func=authentication.check_current_user, uow=UnitOfWork()
+            user_id=user_id, check_current_user_func=authentication.check_current_user, uow=get_request_uow()
         )
+        search_advs_cache.clear()
         return jsonify({"deleted_user_params": deleted_user_params}), 200
     except app.domain.errors.CurrentUserError:
         raise HttpError(status_code=403, description="Unavailable operation.")
+    except app.domain.errors.ConflictError as e:
+        raise HttpError(status_code=409, description=e.message)
 
 
 @adv.route("/users/<int:user_id>/advertisements", methods=["GET"])
@@ -80,7 +107,7 @@ def get_related_advs(user_id: int):
             check_current_user_func=authentication.check_current_user,
             page=page,
             per_page=per_page,
-            uow=UnitOfWork()
+            uow=get_request_uow()
         )
         return result, 200
     except app.domain.errors.CurrentUserError:
@@ -91,14 +118,45 @@ def get_related_advs(user_id: int):
         raise HttpError(status_code=404, description=e.message)
 
 
+@adv.route("/users/<int:user_id>/advertisements/export", methods=["GET"])
+@jwt_required()
+def export_related_advs(user_id: int) -> Response:
+    export_format: str = request.args.get("format", "ndjson")
+    if export_format not in exporting.EXPORT_MIMETYPES:
+        raise HttpError(
+            status_code=400, description=f'Valid values of "format" are: {list(exporting.EXPORT_MIMETYPES)}.'
+        )
+    left: Optional[float] = deadlines.remaining()
+    try:
+        advs_params = app_manager.export_related_advs(
+            user_id=user_id, check_current_user_func=authentication.check_current_user, uow=get_request_uow(),
+            batch_size=adv.config["EXPORT_BATCH_SIZE"],
+            max_rows=int(left * adv.config["EXPORT_ROWS_PER_SECOND"]) if left is not None else None
+        )
+    except app.domain.errors.CurrentUserError:
+        raise HttpError(status_code=403, description="Unavailable operation.")
+    body = exporting.encode(
+        rows=advs_params, export_format=export_format, columns=app_manager.ADV_EXPORT_COLUMNS,
+        chunk_size=adv.config["EXPORT_CHUNK_SIZE"]
+    )
+    # The request context (with its unit of work, deadline and admission slot) lasts until the body is sent.
+    return Response(
+        stream_with_context(body), mimetype=exporting.EXPORT_MIMETYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="advertisements.{export_format}"'}
+    )
+
+
 @adv.route("/advertisements/", methods=["POST"])
 @jwt_required()
+@idempotent
 def create_adv():
     try:
         new_adv_id: int = app_manager.create_adv(
             get_auth_user_id_func=authentication.get_authenticated_user_identity,
-            validate_func=validation.validate_data_for_adv_creation, adv_params=request.json, uow=UnitOfWork()
+            validate_func=validation.validate_data_for_adv_creation, adv_params=request.get_data(),
+            uow=get_request_uow()
         )
+        search_advs_cache.clear()
         return jsonify({'new_advertisement_id': new_adv_id}), 201
     except app.domain.errors.CurrentUserError as e:
         raise HttpError(status_code=403, description=e.message)
@@ -107,12 +165,13 @@ def create_adv():
 
 
 @adv.route("/advertisements", methods=["GET"])
+@search_advs_cache.cached
 def search_advs_by_text():
     try:
         paginated_result: dict[str, str | int] = app_manager.search_advs_by_text(
             column=request.args.get("column"),
             column_value=request.args.get("column_value"),
-            uow=UnitOfWork(),
+            uow=get_request_uow(),
             page=request.args.get("page"),
             per_page=request.args.get("per_page")
         )
@@ -125,29 +184,59 @@ def search_advs_by_text():
 @jwt_required()
 def get_adv_params(adv_id: int):
     try:
-        adv_params: dict[str, str | int] = app_manager.get_adv_params(
-            adv_id=adv_id, check_current_user_func=authentication.check_current_user, uow=UnitOfWork()
+        if request.if_none_match:  # a conditional request checks the version only, with a cheaper query
+            adv_version: int = app_manager.get_adv_version(
+                adv_id=adv_id, check_current_user_func=authentication.check_current_user, uow=get_request_uow()
+            )
+            matching_etag: str | None = caching.get_matching_etag(
+                etag=caching.make_etag(resource="advertisement", resource_id=adv_id, version=adv_version)
+            )
+            if matching_etag:
+                return caching.not_modified_response(etag=matching_etag)
+        adv_params, adv_version = app_manager.get_adv_params_with_version(
+            adv_id=adv_id, check_current_user_func=authentication.check_current_user, uow=get_request_uow()
         )
-        return adv_params, 200
+        response: Response = jsonify(adv_params)
+        response.set_etag(caching.make_etag(resource="advertisement", resource_id=adv_id, version=adv_version))
+        return response, 200
     except app.domain.errors.CurrentUserError as e:
         raise HttpError(status_code=403, description=e.message)
     except app.domain.errors.NotFoundError as e:
         raise HttpError(status_code=404, description=e.message)
 
 
+@adv.route("/advertisements/batch", methods=["GET"])
+@jwt_required()
+def get_advs_batch():
+    try:
+        adv_ids: list[int] = validation.validate_ids(
+            ids=request.args.get("ids", ""), max_count=adv.config["BATCH_MAX_IDS"]
+        )
+        result: dict[str, list] = app_manager.get_advs_params(
+            adv_ids=adv_ids, check_current_user_func=authentication.check_current_user, uow=get_request_uow()
+        )
+    except app.domain.errors.ValidationError as e:
+        raise HttpError(status_code=400, description=str(e.message))
+    return result, 200
+
+
 @adv.route("/advertisements/<int:adv_id>/", methods=["PATCH"])
 @jwt_required()
 def update_adv(adv_id: int):
     try:
         updated_adv_params: dict [str, str | int] = app_manager.update_adv(
-            adv_id=adv_id, new_params=request.json, check_current_user_func=authentication.check_current_user,
-            validate_func=validation.validate_data_for_adv_updating, uow=UnitOfWork())
+            adv_id=adv_id, new_params=request.get_data(), check_current_user_func=authentication.check_current_user,
+            validate_func=validation.validate_data_for_adv_updating, uow=get_request_uow(),
+            expected_version=caching.get_if_match_version(resource="advertisement", resource_id=adv_id))
     except app.domain.errors.NotFoundError as e:
         raise HttpError(status_code=404, description=e.message)
     except app.domain.errors.CurrentUserError as e:
         raise HttpError(status_code=403, description=e.message)
     except app.domain.errors.ValidationError as e:
         raise HttpError(status_code=400, description=str(e))
+    except app.domain.errors.ConflictError as e:
+        raise HttpError(status_code=409, description=e.message)
+    search_advs_cache.clear()
     return {"updated_adv_params": updated_adv_params}, 200
 
 
@@ -156,25 +245,73 @@ def update_adv(adv_id: int):
 def delete_adv(adv_id: int):
     try:
         deleted_adv_params: dict[str, str | int] = app_manager.delete_adv(
-            adv_id=adv_id, get_auth_user_id_func=authentication.get_authenticated_user_identity, uow=UnitOfWork()
+            adv_id=adv_id, get_auth_user_id_func=authentication.get_authenticated_user_identity, uow=get_request_uow()
         )
     except app.domain.errors.CurrentUserError as e:
         raise HttpError(status_code=403, description=e.message)
     except app.domain.errors.NotFoundError as e:
         raise HttpError(status_code=404, description=e.message)
+    except app.domain.errors.ConflictError as e:
+        raise HttpError(status_code=409, description=e.message)
+    search_advs_cache.clear()
     return {"deleted_advertisement_params": deleted_adv_params}, 200
 
 
+@adv.route("/batch", methods=["POST"])
+@jwt_required()
+def run_batch():
+    """
+    Runs a list of advertisement operations in one transaction. The response is 200 if the batch is committed,
+    even if some operations failed in the best-effort mode ("atomic": false); if an atomic batch is rolled back,
+    the status is the one of the failed operation.
+    """
+    try:
+        batch: dict = validation.validate_batch(batch=request.get_data(), max_count=adv.config["BATCH_MAX_OPERATIONS"])
+    except app.domain.errors.ValidationError as e:
+        raise HttpError(status_code=400, description=str(e.message))
+    result: dict[str, bool | list[dict]] = app_manager.run_batch(
+        operations=batch["operations"], atomic=batch.get("atomic", True),
+        get_auth_user_id_func=authentication.get_authenticated_user_identity,
+        check_current_user_func=authentication.check_current_user,
+        validate_creation_func=validation.validate_data_for_adv_creation,
+        validate_updating_func=validation.validate_data_for_adv_updating, uow=get_request_uow()
+    )
+    status_code: int = 200
+    for operation_result in result["results"]:
+        error: Optional[Exception] = operation_result.pop("error", None)
+        if error is not None:
+            operation_result["error"] = {
+                "status": app_manager.get_batch_error_status(error), "description": str(error.message)
+            }
+            if not result["committed"]:
+                status_code = operation_result["error"]["status"]
+    if result["committed"] and any(operation_result["status"] == "ok" for operation_result in result["results"]):
+        search_advs_cache.clear()
+    return result, status_code
+
+
 @adv.route("/login/", methods=["POST"])
 def login():
     try:
         access_token = app_manager.jwt_auth(validate_func=validation.validate_login_credentials,
                                             check_pass_func=pass_hashing.check_password,
                                             grant_access_func=authentication.get_access_token,
-                                            credentials=request.json,
-                                            uow=UnitOfWork())
+                                            credentials=request.get_data(),
+                                            uow=UnitOfWork(),  # releases the connection before hashing
+                                            throttle_func=authentication.login_throttle.check,
+                                            register_failure_func=authentication.login_throttle.register_failure,
+                                            client_ip=request.remote_addr)
         return jsonify({"access_token": access_token}), 200
     except app.domain.errors.AccessDeniedError as e:
         raise HttpError(status_code=401, description=e.message)
+    except app.domain.errors.TooManyRequestsError as e:
+        raise HttpError(status_code=429, description=e.message, headers={"Retry-After": str(e.retry_after)})
     except app.domain.errors.ValidationError as e:
         raise HttpError(status_code=400, description=str(e))
+
+
+@adv.route("/logout/", methods=["POST"])
+@jwt_required()
+def logout():
+    authentication.revoke_current_token()
+    return jsonify({"message": "The access token is revoked."}), 200
@@ -0,0 +1,4 @@
+from app.flask_entrypoints.app_factory import create_app
+
+
+application = create_app()
@@ -0,0 +1,79 @@
+import os
+from typing import Optional
+
+import sqlalchemy
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from sqlalchemy.pool import Pool
+
+import app.orm
+from app.monitoring import operations, sql_events
+from app.monitoring.operations import current_operation
+
+
+# With PROMETHEUS_MULTIPROC_DIR set (before prometheus_client is imported) every worker process writes its values
+# to files in that directory, and a scrape of any worker aggregates the values of all of them.
+REQUEST_LATENCY = Histogram(
+    "adv_http_request_duration_seconds", "Latency of HTTP requests by view.", ["endpoint", "method", "status"]
+)
+OPERATIONS = Counter(
+    "adv_app_manager_operations_total", "Calls of app_manager operations by raised error class.",
+    ["operation", "error"]
+)
+OPERATION_LATENCY = Histogram(
+    "adv_app_manager_operation_duration_seconds", "Duration of app_manager operations.", ["operation"]
+)
+SQL_STATEMENT_LATENCY = Histogram(
+    "adv_sql_statement_duration_seconds", "Duration of SQL statements by originating app_manager operation.",
+    ["operation"], buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+POOL_CONNECTIONS = Gauge(
+    "adv_db_pool_connections", "Connections of the database pool by state.", ["state"], multiprocess_mode="livesum"
+)
+
+
+def _record_operation(name: str, duration: float, error: Optional[BaseException]) -> None:
+    OPERATIONS.labels(operation=name, error=type(error).__name__ if error is not None else "").inc()
+    OPERATION_LATENCY.labels(operation=name).observe(duration)
+
+
+def _record_sql(conn, statement, parameters, duration: float, executemany: bool) -> None:
+    SQL_STATEMENT_LATENCY.labels(operation=current_operation.get() or "").observe(duration)
+
+
+def _record_pool_state(*args) -> None:
+    pool = app.orm.engine.pool
+    if not hasattr(pool, "checkedout"):
+        return
+    POOL_CONNECTIONS.labels(state="size").set(pool.size())
+    POOL_CONNECTIONS.labels(state="checked_out").set(pool.checkedout())
+    POOL_CONNECTIONS.labels(state="idle").set(pool.checkedin())
+    POOL_CONNECTIONS.labels(state="overflow").set(max(pool.overflow(), 0))
+
+
+def observe_request(endpoint: Optional[str], method: str, status: int, duration: float) -> None:
+    REQUEST_LATENCY.labels(endpoint=endpoint or "unknown", method=method, status=str(status)).observe(duration)
+
+
+def export() -> tuple[bytes, str]:
+    """
+    Returns the metrics in the Prometheus text exposition format and its content type.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+operations.add_listener(_record_operation)
+sql_events.add_listener(_record_sql)
+for pool_event in ("checkout", "checkin", "connect"):
+    sqlalchemy.event.listen(Pool, pool_event, _record_pool_state)
@@ -0,0 +1,52 @@
+import functools
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional, Protocol
+
+
+class OperationListener(Protocol):
+    def __call__(self, name: str, duration: float, error: Optional[BaseException]) -> None:
+        pass
+
+
+current_operation: ContextVar[Optional[str]] = ContextVar("current_operation", default=None)
+_listeners: list[OperationListener] = []
+
+
+def add_listener(listener: OperationListener) -> None:
+    """
+    Registers a function called after every operation with its name, duration (seconds) and the exception raised
+    by it, if any.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def operation(func: Callable) -> Callable:
+    """
+    Marks a service layer function as an operation: while it runs, its name is available as ``current_operation``
+    (e.g. to attribute SQL statements to it), and the registered listeners are notified when it finishes.
+
+    An operation called by another one (e.g. by a batch) is a part of the calling operation: it keeps its name
+    and its listeners are not notified, so that its time is not counted twice.
+    """
+    name: str = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_operation.get() is not None:
+            return func(*args, **kwargs)
+        token = current_operation.set(name)
+        started_at = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            return func(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            current_operation.reset(token)
+            duration = time.perf_counter() - started_at
+            for listener in _listeners:
+                listener(name=name, duration=duration, error=error)
+    return wrapper
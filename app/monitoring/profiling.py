@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from types import FrameType
+from typing import Optional
+
+
+def _frame_label(frame: FrameType) -> str:
+    return f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_name}'
+
+
+class StackSampler:
+    """
+    Statistical profiler of one thread: a background thread takes a snapshot of its stack every ``interval``
+    seconds, for at most ``max_duration`` seconds. The profiled thread itself is not instrumented, so its
+    slowdown comes from the GIL taken by the sampler only.
+
+    Stacks are prefixed by ``root`` (e.g. the view), and the functions on them (e.g. of ``app_manager``) are labeled
+    ``module:function``, so the samples are attributed to both.
+    """
+    def __init__(self, thread_id: int, interval: float, max_duration: float, root: str):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_duration = max_duration
+        self.root = root
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_duration
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            labels: list[str] = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(self.root)
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def folded(self) -> str:
+        """
+        Returns the samples in the folded stacks format ("frame;frame;frame count" per line) read by flame graph
+        tools, e.g. ``flamegraph.pl``, ``inferno-flamegraph`` or speedscope.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class ProfilingBudget:
+    """
+    Limits the overhead of profiling in a process: at most ``max_concurrent`` requests are profiled at a time
+    and at most ``max_per_minute`` profiles are started within a minute.
+    """
+    def __init__(self, max_concurrent: int, max_per_minute: int):
+        self.max_concurrent = max_concurrent
+        self.max_per_minute = max_per_minute
+        self._running = 0
+        self._started_at: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._started_at and self._started_at[0] <= now - 60:
+                self._started_at.popleft()
+            if self._running >= self.max_concurrent or len(self._started_at) >= self.max_per_minute:
+                return False
+            self._running += 1
+            self._started_at.append(now)
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._running -= 1
+
+
+def write_profile(directory: str, name: str, folded: str, max_files: int) -> Optional[str]:
+    """
+    Writes a profile to ``directory`` and returns its path, or returns ``None`` if the directory already
+    holds ``max_files`` profiles.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if len(os.listdir(directory)) >= max_files:
+        return None
+    path: str = os.path.join(directory, f"{name}.folded")
+    with open(path, "w") as file:
+        file.write(folded)
+    return path
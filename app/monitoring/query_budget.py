@@ -0,0 +1,94 @@
+import re
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Optional
+
+import sqlalchemy
+from sqlalchemy.engine import Engine
+
+from app.monitoring import sql_events
+
+
+class QueryBudgetExceededError(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+# Expanded "IN" lists, e.g. "(%(id_1_1)s, %(id_1_2)s)", have the same shape whatever their length.
+_placeholder_list = re.compile(r"\(\s*(?:%\(\w+\)s|\?|\$\d+)(?:\s*,\s*(?:%\(\w+\)s|\?|\$\d+))*\s*\)")
+_whitespace = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Returns the statement with normalized whitespace and placeholder lists. Statements are compiled with bound
+    parameters, so statements differing only by the parameter values have the same shape.
+    """
+    return _placeholder_list.sub("(?)", _whitespace.sub(" ", statement).strip())
+
+
+class RequestQueries:
+    def __init__(self):
+        self.statements: int = 0
+        self.round_trips: int = 0
+        self.shapes: Counter[str] = Counter()
+
+    def add_statement(self, statement: str, parameters, executemany: bool) -> None:
+        self.round_trips += 1
+        # Session settings (e.g. the statement timeout) and savepoints are not queries.
+        if statement.startswith(("SET ", "SAVEPOINT ", "RELEASE SAVEPOINT ", "ROLLBACK TO SAVEPOINT ")):
+            return
+        self.statements += len(parameters) if executemany and parameters else 1
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> dict[str, int]:
+        """
+        Returns the statement shapes executed at least ``threshold`` times, which usually means a query made
+        per item of a list (N+1) or a result requested again instead of being reused.
+        """
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def as_dict(self) -> dict[str, int]:
+        return {"statements": self.statements, "round_trips": self.round_trips}
+
+
+_current_queries: ContextVar[Optional[RequestQueries]] = ContextVar("current_queries", default=None)
+
+
+def start() -> Token:
+    return _current_queries.set(RequestQueries())
+
+
+def finish(token: Token) -> RequestQueries:
+    queries: RequestQueries = _current_queries.get()
+    _current_queries.reset(token)
+    return queries
+
+
+def check_budget(queries: RequestQueries, budget: int, name: str) -> None:
+    """
+    Raises ``QueryBudgetExceededError`` if more than ``budget`` statements were executed for ``name``.
+    """
+    if queries.statements > budget:
+        raise QueryBudgetExceededError(
+            message=f"{name} executed {queries.statements} SQL statements, the budget is {budget}."
+        )
+
+
+def _record_sql(conn, statement, parameters, duration: float, executemany: bool) -> None:
+    queries: Optional[RequestQueries] = _current_queries.get()
+    if queries is not None:
+        queries.add_statement(statement=statement, parameters=parameters, executemany=executemany)
+
+
+# COMMIT and ROLLBACK are sent without a cursor, so they are counted as round trips separately.
+@sqlalchemy.event.listens_for(Engine, "commit")
+@sqlalchemy.event.listens_for(Engine, "rollback")
+def _record_transaction_end(conn):
+    queries: Optional[RequestQueries] = _current_queries.get()
+    if queries is not None:
+        queries.round_trips += 1
+
+
+sql_events.add_listener(_record_sql)
@@ -0,0 +1,89 @@
+import datetime
+import logging
+import random
+from typing import Any, Mapping, Optional
+
+import sqlalchemy
+
+from app.monitoring import sql_events
+from app.monitoring.operations import current_operation
+
+
+DEFAULT_CONFIG: Mapping[str, Any] = {"SLOW_QUERY_THRESHOLD_MS": 200, "SLOW_QUERY_EXPLAIN_SAMPLE_RATE": 0.0}
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+logger = logging.getLogger("adv.slow_queries")
+_config: Mapping[str, Any] = DEFAULT_CONFIG
+
+
+def configure(config: Mapping[str, Any]) -> None:
+    """
+    Makes the slow queries read ``SLOW_QUERY_THRESHOLD_MS`` and ``SLOW_QUERY_EXPLAIN_SAMPLE_RATE`` from the given
+    config (e.g. the config of the app) instead of ``DEFAULT_CONFIG``. The settings are read at every statement,
+    so later changes of the config apply at once.
+    """
+    global _config
+    _config = config
+
+
+def redact(value: Any) -> Any:
+    """
+    Replaces text values (search strings, emails, password hashes) with their length, keeps the other values,
+    which are needed to reproduce the plan (ids, dates, limits).
+    """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, (str, bytes)):
+        return f"<redacted {type(value).__name__}, {len(value)} chars>"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def explain(conn: sqlalchemy.engine.Connection, statement: str, parameters: Any) -> Optional[str]:
+    """
+    Runs the statement again under ``EXPLAIN (ANALYZE, BUFFERS)`` in the same transaction and returns the plan.
+    ANALYZE executes the statement, so only selects are explained, and in a SAVEPOINT: if EXPLAIN fails (e.g. it
+    runs past the ``statement_timeout`` of the request), the transaction is rolled back to the savepoint and goes
+    on. The DBAPI cursor is used directly, so the statements are not seen by the engine events.
+    """
+    if conn.dialect.name != "postgresql" or not statement.lstrip()[:6].upper() == "SELECT":
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    except Exception as e:  # e.g. not in a transaction block
+        cursor.close()
+        return f"EXPLAIN failed: {e}"
+    try:
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+        plan: str = "\n".join(row[0] for row in cursor.fetchall())
+        cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        return plan
+    except Exception as e:
+        cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+
+def _record_slow_query(conn, statement, parameters, duration: float, executemany: bool) -> None:
+    if duration * 1000 < _config["SLOW_QUERY_THRESHOLD_MS"]:
+        return
+    plan: Optional[str] = None
+    sample_rate: float = _config["SLOW_QUERY_EXPLAIN_SAMPLE_RATE"]
+    if not executemany and sample_rate and random.random() < sample_rate:
+        plan = explain(conn=conn, statement=statement, parameters=parameters)
+    operation: str = current_operation.get() or "unknown"
+    logger.warning(
+        "Slow query (%.1f ms) in %s: %s%s", duration * 1000, operation, statement, f"\n{plan}" if plan else "",
+        extra={
+            "operation": operation, "duration_ms": round(duration * 1000, 3), "statement": statement,
+            "parameters": redact(parameters), "plan": plan
+        }
+    )
+
+
+sql_events.add_listener(_record_slow_query)
@@ -0,0 +1,55 @@
+import time
+from typing import Any, Protocol
+
+import sqlalchemy
+from sqlalchemy.engine import Engine
+
+
+class SqlListener(Protocol):
+    def __call__(
+            self, conn: sqlalchemy.engine.Connection, statement: str, parameters: Any, duration: float,
+            executemany: bool
+    ) -> None:
+        pass
+
+
+_listeners: list[SqlListener] = []
+
+
+def add_listener(listener: SqlListener) -> None:
+    """
+    Registers a function called after every statement executed by any engine with the statement, its parameters
+    and the execution duration (seconds).
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: SqlListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+@sqlalchemy.event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _listeners:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@sqlalchemy.event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at: list[float] = conn.info.get("query_started_at")
+    if not started_at:
+        return
+    duration = time.perf_counter() - started_at.pop()
+    for listener in _listeners:
+        listener(conn=conn, statement=statement, parameters=parameters, duration=duration, executemany=executemany)
+
+
+@sqlalchemy.event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    if exception_context.connection is None:
+        return
+    started_at: list[float] = exception_context.connection.info.get("query_started_at")
+    if started_at:
+        started_at.pop()
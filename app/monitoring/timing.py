@@ -0,0 +1,108 @@
+import contextlib
+import functools
+import time
+from contextvars import ContextVar, Token
+from typing import Callable, Optional
+
+from app.monitoring import operations, sql_events
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started_at: float = time.perf_counter()
+        self.durations: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self) -> dict[str, dict[str, float | int]]:
+        """
+        Returns the durations (milliseconds) and counts of the spans. Spans may be nested: e.g. "repository"
+        includes the "sql" and "filter_validation" spans of its calls, the rest of it is mostly ORM hydration.
+        """
+        result = {
+            name: {"dur": round(duration * 1000, 3), "count": self.counts[name]}
+            for name, duration in self.durations.items()
+        }
+        result["total"] = {"dur": round(self.total() * 1000, 3), "count": 1}
+        return result
+
+    def server_timing_header(self) -> str:
+        return ", ".join(f'{name};dur={timing["dur"]}' for name, timing in self.as_dict().items())
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+_null_span = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("timings", "name", "started_at")
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.timings.add(self.name, time.perf_counter() - self.started_at)
+
+
+def start() -> Token:
+    return _current_timings.set(RequestTimings())
+
+
+def finish(token: Token) -> RequestTimings:
+    timings: RequestTimings = _current_timings.get()
+    _current_timings.reset(token)
+    return timings
+
+
+def span(name: str) -> contextlib.AbstractContextManager:
+    """
+    Measures the enclosed block as a span named ``name`` of the current request. Does nothing if timing
+    is not started for the current request.
+    """
+    timings: Optional[RequestTimings] = _current_timings.get()
+    if timings is None:
+        return _null_span
+    return _Span(timings=timings, name=name)
+
+
+def timed(name: str) -> Callable:
+    """
+    Measures every call of the decorated function as a span named ``name``.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings: Optional[RequestTimings] = _current_timings.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            with _Span(timings=timings, name=name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record_sql(conn, statement, parameters, duration: float, executemany: bool) -> None:
+    timings: Optional[RequestTimings] = _current_timings.get()
+    if timings is not None:
+        timings.add("sql", duration)
+
+
+def _record_operation(name: str, duration: float, error: Optional[BaseException]) -> None:
+    timings: Optional[RequestTimings] = _current_timings.get()
+    if timings is not None:
+        timings.add("app_manager", duration)
+
+
+sql_events.add_listener(_record_sql)
+operations.add_listener(_record_operation)
@@ -0,0 +1,195 @@
+import argparse
+import datetime
+import os
+from typing import Optional
+
+import sqlalchemy
+
+import app.orm
+
+
+TABLE = "adv"
+PARTITION_KEY = "creation_date"
+DEFAULT_PARTITION = f"{TABLE}_default"
+MONTHS_AHEAD = int(os.getenv("ADV_PARTITION_MONTHS_AHEAD", 3))
+
+
+def month_start(moment: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime.datetime, months: int) -> datetime.datetime:
+    index: int = month.year * 12 + month.month - 1 + months
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.datetime) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def partition_month(name: str) -> Optional[datetime.datetime]:
+    """
+    Returns the month of a monthly partition, or ``None`` for another table (e.g. the default partition).
+    """
+    try:
+        return datetime.datetime.strptime(name, f"{TABLE}_%Y_%m")
+    except ValueError:
+        return None
+
+
+def list_partitions(conn: sqlalchemy.engine.Connection) -> list[str]:
+    return list(conn.execute(sqlalchemy.text(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table) ORDER BY child.relname"
+    ), {"table": f'"{TABLE}"'}).scalars())
+
+
+def _lock_partitions(conn: sqlalchemy.engine.Connection) -> None:
+    # Serializes the maintenance of the partitions by the workers until the end of the transaction.
+    conn.execute(sqlalchemy.text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": f"{TABLE}_partitions"})
+
+
+def _create_partition(conn: sqlalchemy.engine.Connection, month: datetime.datetime) -> str:
+    name: str = partition_name(month)
+    conn.execute(sqlalchemy.text(
+        f'CREATE TABLE "{name}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    ))
+    return name
+
+
+def create_default_partition(conn: sqlalchemy.engine.Connection) -> None:
+    conn.execute(sqlalchemy.text(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT'))
+
+
+def create_partitions(conn: sqlalchemy.engine.Connection, first_month: datetime.datetime,
+                      last_month: datetime.datetime) -> list[str]:
+    """
+    Creates the missing partitions of the months from ``first_month`` to ``last_month`` (both included) and returns
+    their names. Creating a partition scans the default partition for the rows of its month, so the partitions
+    are meant to be created before their months come (see ``ensure_partitions()``), while the default partition
+    is empty.
+    """
+    _lock_partitions(conn)
+    existing = set(list_partitions(conn))
+    created: list[str] = []
+    month: datetime.datetime = month_start(first_month)
+    while month <= last_month:
+        if partition_name(month) not in existing:
+            created.append(_create_partition(conn=conn, month=month))
+        month = add_months(month, 1)
+    return created
+
+
+def split_default_partition(conn: sqlalchemy.engine.Connection) -> list[str]:
+    """
+    Moves the rows of the default partition, i.e. of the months without a partition (e.g. bulk loaded ones), to new
+    partitions of their months and returns their names. The rows are moved in one pass whatever the number of
+    months: the default partition is detached, the partitions are created, and the rows are inserted back.
+    """
+    _lock_partitions(conn)
+    months: list[datetime.datetime] = list(conn.execute(sqlalchemy.text(
+        f"SELECT DISTINCT date_trunc('month', \"{PARTITION_KEY}\") FROM \"{DEFAULT_PARTITION}\""
+    )).scalars())
+    if not months:
+        return []
+    detached = f"{DEFAULT_PARTITION}_detached"
+    conn.execute(sqlalchemy.text(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"'))
+    conn.execute(sqlalchemy.text(f'ALTER TABLE "{DEFAULT_PARTITION}" RENAME TO "{detached}"'))
+    created: list[str] = [_create_partition(conn=conn, month=month) for month in sorted(months)]
+    create_default_partition(conn)
+    conn.execute(sqlalchemy.text(f'INSERT INTO "{TABLE}" SELECT * FROM "{detached}"'))
+    conn.execute(sqlalchemy.text(f'DROP TABLE "{detached}"'))
+    return created
+
+
+def create_partitions_ahead(conn: sqlalchemy.engine.Connection, months_ahead: int = MONTHS_AHEAD,
+                            now: Optional[datetime.datetime] = None) -> list[str]:
+    """
+    Creates the partitions of the current month and of ``months_ahead`` next ones, if missing, so that the new rows
+    never go to the default partition, and returns their names. Rows already in the default partition are left
+    there (see ``ensure_partitions()``).
+    """
+    current_month: datetime.datetime = month_start(now or datetime.datetime.now())
+    return create_partitions(conn=conn, first_month=current_month, last_month=add_months(current_month, months_ahead))
+
+
+def ensure_partitions(conn: sqlalchemy.engine.Connection, months_ahead: int = MONTHS_AHEAD,
+                      now: Optional[datetime.datetime] = None) -> list[str]:
+    """
+    Like ``create_partitions_ahead()``, but the rows which went to the default partition (e.g. the partitions were
+    not maintained for a while) are moved to the partitions of their months first. Moving them locks the table,
+    so it is left to maintenance (``main()``) and is not done by the app. Returns the names of the created
+    partitions.
+    """
+    created: list[str] = split_default_partition(conn)
+    return created + create_partitions_ahead(conn=conn, months_ahead=months_ahead, now=now)
+
+
+def detach_partitions(conn: sqlalchemy.engine.Connection, before: datetime.datetime,
+                      drop: bool = False) -> list[str]:
+    """
+    Detaches the partitions of the months before the month of ``before`` and returns their names. Unlike deleting
+    the rows, it takes no time whatever their number and leaves no dead rows to vacuum. The detached tables keep
+    the rows (e.g. to archive them), unless ``drop``.
+    """
+    _lock_partitions(conn)
+    detached: list[str] = []
+    for name in list_partitions(conn):
+        month: Optional[datetime.datetime] = partition_month(name)
+        if month is None or month >= month_start(before):
+            continue
+        conn.execute(sqlalchemy.text(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"'))
+        if drop:
+            conn.execute(sqlalchemy.text(f'DROP TABLE "{name}"'))
+        detached.append(name)
+    return detached
+
+
+def create_initial_partitions(target: sqlalchemy.Table, connection: sqlalchemy.engine.Connection, **kw) -> None:
+    """
+    Creates the default partition and the partitions of the coming months along with the table (``after_create``).
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    create_default_partition(connection)
+    ensure_partitions(conn=connection)
+
+
+def main() -> None:
+    """
+    Maintains the monthly partitions of the advertisements, e.g. by cron:
+
+        $ python -m app.orm.partitioning ensure --ahead 3
+        $ python -m app.orm.partitioning detach --before 2024-01-01 --drop
+        $ python -m app.orm.partitioning list
+    """
+    parser = argparse.ArgumentParser(description="Maintains the monthly partitions of the advertisements.")
+    parser.add_argument("--dsn", default=app.orm.POSTGRES_DSN)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="create the partitions of the current and next months")
+    ensure.add_argument("--ahead", type=int, default=MONTHS_AHEAD, help="months")
+    detach = commands.add_parser("detach", help="detach the partitions of old months")
+    detach.add_argument("--before", type=datetime.datetime.fromisoformat, required=True,
+                        help="date, the partitions of the earlier months are detached")
+    detach.add_argument("--drop", action="store_true", help="drop the detached partitions")
+    commands.add_parser("list", help="list the partitions")
+    args = parser.parse_args()
+
+    engine = sqlalchemy.create_engine(args.dsn)
+    try:
+        with engine.begin() as conn:
+            match args.command:
+                case "ensure":
+                    print("\n".join(ensure_partitions(conn=conn, months_ahead=args.ahead)) or "Nothing to create.")
+                case "detach":
+                    print("\n".join(detach_partitions(conn=conn, before=args.before, drop=args.drop))
+                          or "Nothing to detach.")
+                case "list":
+                    print("\n".join(list_partitions(conn)))
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
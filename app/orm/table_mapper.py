@@ -1,8 +1,9 @@
 import sqlalchemy
-from sqlalchemy import Table, Column, Integer, String, DateTime, func, ForeignKey
+from sqlalchemy import Table, Column, Integer, String, DateTime, LargeBinary, func, ForeignKey, text
 from sqlalchemy.orm import relationship
 
 import app.domain.models
+from app.orm import partitioning
 
 
 mapper = sqlalchemy.orm.registry()
@@ -14,27 +15,55 @@ user_table = Table(
     Column("name", String(200), nullable=False),
     Column("email", String(40), nullable=False, unique=True, index=True),
     Column("password", String(200), nullable=False),
-    Column("creation_date", DateTime, server_default=func.now())
+    Column("creation_date", DateTime, server_default=func.now(), index=True),
+    Column("version", Integer, nullable=False, server_default=text("1"))
 )
 
 
+# Partitioned by months of creation (see app.orm.partitioning), so that the filters by creation date scan only
+# the partitions of their months, and the rows of old months can be detached instead of deleted. The primary key
+# of a partitioned table must include the partition key, so it does not enforce unique ids: the app takes them
+# from the sequence, and the bulk loader, which may load explicit ids, checks them (see app.bulk_loading.copying).
 adv_table = Table(
     "adv",
     mapper.metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("title", String(200), index=True, nullable=False),
     Column("description", String, index=True),
+    Column("creation_date", DateTime, server_default=func.now(), primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("user.id"), nullable=False, index=True),
+    Column("version", Integer, nullable=False, server_default=text("1")),
+    postgresql_partition_by=f"RANGE ({partitioning.PARTITION_KEY})"
+)
+sqlalchemy.event.listen(adv_table, "after_create", partitioning.create_initial_partitions)
+
+idempotency_key_table = Table(
+    "idempotency_key",
+    mapper.metadata,
+    Column("key", String(400), primary_key=True),
+    Column("request_hash", String(64), nullable=False),
+    Column("status_code", Integer),
+    Column("response", LargeBinary),
     Column("creation_date", DateTime, server_default=func.now()),
-    Column("user_id", Integer, ForeignKey("user.id"), nullable=False)
+    Column("expires_at", DateTime, nullable=False, index=True)
 )
 
 
 def start_mapping():
+    if sqlalchemy.inspect(app.domain.models.User, raiseerr=False) is not None:
+        return
+    # The version is incremented by the domain (services.update_instance); the mapper checks it on UPDATE and DELETE
+    # ("WHERE version = <loaded version>"), so a row changed by a concurrent transaction is not overwritten.
     mapper.map_imperatively(
         class_=app.domain.models.User, local_table=user_table, properties={
             "adv": relationship(
                 app.domain.models.Advertisement, backref="user", order_by=adv_table.c.id, cascade="delete"
             )
-        }
+        },
+        version_id_col=user_table.c.version, version_id_generator=False
+    )
+    mapper.map_imperatively(
+        class_=app.domain.models.Advertisement, local_table=adv_table, primary_key=[adv_table.c.id],
+        version_id_col=adv_table.c.version, version_id_generator=False
     )
-    mapper.map_imperatively(class_=app.domain.models.Advertisement, local_table=adv_table)
+    mapper.map_imperatively(class_=app.domain.models.IdempotencyRecord, local_table=idempotency_key_table)
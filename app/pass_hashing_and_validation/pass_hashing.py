@@ -1,9 +1,9 @@
 import bcrypt
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int = 12) -> str:
     password = password.encode()
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds)
     return bcrypt.hashpw(password=password, salt=salt).decode()
 
 
@@ -1,61 +1,129 @@
 import pydantic
-from typing import TypeVar, Type
+from typing import Literal, Type
+from typing_extensions import Annotated, TypedDict, NotRequired
 
 import app.domain.errors
+from app.monitoring import timing
 
 
-PydanticModel = TypeVar("PydanticModel", bound=pydantic.BaseModel)
-
-
-class CreateUser(pydantic.BaseModel):
+class CreateUser(TypedDict):
     name: str
     email: str
     password: str
 
 
-class UpdateUser(pydantic.BaseModel):
-    name: str | None = None
-    email: str | None = None
-    password: str | None = None
+class UpdateUser(TypedDict):
+    name: NotRequired[str | None]
+    email: NotRequired[str | None]
+    password: NotRequired[str | None]
 
 
-class CreateAdv(pydantic.BaseModel):
+class CreateAdv(TypedDict):
     title: str
     description: str
 
 
-class EditAdv(pydantic.BaseModel):
-    title: str | None = None
-    description: str | None = None
+class EditAdv(TypedDict):
+    title: NotRequired[str | None]
+    description: NotRequired[str | None]
 
 
-class Login(pydantic.BaseModel):
+class Login(TypedDict):
     email: str
     password: str
 
 
-def validate_data(validation_model: Type[PydanticModel], data: dict[str, str]):
+class CreateAdvOperation(TypedDict):
+    op: Literal["create_adv"]
+    params: dict
+
+
+class UpdateAdvOperation(TypedDict):
+    op: Literal["update_adv"]
+    adv_id: pydantic.PositiveInt
+    params: dict
+    version: NotRequired[pydantic.PositiveInt]
+
+
+class DeleteAdvOperation(TypedDict):
+    op: Literal["delete_adv"]
+    adv_id: pydantic.PositiveInt
+
+
+BatchOperation = Annotated[
+    CreateAdvOperation | UpdateAdvOperation | DeleteAdvOperation, pydantic.Field(discriminator="op")
+]
+
+
+class Batch(TypedDict):
+    operations: Annotated[list[BatchOperation], pydantic.Field(min_length=1)]
+    atomic: NotRequired[bool]
+
+
+# Validators are compiled once at import. A TypedDict validator returns a plain dict with the provided keys only,
+# so no model instance has to be created and dumped afterwards.
+type_adapters: dict[type, pydantic.TypeAdapter] = {
+    validation_model: pydantic.TypeAdapter(validation_model)
+    for validation_model in (CreateUser, UpdateUser, CreateAdv, EditAdv, Login, Batch)
+}
+ids_type_adapter = pydantic.TypeAdapter(Annotated[list[pydantic.PositiveInt], pydantic.Field(min_length=1)])
+
+
+@timing.timed("validation")
+def validate_data(validation_model: Type[TypedDict], data: bytes | str | dict[str, str]) -> dict[str, str]:
+    """
+    Validates raw JSON (``bytes`` or ``str``) directly, without parsing it into an intermediate dict, or an
+    already parsed dict.
+    """
+    type_adapter: pydantic.TypeAdapter = type_adapters[validation_model]
     try:
-        return validation_model.model_validate(data).model_dump(exclude_unset=True)
+        if isinstance(data, (bytes, str)):
+            return type_adapter.validate_json(data)
+        return type_adapter.validate_python(data)
     except pydantic.ValidationError as e:
         raise app.domain.errors.ValidationError(e.errors())
 
 
-def validate_login_credentials(**credentials):
-    return validate_data(validation_model=Login, data={**credentials})
+def validate_login_credentials(credentials: bytes | str | dict[str, str]):
+    return validate_data(validation_model=Login, data=credentials)
+
+
+def validate_data_for_user_creation(user_data: bytes | str | dict[str, str]):
+    return validate_data(validation_model=CreateUser, data=user_data)
 
 
-def validate_data_for_user_creation(**user_data):
-    return validate_data(validation_model=CreateUser, data={**user_data})
+def validate_data_for_user_updating(user_data: bytes | str | dict[str, str]):
+    return validate_data(validation_model=UpdateUser, data=user_data)
 
 
-def validate_data_for_user_updating(**user_data):
-    return validate_data(validation_model=UpdateUser, data={**user_data})
+def validate_data_for_adv_creation(adv_params: bytes | str | dict[str, str]):
+    return validate_data(validation_model=CreateAdv, data=adv_params)
 
 
-def validate_data_for_adv_creation(**adv_params):
-    return validate_data(validation_model=CreateAdv, data={**adv_params})
+def validate_data_for_adv_updating(adv_params: bytes | str | dict[str, str]):
+    return validate_data(validation_model=EditAdv, data=adv_params)
+
+
+def validate_ids(ids: str, max_count: int) -> list[int]:
+    """
+    Validates a comma-separated list of ids (e.g. a query parameter) and returns the unique ids in the given order.
+    A list longer than ``max_count`` is rejected before its items are validated.
+    """
+    raw_ids: list[str] = list(dict.fromkeys(ids.split(","))) if ids else []
+    if len(raw_ids) > max_count:
+        raise app.domain.errors.ValidationError(f"At most {max_count} ids can be requested at once.")
+    try:
+        validated_ids: list[int] = ids_type_adapter.validate_python(raw_ids)
+    except pydantic.ValidationError as e:
+        raise app.domain.errors.ValidationError(e.errors())
+    return list(dict.fromkeys(validated_ids))
 
 
-def validate_data_for_adv_updating(**adv_params):
-    return validate_data(validation_model=EditAdv, data={**adv_params})
+def validate_batch(batch: bytes | str | dict, max_count: int) -> dict:
+    """
+    Validates the envelope of a batch of operations; the params of each operation are validated when it is run.
+    """
+    validated_batch: dict = validate_data(validation_model=Batch, data=batch)
+    if len(validated_batch["operations"]) > max_count:
+        raise app.domain.errors.ValidationError(f"At most {max_count} operations can be run at once.")
+    return validated_batch
@@ -3,13 +3,15 @@ import enum
 
 import sqlalchemy
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Type, Literal, Any, Optional
 
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Query
 
 import app.domain.errors
 from app.domain import services
+from app.monitoring import timing
 from app.domain.models import AdvertisementColumns, UserColumns, ModelClass, User, Advertisement, ModelClasses
 
 
@@ -29,6 +31,38 @@ class Comparison(str, enum.Enum):
     GT = ">"
     GE = ">="
     LE = "<="
+    IN = "in"
+    NOT_IN = "not_in"
+    BETWEEN = "between"
+    BETWEEN_HALF_OPEN = "between_half_open"
+
+
+SET_COMPARISONS = (Comparison.IN, Comparison.NOT_IN)
+RANGE_COMPARISONS = (Comparison.BETWEEN, Comparison.BETWEEN_HALF_OPEN)
+ID_COLUMNS = (UserColumns.ID, AdvertisementColumns.ID, AdvertisementColumns.USER_ID)
+DATE_COLUMNS = (UserColumns.CREATION_DATE, AdvertisementColumns.CREATION_DATE)
+TEXT_COLUMNS = (UserColumns.NAME, UserColumns.EMAIL, AdvertisementColumns.TITLE, AdvertisementColumns.DESCRIPTION)
+TEXT_COLUMN_COMPARISONS = [Comparison.IS.value, Comparison.NOT.value, Comparison.IN.value, Comparison.NOT_IN.value]
+
+
+def split_values(column_value: Any) -> list:
+    """
+    Returns the values of ``in``, ``not_in`` and ``between`` comparisons, passed either as a list or as
+    a comma-separated string, e.g. ``"1,2,3"`` or ``"2024-01-01,2024-02-01"``.
+    """
+    if isinstance(column_value, (list, tuple)):
+        return list(column_value)
+    if isinstance(column_value, str):
+        return [value.strip() for value in column_value.split(",")]
+    return [column_value]
+
+
+def parse_value(column: str, value: Any) -> Any:
+    if column in ID_COLUMNS:
+        return int(value)
+    if column in DATE_COLUMNS:
+        return value if isinstance(value, datetime) else datetime.strptime(value, "%Y-%m-%d")
+    return value
 
 
 class Params(str, enum.Enum):
@@ -94,7 +128,14 @@ class Filter:
                             "<": {"apply": "__lt__", "explain": "Less than"},
                             "<=": {"apply": "__le__", "explain": "Less than or equal to"},
                             ">": {"apply": "__gt__", "explain": "Greater than"},
-                            ">=": {"apply": "__ge__", "explain": "Greater than or equal to"}}
+                            ">=": {"apply": "__ge__", "explain": "Greater than or equal to"},
+                            "in": {"apply": "in_", "explain": "Equal to one of the comma-separated values"},
+                            "not_in": {"apply": "not_in", "explain": "Equal to none of the comma-separated values"},
+                            "between": {"apply": "between",
+                                        "explain": "Between two comma-separated values, both included"},
+                            "between_half_open": {"apply": "between",
+                                                  "explain": "Between two comma-separated values, the lower one "
+                                                             "included and the upper one excluded"}}
         self.query_filtered: Optional[Query] = None
         self.res_list: Optional[list] = None
         self.paginated: Optional[dict] = None
@@ -115,6 +156,7 @@ class Filter:
             }
         )
 
+    @timing.timed("filter_validation")
     def _validate_params(self, data: dict[str, Any], params: Type[Params]) -> None:
         self.params_info.params_passed = data
         params_dict = {}
@@ -139,9 +181,20 @@ class Filter:
                             param_name: f'Valid values are: {self.params_info.valid_params[param_name]}'
                         }
                     )
+        if params_dict.get(Params.FILTER_TYPE.value) == FilterTypes.COLUMN_VALUE and \
+                params_dict.get(Params.COMPARISON.value) in SET_COMPARISONS + RANGE_COMPARISONS:
+            values_error: Optional[str] = self._validate_values(
+                column=params_dict.get(Params.COLUMN.value), column_value=params_dict.get(Params.COLUMN_VALUE.value),
+                comparison=params_dict.get(Params.COMPARISON.value)
+            )
+            if values_error is not None:
+                self.params_info.add_error_info(
+                    info_type=ErrType.INVALID.value, info={Params.COLUMN_VALUE.value: values_error}
+                )
         match params_dict:
-            case {Params.COLUMN.value: c, Params.COLUMN_VALUE.value: cv, Params.FILTER_TYPE.value: ft} if \
-              ft == FilterTypes.COLUMN_VALUE and \
+            case {Params.COLUMN.value: c, Params.COLUMN_VALUE.value: cv, Params.FILTER_TYPE.value: ft,
+                  Params.COMPARISON.value: cmp} if \
+              ft == FilterTypes.COLUMN_VALUE and cmp not in SET_COMPARISONS + RANGE_COMPARISONS and \
               c in [UserColumns.ID, AdvertisementColumns.ID, AdvertisementColumns.USER_ID] and \
               (isinstance(cv, str) and not cv.isdigit() and not isinstance(cv, int)):
                 self.params_info.add_error_info(
@@ -149,9 +202,10 @@ class Filter:
                     info={Params.COLUMN_VALUE.value: f'When "{Params.COLUMN.value}" is "{c}", '
                                                      f'"{Params.COLUMN_VALUE.value}" must be a digit.'}
                 )
-            case {Params.COLUMN.value: c, Params.COLUMN_VALUE.value: cv, Params.FILTER_TYPE: ft} if \
+            case {Params.COLUMN.value: c, Params.COLUMN_VALUE.value: cv, Params.FILTER_TYPE: ft,
+                  Params.COMPARISON.value: cmp} if \
                     c in [UserColumns.CREATION_DATE, AdvertisementColumns.CREATION_DATE] and \
-                    ft == FilterTypes.COLUMN_VALUE:
+                    ft == FilterTypes.COLUMN_VALUE and cmp not in SET_COMPARISONS + RANGE_COMPARISONS:
                 try:
                     datetime.strptime(cv, "%Y-%m-%d")
                 except (ValueError, TypeError):
@@ -164,15 +218,15 @@ class Filter:
                         }
                     )
             case {Params.FILTER_TYPE: Params.COLUMN_VALUE, Params.COLUMN: c, Params.COMPARISON: cmp} if \
-                    cmp in [Comparison.LE, Comparison.LT, Comparison.GE, Comparison.GT] and c in \
-                    [UserColumns.NAME, UserColumns.EMAIL, AdvertisementColumns.TITLE, AdvertisementColumns.DESCRIPTION]:
+                    cmp in [Comparison.LE, Comparison.LT, Comparison.GE, Comparison.GT, *RANGE_COMPARISONS] and \
+                    c in TEXT_COLUMNS:
                 self.params_info.add_error_info(
                     info_type=ErrType.INVALID.value,
                     info={
                         Params.COMPARISON.value: f'When "{Params.FILTER_TYPE.value}" is "{Params.COLUMN_VALUE.value}" '
                                                  f'and "{Params.COLUMN.value}" is "{c}",'
                                                  f' valid values for "{Params.COMPARISON.value}" are: '
-                                                 f'{[Comparison.IS.value, Comparison.NOT.value]}.'
+                                                 f'{TEXT_COLUMN_COMPARISONS}.'
                     }
                 )
             case {Params.FILTER_TYPE: FilterTypes.SEARCH_TEXT, Params.COLUMN: c, Params.MODEL_CLASS: mc} if c not in \
@@ -200,6 +254,36 @@ class Filter:
         if self.params_info.logs:
             raise app.domain.errors.ValidationError(message=self.params_info.create_message())
 
+    @staticmethod
+    def _validate_values(column: Any, column_value: Any, comparison: Comparison) -> Optional[str]:
+        """
+        Returns the error in the values of an ``in``, ``not_in`` or ``between`` comparison, if any.
+        """
+        values: list = split_values(column_value)
+        if column_value is None or not values or any(value in (None, "") for value in values):
+            return f'When "{Params.COMPARISON.value}" is "{comparison}", "{Params.COLUMN_VALUE.value}" must be ' \
+                   f'a comma-separated list of values.'
+        if comparison in RANGE_COMPARISONS and len(values) != 2:
+            return f'When "{Params.COMPARISON.value}" is "{comparison}", "{Params.COLUMN_VALUE.value}" must be ' \
+                   f'two comma-separated values: the lower and the upper bound.'
+        if column in ID_COLUMNS and not all(
+                isinstance(value, int) or (isinstance(value, str) and value.isdigit()) for value in values
+        ):
+            return f'When "{Params.COLUMN.value}" is "{column}", "{Params.COLUMN_VALUE.value}" must be ' \
+                   f'comma-separated digits.'
+        if column in DATE_COLUMNS:
+            try:
+                values = [parse_value(column=column, value=value) for value in values]
+            except (ValueError, TypeError):
+                return f'When "{Params.COLUMN.value}" is "{column}", "{Params.COLUMN_VALUE.value}" must be ' \
+                       f'comma-separated date strings of the following format: "YYYY-MM-DD".'
+        if comparison in RANGE_COMPARISONS and column in ID_COLUMNS + DATE_COLUMNS:
+            lower, upper = (parse_value(column=column, value=value) for value in values)
+            if lower > upper:
+                return f'When "{Params.COMPARISON.value}" is "{comparison}", the lower bound in ' \
+                       f'"{Params.COLUMN_VALUE.value}" must not be greater than the upper one.'
+        return None
+
     def _check_page_and_per_page(self, page: Any, per_page: Any) -> dict[Literal["page", "per_page"], int]:
         params_dict = {"page": page, "per_page": per_page}
         for key, value in params_dict.items():
@@ -216,6 +300,59 @@ class Filter:
                     else: params_dict[key] = self.per_page_default_value
         return params_dict
 
+    @staticmethod
+    def _values_condition(model_attr, column: str, column_value: Any,
+                          comparison: Comparison) -> sqlalchemy.ColumnElement[bool]:
+        """
+        Builds the condition of an ``in``, ``not_in`` or ``between`` comparison so that an index on the column can
+        serve it: a set is bound as one array parameter (``= ANY(:values)``) whatever its length, and dates are
+        compared as ranges of the column itself instead of its value cast to a date.
+        """
+        values: list = [parse_value(column=column, value=value) for value in split_values(column_value)]
+        if column in DATE_COLUMNS:
+            day = timedelta(days=1)
+            if comparison in SET_COMPARISONS:
+                days = sqlalchemy.or_(*(sqlalchemy.and_(model_attr >= value, model_attr < value + day)
+                                        for value in values))
+                return days if comparison == Comparison.IN else sqlalchemy.not_(days)
+            lower, upper = values
+            return sqlalchemy.and_(
+                model_attr >= lower, model_attr < (upper + day if comparison == Comparison.BETWEEN else upper)
+            )
+        if comparison in SET_COMPARISONS:
+            array = sqlalchemy.literal(values, type_=postgresql.ARRAY(model_attr.type))
+            if comparison == Comparison.IN:
+                return model_attr == sqlalchemy.any_(array)
+            return model_attr != sqlalchemy.all_(array)
+        lower, upper = values
+        if comparison == Comparison.BETWEEN:
+            return model_attr.between(lower, upper)
+        return sqlalchemy.and_(model_attr >= lower, model_attr < upper)
+
+    @staticmethod
+    def _date_condition(model_attr, column: str, column_value: Any,
+                        comparison: Comparison) -> sqlalchemy.ColumnElement[bool]:
+        """
+        Builds the condition of a comparison with a day as a range of the column itself (e.g. ``is`` is
+        ``>= day AND < next day``) instead of comparing its value cast to a date: the column is the partition key
+        of the advertisements, so the planner scans the partitions of the matching months only, and its index
+        serves the condition.
+        """
+        day: datetime = parse_value(column=column, value=column_value)
+        next_day: datetime = day + timedelta(days=1)
+        match comparison:
+            case Comparison.IS:
+                return sqlalchemy.and_(model_attr >= day, model_attr < next_day)
+            case Comparison.NOT:
+                return sqlalchemy.or_(model_attr < day, model_attr >= next_day)
+            case Comparison.LT:
+                return model_attr < day
+            case Comparison.LE:
+                return model_attr < next_day
+            case Comparison.GT:
+                return model_attr >= next_day
+        return model_attr >= day
+
     def get_filter_result(self,
                           model_class: Optional[Type[User | Advertisement]] = None,
                           filter_type: Optional[FilterTypes] = None,
@@ -234,14 +371,17 @@ class Filter:
         model_attr = getattr(model_class, column, None)
         if filter_type == FilterTypes.SEARCH_TEXT:
             self.query_filtered = query.filter(model_attr.ilike(f'%{column_value}%'))
+        elif comparison in SET_COMPARISONS + RANGE_COMPARISONS:
+            self.query_filtered = query.filter(self._values_condition(
+                model_attr=model_attr, column=column, column_value=column_value, comparison=comparison
+            ))
+        elif column in DATE_COLUMNS:
+            self.query_filtered = query.filter(self._date_condition(
+                model_attr=model_attr, column=column, column_value=column_value, comparison=comparison
+            ))
         else:
             comparison_operator = getattr(sqlalchemy.sql.expression.ColumnOperators,
                                           self._comparison.get(comparison)["apply"])
-            if column == "creation_date":
-                self.query_filtered = query.filter(
-                    comparison_operator(model_class.creation_date.cast(sqlalchemy.Date),  # type: ignore
-                                        datetime.strptime(column_value, "%Y-%m-%d"))
-                )
             self.query_filtered = query.filter(comparison_operator(model_attr, column_value))
         if paginate:
             page_and_per_page = self._check_page_and_per_page(page=page, per_page=per_page)
@@ -1,11 +1,14 @@
 from datetime import datetime
-from typing import Any, Protocol, Optional
+from typing import Any, Iterator, Protocol, Optional
 
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import IntegrityError
 
 import app.domain.errors
 import app.service_layer.app_manager
-from app.domain.models import User, Advertisement, UserColumns, AdvertisementColumns
+from app.domain.models import User, Advertisement, IdempotencyRecord, UserColumns, AdvertisementColumns
+from app.monitoring import timing
 from app.repository import filtering
 from app.repository.filtering import FilterTypes, Comparison
 
@@ -21,6 +24,19 @@ class RepoProto(Protocol):
     def get(self, instance_id: int) -> Any:
         pass
 
+    def get_columns(self, instance_id: int, columns: list[str]) -> Optional[dict[str, Any]]:
+        pass
+
+    def get_many(self, instance_ids: list[int]) -> list:
+        pass
+
+    def stream_columns(self, column: str, column_value: Any, columns: list[str],
+                       batch_size: int) -> Iterator[dict[str, Any]]:
+        pass
+
+    def count(self, column: str, column_value: Any) -> int:
+        pass
+
     def get_list_or_paginated_data(self,
                                    filter_type: FilterTypes,
                                    comparison: Comparison,
@@ -46,9 +62,62 @@ class Repository:
         except IntegrityError:
             raise app.domain.errors.AlreadyExistsError
 
+    @timing.timed("repository")
     def get(self, instance_id: int) -> Any:
         return self.session.get(self.model_cl, instance_id)
 
+    @timing.timed("repository")
+    def get_columns(self, instance_id: int, columns: list[str]) -> Optional[dict[str, Any]]:
+        """
+        Returns values of the given columns of the instance without loading the instance itself.
+        """
+        row = self.session.execute(
+            sqlalchemy.select(*[getattr(self.model_cl, column) for column in columns])
+            .where(self.model_cl.id == instance_id)  # type: ignore
+        ).first()
+        if row is None:
+            return None
+        return row._asdict()
+
+    @timing.timed("repository")
+    def get_many(self, instance_ids: list[int]) -> list:
+        """
+        Returns the instances with the given ids (in no particular order) with one ``id = ANY(:ids)`` query, whose
+        text does not depend on the number of ids.
+        """
+        ids_param = sqlalchemy.bindparam("ids", value=list(instance_ids), type_=postgresql.ARRAY(sqlalchemy.Integer))
+        return list(self.session.scalars(
+            sqlalchemy.select(self.model_cl).where(self.model_cl.id == sqlalchemy.any_(ids_param))  # type: ignore
+        ))
+
+    def stream_columns(self, column: str, column_value: Any, columns: list[str],
+                       batch_size: int) -> Iterator[dict[str, Any]]:
+        """
+        Yields the given columns of the instances whose ``column`` equals ``column_value``, ordered by id. Rows are
+        fetched ``batch_size`` at a time from a server-side cursor and no instances are created, so the memory used
+        does not depend on the number of rows.
+        """
+        result = self.session.execute(
+            sqlalchemy.select(*[getattr(self.model_cl, name) for name in columns])
+            .where(getattr(self.model_cl, column) == column_value)
+            .order_by(self.model_cl.id),  # type: ignore
+            execution_options={"yield_per": batch_size}
+        )
+        for rows in result.partitions():
+            for row in rows:
+                yield row._asdict()
+
+    @timing.timed("repository")
+    def count(self, column: str, column_value: Any) -> int:
+        """
+        Returns the number of the instances whose ``column`` equals ``column_value``.
+        """
+        return self.session.scalar(
+            sqlalchemy.select(sqlalchemy.func.count()).select_from(self.model_cl)
+            .where(getattr(self.model_cl, column) == column_value)
+        )
+
+    @timing.timed("repository")
     def get_list_or_paginated_data(self,
                                    filter_type: FilterTypes,
                                    comparison: Comparison,
@@ -83,3 +152,39 @@ class AdvRepository(Repository):
     def __init__(self, session):
         super().__init__(session=session)
         self.model_cl = Advertisement
+
+
+class IdempotencyKeyRepository(Repository):
+    def __init__(self, session):
+        super().__init__(session=session)
+        self.model_cl = IdempotencyRecord
+
+    @timing.timed("repository")
+    def delete_expired(self, now: datetime, limit: int) -> int:
+        """
+        Deletes at most ``limit`` records expired by ``now`` and returns their number. Records locked by a concurrent
+        sweep are skipped instead of waited for.
+        """
+        expired_keys = sqlalchemy.select(IdempotencyRecord.key).where(
+            IdempotencyRecord.expires_at <= now  # type: ignore
+        ).limit(limit).with_for_update(skip_locked=True)
+        result = self.session.execute(
+            sqlalchemy.delete(IdempotencyRecord).where(IdempotencyRecord.key.in_(expired_keys)),  # type: ignore
+            execution_options={"synchronize_session": False}
+        )
+        return result.rowcount
+
+    @timing.timed("repository")
+    def reclaim_expired(self, key: str, request_hash: str, now: datetime, expires_at: datetime) -> bool:
+        """
+        Takes the record of ``key`` for a new request if it is expired by ``now``, with one conditional UPDATE,
+        and returns whether it was taken. Of concurrent requests reclaiming the same record only one updates it:
+        the others wait for its row lock and then find the record no longer expired.
+        """
+        result = self.session.execute(
+            sqlalchemy.update(IdempotencyRecord).where(
+                IdempotencyRecord.key == key, IdempotencyRecord.expires_at <= now  # type: ignore
+            ).values(request_hash=request_hash, expires_at=expires_at, status_code=None, response=None),
+            execution_options={"synchronize_session": False}
+        )
+        return result.rowcount == 1
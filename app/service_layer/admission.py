@@ -0,0 +1,68 @@
+import enum
+import threading
+
+import app.domain.errors
+
+
+class Priority(enum.IntEnum):
+    LOW = 0  # anonymous requests, e.g. searches
+    NORMAL = 1  # authenticated reads
+    HIGH = 2  # authenticated writes
+
+
+class AdmissionController:
+    """
+    Limits the requests processed concurrently by a worker process, per route (``route_limits``, otherwise
+    ``default_limit``) and in total (``max_in_flight``). A request waits for a free slot of its route for at most
+    the queue time of its priority, less the time it has already spent queued upstream (e.g. in the server
+    backlog), and is shed with ``OverloadedError`` otherwise. Low priority requests may take only
+    ``low_priority_share`` of the total slots, the rest is kept for authenticated requests.
+    """
+    def __init__(
+            self, route_limits: dict[str, int], default_limit: int, max_in_flight: int, low_priority_share: float,
+            max_queue_times: dict[Priority, float], retry_after: int = 1
+    ):
+        self.route_limits = route_limits
+        self.default_limit = default_limit
+        self.max_in_flight = max_in_flight
+        self.low_priority_share = low_priority_share
+        self.max_queue_times = max_queue_times
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, route: str) -> threading.BoundedSemaphore:
+        semaphore = self._semaphores.get(route)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._semaphores.setdefault(
+                    route, threading.BoundedSemaphore(self.route_limits.get(route, self.default_limit))
+                )
+        return semaphore
+
+    def _shed(self) -> None:
+        raise app.domain.errors.OverloadedError(retry_after=self.retry_after)
+
+    def admit(self, route: str, priority: Priority, queued_for: float = 0.0) -> None:
+        """
+        Takes a slot of the route for the request or raises ``OverloadedError``. An admitted request must call
+        ``release()`` when it is finished.
+        """
+        queue_time: float = self.max_queue_times[priority] - queued_for
+        if queue_time < 0:
+            self._shed()
+        capacity = self.max_in_flight if priority > Priority.LOW else int(self.max_in_flight * self.low_priority_share)
+        with self._lock:
+            if self.in_flight >= capacity:
+                self._shed()
+            self.in_flight += 1
+        if not self._semaphore(route).acquire(timeout=queue_time):
+            with self._lock:
+                self.in_flight -= 1
+            self._shed()
+
+    def release(self, route: str) -> None:
+        self._semaphore(route).release()
+        with self._lock:
+            self.in_flight -= 1
@@ -1,12 +1,15 @@
 from datetime import datetime
-from typing import Callable, Optional
+from typing import Callable, Iterator, Optional
 
 from app.domain import errors, services, models
+from app.monitoring.operations import operation
 from app.repository.filtering import FilterTypes, UserColumns, AdvertisementColumns, Comparison
+from app.service_layer import deadlines
 
 
-def create_user(user_data: dict[str, str], validate_func: Callable, hash_pass_func: Callable, uow):
-    validated_data = validate_func(**user_data)
+@operation
+def create_user(user_data: bytes | dict[str, str], validate_func: Callable, hash_pass_func: Callable, uow):
+    validated_data = validate_func(user_data)
     validated_data["password"] = hash_pass_func(password=validated_data["password"])
     user = services.create_user(**validated_data)
     with uow:
@@ -16,26 +19,58 @@ def create_user(user_data: dict[str, str], validate_func: Callable, hash_pass_fu
         return user_id
 
 
-def get_user_data(user_id: int, check_current_user_func: Callable, uow):
+def _get_user(user_id: int, check_current_user_func: Callable, uow) -> models.User:
     current_user_id: int = check_current_user_func(user_id=user_id, get_cuid=True)
     with uow:
-        user = uow.users.get(current_user_id)
-    user_params: dict[str, str | int] = services.get_params(model=user)
-    if user_params:
-        return user_params
-    raise errors.NotFoundError(message_prefix="The user")
+        user: Optional[models.User] = uow.users.get(current_user_id)
+    if not user:
+        raise errors.NotFoundError(message_prefix="The user")
+    return user
+
+
+@operation
+def get_user_data(user_id: int, check_current_user_func: Callable, uow):
+    user: models.User = _get_user(user_id=user_id, check_current_user_func=check_current_user_func, uow=uow)
+    return services.get_params(model=user)
+
 
+@operation
+def get_user_data_with_version(user_id: int, check_current_user_func: Callable, uow) -> tuple[dict, int]:
+    """
+    Returns the params of the user and its version, loaded with one query.
+    """
+    user: models.User = _get_user(user_id=user_id, check_current_user_func=check_current_user_func, uow=uow)
+    return services.get_params(model=user), user.version
 
 
 
+
+@operation
+def get_user_version(user_id: int, check_current_user_func: Callable, uow) -> int:
+    current_user_id: int = check_current_user_func(user_id=user_id, get_cuid=True)
+    with uow:
+        user_columns: Optional[dict] = uow.users.get_columns(instance_id=current_user_id, columns=["version"])
+    if user_columns:
+        return user_columns["version"]
+    raise errors.NotFoundError(message_prefix="The user")
+
+
+@operation
 def update_user(user_id: int, check_current_user_func: Callable, validate_func: Callable,
-                hash_pass_func: Callable, new_data: dict[str, str], uow) -> dict:
+                hash_pass_func: Callable, new_data: bytes | dict[str, str], uow,
+                expected_version: Optional[int] = None) -> dict:
+    """
+    Updates the user. If ``expected_version`` (e.g. from ``If-Match``) is given and the user has another version,
+    raises ``ConflictError``; so does a concurrent update committed after the user was loaded.
+    """
     curent_user_id: int = check_current_user_func(user_id=user_id)
-    validated_data: dict[str, str] = validate_func(**new_data)
+    validated_data: dict[str, str] = validate_func(new_data)
     if validated_data.get("password"):
         validated_data["password"] = hash_pass_func(password=validated_data["password"])
     with uow:
         current_user: models.User = uow.users.get(instance_id=curent_user_id)
+        if expected_version is not None and current_user.version != expected_version:
+            raise errors.ConflictError
         updated_user = services.update_instance(instance=current_user, new_attrs=validated_data)
         uow.users.add(updated_user)
         uow.commit()
@@ -43,6 +78,7 @@ def update_user(user_id: int, check_current_user_func: Callable, validate_func:
         return updated_user_params
 
 
+@operation
 def delete_user(user_id: int, check_current_user_func: Callable, uow) -> dict[str, str | int]:
     current_user_id: int = check_current_user_func(user_id=user_id)
     with uow:
@@ -57,6 +93,7 @@ def delete_user(user_id: int, check_current_user_func: Callable, uow) -> dict[st
 
 
 
+@operation
 def get_related_advs(
         authenticated_user_id: int, check_current_user_func: Callable, uow, page: Optional[int] = None,
         per_page: Optional[int] = None
@@ -73,9 +110,49 @@ def get_related_advs(
     raise errors.NotFoundError(base_message="The related advertisements are not found.")
 
 
-def create_adv(get_auth_user_id_func: Callable, validate_func: Callable, adv_params: dict[str, str | int], uow) -> int:
+ADV_EXPORT_COLUMNS = ["id", "title", "description", "creation_date", "user_id"]
+
+
+@operation
+def export_related_advs(
+        user_id: int, check_current_user_func: Callable, uow, batch_size: int = 1000, max_rows: Optional[int] = None
+) -> Iterator[dict[str, str | int]]:
+    """
+    Checks that the current user is ``user_id`` and returns an iterator over the params of the user's
+    advertisements. They are read lazily, ``batch_size`` at a time, while the iterator is consumed.
+
+    Raises ``DeadlineExceededError`` if the user has more than ``max_rows`` advertisements, which cannot be exported
+    before the deadline of the request; the iterator raises it if the deadline is exceeded during the export.
+    """
+    current_user_id: int = check_current_user_func(user_id=user_id)
+    if max_rows is not None:
+        with uow:
+            rows: int = uow.advs.count(column=AdvertisementColumns.USER_ID, column_value=current_user_id)
+        if rows > max_rows:
+            raise errors.DeadlineExceededError(
+                message=f"{rows} advertisements cannot be exported in time; at most {max_rows} can be."
+            )
+    return _iter_advs_params(user_id=current_user_id, uow=uow, batch_size=batch_size)
+
+
+def _iter_advs_params(user_id: int, uow, batch_size: int) -> Iterator[dict[str, str | int]]:
+    with uow:
+        for number, adv_params in enumerate(uow.advs.stream_columns(
+                column=AdvertisementColumns.USER_ID, column_value=user_id, columns=ADV_EXPORT_COLUMNS,
+                batch_size=batch_size
+        ), start=1):
+            if number % batch_size == 0:  # the time spent sending the rows is not limited by statement_timeout
+                deadlines.check_deadline()
+            adv_params["creation_date"] = adv_params["creation_date"].isoformat()
+            yield adv_params
+
+
+@operation
+def create_adv(
+        get_auth_user_id_func: Callable, validate_func: Callable, adv_params: bytes | dict[str, str | int], uow
+) -> int:
     authenticated_user_id: int = get_auth_user_id_func()
-    validated_data = validate_func(**adv_params)
+    validated_data = validate_func(adv_params)
     validated_data |= {"user_id": authenticated_user_id}
     adv = services.create_adv(**validated_data)
     with uow:
@@ -84,6 +161,7 @@ def create_adv(get_auth_user_id_func: Callable, validate_func: Callable, adv_par
         return adv.id
 
 
+@operation
 def search_advs_by_text(
         uow,
         column_value: str | int | datetime,
@@ -104,25 +182,84 @@ def search_advs_by_text(
     return paginated_res
 
 
+@operation
 def get_adv_params(adv_id: int, check_current_user_func: Callable, uow) -> dict[str, str | int]:
+    return services.get_params(model=_get_adv(adv_id=adv_id, check_current_user_func=check_current_user_func, uow=uow))
+
+
+@operation
+def get_adv_params_with_version(
+        adv_id: int, check_current_user_func: Callable, uow
+) -> tuple[dict[str, str | int], int]:
+    """
+    Returns the params of the advertisement and its version, loaded with one query.
+    """
+    adv: models.Advertisement = _get_adv(adv_id=adv_id, check_current_user_func=check_current_user_func, uow=uow)
+    return services.get_params(model=adv), adv.version
+
+
+def _get_adv(adv_id: int, check_current_user_func: Callable, uow) -> models.Advertisement:
     with uow:
-        adv: models.Advertisement = uow.advs.get(instance_id=adv_id)
-    try:
-        check_current_user_func(user_id=adv.user_id)
-        return services.get_params(model=adv)
-    except AttributeError:
+        adv: Optional[models.Advertisement] = uow.advs.get(instance_id=adv_id)
+    if not adv:
+        raise errors.NotFoundError(message_prefix="The advertisement")
+    check_current_user_func(user_id=adv.user_id)
+    return adv
+
+
+@operation
+def get_advs_params(
+        adv_ids: list[int], check_current_user_func: Callable, uow
+) -> dict[str, list[dict[str, str | int]] | list[int]]:
+    """
+    Returns the params of the advertisements with the given ids available to the current user ("found"), and the
+    ids of the advertisements which do not exist ("missing") or belong to other users ("forbidden").
+    """
+    with uow:
+        advs: list[models.Advertisement] = uow.advs.get_many(instance_ids=adv_ids)
+    advs_by_id: dict[int, models.Advertisement] = {adv.id: adv for adv in advs}
+    result: dict[str, list] = {"found": [], "missing": [], "forbidden": []}
+    for adv_id in adv_ids:
+        adv: Optional[models.Advertisement] = advs_by_id.get(adv_id)
+        if adv is None:
+            result["missing"].append(adv_id)
+            continue
+        try:
+            check_current_user_func(user_id=adv.user_id)
+        except errors.CurrentUserError:
+            result["forbidden"].append(adv_id)
+            continue
+        result["found"].append(services.get_params(model=adv))
+    return result
+
+
+@operation
+def get_adv_version(adv_id: int, check_current_user_func: Callable, uow) -> int:
+    with uow:
+        adv_columns: Optional[dict] = uow.advs.get_columns(instance_id=adv_id, columns=["user_id", "version"])
+    if not adv_columns:
         raise errors.NotFoundError(message_prefix="The advertisement")
+    check_current_user_func(user_id=adv_columns["user_id"])
+    return adv_columns["version"]
 
 
+@operation
 def update_adv(
-        adv_id: int, new_params: dict, check_current_user_func: Callable, validate_func: Callable, uow
+        adv_id: int, new_params: bytes | dict, check_current_user_func: Callable, validate_func: Callable, uow,
+        expected_version: Optional[int] = None
 ) -> dict[str, str | int]:
+    """
+    Updates the advertisement. If ``expected_version`` (e.g. from ``If-Match``) is given and the advertisement has
+    another version, raises ``ConflictError``; so does a concurrent update committed after it was loaded.
+    """
     with uow:
         adv: models.Advertisement = uow.advs.get(instance_id=adv_id)
         if not adv:
             raise errors.NotFoundError(message_prefix="The advertisement")
         check_current_user_func(user_id=adv.user_id)
-        validated_data: dict[str, str] = validate_func(**new_params)
+        if expected_version is not None and adv.version != expected_version:
+            raise errors.ConflictError
+        validated_data: dict[str, str] = validate_func(new_params)
         updated_adv: models.Advertisement = services.update_instance(instance=adv, new_attrs=validated_data)
         uow.advs.add(updated_adv)
         uow.commit()
@@ -130,6 +267,7 @@ def update_adv(
         return updated_adv_params
 
 
+@operation
 def delete_adv(adv_id: int, get_auth_user_id_func: Callable, uow) -> dict[str, str | int]:
     authenticated_user_id: int = get_auth_user_id_func()
     with uow:
@@ -145,19 +283,106 @@ def delete_adv(adv_id: int, get_auth_user_id_func: Callable, uow) -> dict[str, s
             raise errors.NotFoundError(message_prefix="The advertisement")
 
 
+@operation
 def jwt_auth(validate_func: Callable, check_pass_func: Callable[..., bool], grant_access_func: Callable,
-             credentials: dict, uow) -> str:
-    validated_data = validate_func(**credentials)
+             credentials: bytes | dict, uow, throttle_func: Optional[Callable] = None,
+             register_failure_func: Optional[Callable] = None, client_ip: Optional[str] = None) -> str:
+    validated_data = validate_func(credentials)
+    email: str = validated_data[UserColumns.EMAIL]
+    if throttle_func is not None:
+        throttle_func(email=email, client_ip=client_ip)
     with uow:
         list_of_users: list[models.User] = uow.users.get_list_or_paginated_data(
             filter_type=FilterTypes.COLUMN_VALUE, comparison=Comparison.IS, column=UserColumns.EMAIL,
-            column_value=validated_data[UserColumns.EMAIL]
+            column_value=email
         )
-    try:
-        user: models.User = list_of_users[0]
-    except IndexError:
-        raise errors.AccessDeniedError
+    if list_of_users and check_pass_func(password=validated_data["password"],
+                                         hashed_password=list_of_users[0].password):
+        access_token: str = grant_access_func(identity=list_of_users[0].id)
+        return access_token
+    if register_failure_func is not None:
+        register_failure_func(email=email, client_ip=client_ip)
+    raise errors.AccessDeniedError
     if check_pass_func(password=validated_data["password"], hashed_password=user.password):
         access_token: str = grant_access_func(identity=user.id)
         return access_token
     raise errors.AccessDeniedError
+
+
+# The errors of a batch operation reported in its result (instead of failing the request), with their HTTP status.
+BATCH_ERROR_STATUSES: dict[type[Exception], int] = {
+    errors.ValidationError: 400,
+    errors.CurrentUserError: 403,
+    errors.NotFoundError: 404,
+    errors.AlreadyExistsError: 409,
+    errors.ConflictError: 409,
+}
+BATCH_ERROR_DEFAULT_STATUS = 500
+
+
+def get_batch_error_status(error: Exception) -> int:
+    """
+    Returns the status of the nearest class of the error in ``BATCH_ERROR_STATUSES``, so that a subclass gets
+    the status of its base error.
+    """
+    for error_class in type(error).__mro__:
+        if error_class in BATCH_ERROR_STATUSES:
+            return BATCH_ERROR_STATUSES[error_class]
+    return BATCH_ERROR_DEFAULT_STATUS
+
+
+@operation
+def run_batch(operations: list[dict], get_auth_user_id_func: Callable, check_current_user_func: Callable,
+              validate_creation_func: Callable, validate_updating_func: Callable, uow,
+              atomic: bool = True) -> dict[str, bool | list[dict]]:
+    """
+    Runs the advertisement operations in the given order, each in a savepoint of one transaction committed once
+    at the end, and returns the result of every operation.
+
+    If ``atomic``, the first failed operation rolls back the whole batch ("rolled_back") and the next ones are not
+    run ("skipped"). Otherwise a failed operation is rolled back alone and the next ones are run.
+    """
+    results: list[dict] = []
+    with uow:
+        # Loads the advertisements to update or delete with one query, so that the operations find them in the
+        # session instead of querying them one by one. The list keeps them referenced: the session does not.
+        adv_ids: list[int] = [batch_op["adv_id"] for batch_op in operations if "adv_id" in batch_op]
+        loaded_advs: list[models.Advertisement] = uow.advs.get_many(instance_ids=adv_ids) if adv_ids else []
+        for index, batch_operation in enumerate(operations):
+            try:
+                with uow.savepoint():
+                    match batch_operation["op"]:
+                        case "create_adv":
+                            result = {"new_advertisement_id": create_adv(
+                                get_auth_user_id_func=get_auth_user_id_func, validate_func=validate_creation_func,
+                                adv_params=batch_operation["params"], uow=uow
+                            )}
+                        case "update_adv":
+                            result = {"updated_adv_params": update_adv(
+                                adv_id=batch_operation["adv_id"], new_params=batch_operation["params"],
+                                check_current_user_func=check_current_user_func,
+                                validate_func=validate_updating_func, uow=uow,
+                                expected_version=batch_operation.get("version")
+                            )}
+                        case "delete_adv":
+                            result = {"deleted_advertisement_params": delete_adv(
+                                adv_id=batch_operation["adv_id"], get_auth_user_id_func=get_auth_user_id_func,
+                                uow=uow
+                            )}
+                        case _:
+                            raise errors.ValidationError(f'Unknown operation "{batch_operation["op"]}".')
+            except tuple(BATCH_ERROR_STATUSES) as e:
+                results.append({"op": batch_operation["op"], "status": "failed", "error": e})
+                if atomic:
+                    uow.rollback()
+                    for done in results[:-1]:
+                        done["status"] = "rolled_back"
+                        done.pop("result")
+                    results.extend(
+                        {"op": skipped["op"], "status": "skipped"} for skipped in operations[index + 1:]
+                    )
+                    return {"committed": False, "results": results}
+                continue
+            results.append({"op": batch_operation["op"], "status": "ok", "result": result})
+        uow.commit()
+    return {"committed": True, "results": results}
@@ -0,0 +1,36 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+import app.domain.errors
+
+
+_current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+def set_deadline(timeout: float) -> Token:
+    """
+    Sets the deadline of the current request to ``timeout`` seconds from now. Database statements of the units
+    of work started before the deadline are cancelled when it is reached.
+    """
+    return _current_deadline.set(time.monotonic() + timeout)
+
+
+def reset_deadline(token: Token) -> None:
+    _current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    Returns the seconds left until the deadline (negative if it has passed) or ``None`` if no deadline is set.
+    """
+    deadline: Optional[float] = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    left: Optional[float] = remaining()
+    if left is not None and left <= 0:
+        raise app.domain.errors.DeadlineExceededError
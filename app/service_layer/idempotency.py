@@ -0,0 +1,92 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.domain import errors, models
+from app.monitoring.operations import operation
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    return hashlib.sha256(b"\n".join((method.encode(), path.encode(), body))).hexdigest()
+
+
+@operation
+def claim_key(key: str, request_hash: str, lock_timeout: int, uow,
+              now: Optional[datetime] = None) -> Optional[models.IdempotencyRecord]:
+    """
+    Returns the record of the completed request made with ``key``, whose response answers a retry. Otherwise
+    commits ``key`` as taken by the current request for ``lock_timeout`` seconds and returns ``None``; a key
+    taken by a request which never completed (e.g. its worker was killed) is released by the timeout. Of concurrent
+    requests claiming a new or an expired key only one takes it.
+
+    Raises ``IdempotencyKeyMismatchError`` if the key was used for a request with another method, path or body,
+    and ``RequestInProgressError`` if the request made with the key is not completed yet.
+    """
+    now = now or datetime.now()
+    with uow:
+        record: Optional[models.IdempotencyRecord] = uow.idempotency_keys.get(key)
+        if record is not None and record.expires_at > now:
+            if record.request_hash != request_hash:
+                raise errors.IdempotencyKeyMismatchError
+            if record.status_code is None:
+                raise errors.RequestInProgressError
+            return record
+        expires_at = now + timedelta(seconds=lock_timeout)
+        if record is None:
+            uow.idempotency_keys.add(models.IdempotencyRecord(key=key, request_hash=request_hash, expires_at=expires_at))
+        elif not uow.idempotency_keys.reclaim_expired(  # expired, but not swept yet
+                key=key, request_hash=request_hash, now=now, expires_at=expires_at
+        ):
+            raise errors.RequestInProgressError  # reclaimed by a concurrent request
+        try:
+            uow.commit()
+        except errors.AlreadyExistsError:  # taken by a concurrent request
+            raise errors.RequestInProgressError
+    return None
+
+
+@operation
+def save_response(key: str, status_code: int, response: bytes, ttl: int, uow, now: Optional[datetime] = None) -> None:
+    """
+    Stores the response of the request which took ``key``, to answer the retries made within ``ttl`` seconds.
+    The changes of the request which ``uow`` flushed but not committed yet (see ``UnitOfWork.savepoint()``)
+    are committed together with the response.
+    """
+    now = now or datetime.now()
+    with uow:
+        record: Optional[models.IdempotencyRecord] = uow.idempotency_keys.get(key)
+        if record is not None:
+            record.status_code, record.response = status_code, response
+            record.expires_at = now + timedelta(seconds=ttl)
+        uow.commit()
+
+
+@operation
+def release_key(key: str, uow) -> None:
+    """
+    Deletes the record of a request which failed, so that it can be retried with the same key.
+    """
+    with uow:
+        record: Optional[models.IdempotencyRecord] = uow.idempotency_keys.get(key)
+        if record is None:
+            return
+        uow.idempotency_keys.delete(record)
+        uow.commit()
+
+
+@operation
+def sweep_expired(uow, batch_size: int, max_batches: int, now: Optional[datetime] = None) -> int:
+    """
+    Deletes the expired records in batches of ``batch_size``, each committed separately, so that a sweep neither
+    holds locks on many rows nor runs a long transaction. Returns the number of deleted records.
+    """
+    now = now or datetime.now()
+    deleted = 0
+    for _ in range(max_batches):
+        with uow:
+            deleted_in_batch: int = uow.idempotency_keys.delete_expired(now=now, limit=batch_size)
+            uow.commit()
+        deleted += deleted_in_batch
+        if deleted_in_batch < batch_size:
+            break
+    return deleted
@@ -0,0 +1,151 @@
+import hashlib
+import math
+import multiprocessing
+import threading
+import time
+from typing import Protocol, Optional
+
+import app.domain.errors
+
+
+class ThrottleStoreProto(Protocol):
+    def hit(self, key: str, window: int, now: float) -> float:
+        """
+        Registers an attempt for ``key`` and returns the estimated number of attempts in the sliding window
+        of ``window`` seconds ending at ``now`` (the registered attempt included).
+        """
+        pass
+
+    def count(self, key: str, window: int, now: float) -> float:
+        """
+        Returns the estimated number of attempts for ``key`` in the sliding window of ``window`` seconds ending
+        at ``now`` without registering one.
+        """
+        pass
+
+
+def _sliding_count(window_idx: int, current: int, previous: int, window: int, now: float) -> float:
+    elapsed_share = (now - window_idx * window) / window
+    return previous * (1 - elapsed_share) + current
+
+
+class LocalThrottleStore:
+    """
+    Sliding window counters kept in the memory of the current process. Suitable for a single worker
+    and for tests; counters are not shared between worker processes.
+    """
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._counters: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, window: int, now: float) -> float:
+        window_idx = int(now // window)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                if len(self._counters) >= self.max_keys:
+                    self._purge(window_idx=window_idx)
+                counter = self._counters[key] = [window_idx, 0, 0]
+            _roll(counter=counter, window_idx=window_idx)
+            counter[1] += 1
+            return _sliding_count(window_idx, counter[1], counter[2], window, now)
+
+    def count(self, key: str, window: int, now: float) -> float:
+        window_idx = int(now // window)
+        with self._lock:
+            counter = list(self._counters.get(key, (window_idx, 0, 0)))
+        _roll(counter=counter, window_idx=window_idx)
+        return _sliding_count(window_idx, counter[1], counter[2], window, now)
+
+    def _purge(self, window_idx: int) -> None:
+        stale_keys = [key for key, counter in self._counters.items() if counter[0] < window_idx - 1]
+        for key in stale_keys:
+            del self._counters[key]
+        if len(self._counters) >= self.max_keys:
+            self._counters.clear()
+
+
+class SharedMemoryThrottleStore:
+    """
+    Sliding window counters kept in an anonymous shared memory block. The block and its lock must be created
+    in the master process before the workers are forked (e.g. with ``gunicorn --preload``), so that every
+    worker sees the same counters.
+
+    The table has a fixed number of slots addressed by a hash of the key. A slot occupied by another live key
+    is shared with it, which can only overestimate a counter, never underestimate it.
+    """
+    _fields = 4  # key fingerprint, window index, current window count, previous window count
+
+    def __init__(self, slots: int = 65_536):
+        self.slots = slots
+        self._table = multiprocessing.RawArray("q", slots * self._fields)
+        self._lock = multiprocessing.Lock()
+
+    def hit(self, key: str, window: int, now: float) -> float:
+        window_idx = int(now // window)
+        fingerprint, offset = self._locate(key)
+        table = self._table
+        with self._lock:
+            counter = [table[offset + 1], table[offset + 2], table[offset + 3]]
+            if table[offset] != fingerprint and counter[0] < window_idx - 1:
+                table[offset] = fingerprint
+                counter = [window_idx, 0, 0]
+            _roll(counter=counter, window_idx=window_idx)
+            counter[1] += 1
+            table[offset + 1], table[offset + 2], table[offset + 3] = counter
+        return _sliding_count(window_idx, counter[1], counter[2], window, now)
+
+    def count(self, key: str, window: int, now: float) -> float:
+        window_idx = int(now // window)
+        _, offset = self._locate(key)
+        table = self._table
+        with self._lock:
+            counter = [table[offset + 1], table[offset + 2], table[offset + 3]]
+        _roll(counter=counter, window_idx=window_idx)
+        return _sliding_count(window_idx, counter[1], counter[2], window, now)
+
+    def _locate(self, key: str) -> tuple[int, int]:
+        fingerprint = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
+        return fingerprint, (fingerprint % self.slots) * self._fields
+
+
+def _roll(counter: list[int], window_idx: int) -> None:
+    if counter[0] == window_idx:
+        return
+    counter[2] = counter[1] if counter[0] == window_idx - 1 else 0
+    counter[1] = 0
+    counter[0] = window_idx
+
+
+class LoginThrottle:
+    def __init__(self, store: ThrottleStoreProto, email_limit: int, ip_limit: int, window: int):
+        self.store = store
+        self.email_limit = email_limit
+        self.ip_limit = ip_limit
+        self.window = window
+
+    def check(self, email: str, client_ip: Optional[str] = None) -> None:
+        """
+        Raises ``TooManyRequestsError`` if one more failed login attempt for the email or from the client IP
+        would exceed their limits within the sliding window. Does not register the attempt: only failed ones are
+        registered, with ``register_failure``, so that successful logins do not use the limits up.
+        """
+        now = time.time()
+        over_limit = self.store.count(key=f"email:{email.lower()}", window=self.window, now=now) >= self.email_limit
+        if client_ip is not None:
+            over_limit |= self.store.count(key=f"ip:{client_ip}", window=self.window, now=now) >= self.ip_limit
+        if over_limit:
+            retry_after: int = max(1, math.ceil(self.window - now % self.window))
+            raise app.domain.errors.TooManyRequestsError(
+                message="Too many login attempts. Try again later.", retry_after=retry_after
+            )
+
+    def register_failure(self, email: str, client_ip: Optional[str] = None) -> None:
+        """
+        Registers a failed login attempt (an unknown email or a wrong password) for the email and the client IP.
+        """
+        now = time.time()
+        self.store.hit(key=f"email:{email.lower()}", window=self.window, now=now)
+        if client_ip is not None:
+            self.store.hit(key=f"ip:{client_ip}", window=self.window, now=now)
@@ -1,32 +1,141 @@
-from sqlalchemy.exc import IntegrityError
+import contextlib
+from typing import Iterator, Optional
+
+import sqlalchemy
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 
 import app.repository.repository
 import app.domain.errors
+from app.monitoring import timing
 from app.orm import session_maker
-from app.repository.repository import RepoProto, UserRepository, AdvRepository
+from app.repository.repository import RepoProto, UserRepository, AdvRepository, IdempotencyKeyRepository
+from app.service_layer import deadlines
+
+
+QUERY_CANCELED = "57014"
+
+
+def set_statement_timeout(session, transaction, connection: sqlalchemy.engine.Connection) -> None:
+    """
+    Limits the statements of a transaction to the time left until the deadline of the current request, so that
+    Postgres cancels a statement the client would not wait for anyway.
+    """
+    left: Optional[float] = deadlines.remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    if left <= 0:
+        raise app.domain.errors.DeadlineExceededError
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
 
 
 class UnitOfWork:
-    def __init__(self):
+    """
+    The session is created on entering the first ``with uow:`` block, and a connection is checked out of the pool
+    only by the first statement. Nested blocks share the session of the outer one.
+
+    A standalone unit of work closes the session (releasing the connection) on leaving its outermost block.
+    A ``scoped`` one keeps it for the next blocks, so that all the blocks of a request run in one transaction
+    on one connection; its owner calls ``close()`` at the end of the request.
+    """
+    def __init__(self, scoped: bool = False):
         self.session_maker = session_maker
+        self.scoped = scoped
+        self.session: Optional[sqlalchemy.orm.Session] = None
+        self._depth = 0
+        self._written = False
+        self._savepoint: Optional[sqlalchemy.orm.SessionTransaction] = None
 
     def __enter__(self):
-        self.session = self.session_maker()
-        self.users: RepoProto = UserRepository(session=self.session)
-        self.advs: RepoProto = AdvRepository(session=self.session)
+        deadlines.check_deadline()
+        if self.session is None:
+            with timing.span("uow_enter"):
+                self.session = self.session_maker()
+                sqlalchemy.event.listen(self.session, "after_begin", set_statement_timeout)
+                sqlalchemy.event.listen(self.session, "after_flush", self._mark_written)
+                sqlalchemy.event.listen(self.session, "do_orm_execute", self._mark_executed)
+                self.users: RepoProto = UserRepository(session=self.session)
+                self.advs: RepoProto = AdvRepository(session=self.session)
+                self.idempotency_keys = IdempotencyKeyRepository(session=self.session)
+        self._depth += 1
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self._depth -= 1
         if exc_type is not None:
             self.rollback()
-            self.session.close()
-        self.session.close()
+        if self._depth == 0 and not self.scoped:
+            self.close()
+        if isinstance(exc_val, OperationalError) and getattr(exc_val.orig, "pgcode", None) == QUERY_CANCELED:
+            raise app.domain.errors.DeadlineExceededError from exc_val
+
+    def _mark_written(self, session, flush_context) -> None:
+        self._written = True
+
+    def _mark_executed(self, orm_execute_state: sqlalchemy.orm.ORMExecuteState) -> None:
+        # Statements other than ORM selects (e.g. bulk updates, textual SQL) may write.
+        if not orm_execute_state.is_select:
+            self._written = True
+
+    def has_changes(self) -> bool:
+        return bool(self._written or self.session.new or self.session.dirty or self.session.deleted)
+
+    @contextlib.contextmanager
+    def savepoint(self) -> Iterator["UnitOfWork"]:
+        """
+        Runs the block in a SAVEPOINT of the current transaction. Within the block ``commit()`` only flushes the
+        changes, and ``rollback()`` (e.g. on an error) discards the changes of the block only, so that several
+        service layer calls can share one transaction and be committed together by the outer block.
+        """
+        self.__enter__()
+        try:
+            self._savepoint = self.session.begin_nested()
+            yield self
+            if self._savepoint.is_active:
+                self._savepoint.commit()
+        except BaseException:
+            self.rollback()
+            raise
+        finally:
+            self._savepoint = None
+            # The error, if any, is rolled back to the savepoint above, not in the whole transaction.
+            self.__exit__(None, None, None)
 
     def rollback(self):
+        if self._savepoint is not None:
+            if self._savepoint.is_active:
+                self._savepoint.rollback()
+            return
         self.session.rollback()
+        self._written = False
 
     def commit(self):
+        """
+        Commits the changes. Read-only work is not committed: there is nothing to write, and the loaded
+        instances are not expired, so reading them afterwards needs no queries.
+        """
+        if not self.has_changes():
+            return
+        if self._savepoint is not None:
+            try:
+                self.session.flush()
+            except IntegrityError:
+                raise app.domain.errors.AlreadyExistsError
+            except StaleDataError:
+                raise app.domain.errors.ConflictError
+            return
         try:
-            self.session.commit()
+            with timing.span("uow_commit"):
+                self.session.commit()
         except IntegrityError:
             raise app.domain.errors.AlreadyExistsError
+        except StaleDataError:  # the row was updated or deleted by a concurrent transaction
+            raise app.domain.errors.ConflictError
+        finally:
+            self._written = False
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+            self._written = False
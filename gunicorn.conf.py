@@ -0,0 +1,57 @@
+"""
+Gunicorn settings for running the app in production:
+
+    $ gunicorn app.flask_entrypoints.wsgi:application
+
+(gunicorn reads ``gunicorn.conf.py`` from the working directory).
+
+The app is loaded once in the master process (mapping, views, shared memory of the login throttle) and inherited by
+the forked workers; every worker creates its own database engine in ``post_fork``.
+
+Graceful reload: ``kill -HUP <master pid>`` replaces the workers after they finish their requests (settings are
+re-read, but the preloaded code is not). To deploy new code, start a new master with ``kill -USR2 <master pid>``
+and stop the old one with ``kill -TERM <old master pid>`` once the new workers are up.
+"""
+import multiprocessing
+import os
+import shutil
+
+
+# Passed to the environment before the app (and prometheus_client) is loaded, so that the metrics of all workers
+# are aggregated.
+prometheus_multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/adv_prometheus_multiproc")
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+raw_env = [f"PROMETHEUS_MULTIPROC_DIR={prometheus_multiproc_dir}"]
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+worker_class = "gthread" if threads > 1 else "sync"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+if worker_class == "sync":
+    # A sync worker whose request takes longer than ``timeout`` is killed, so the deadlines of the requests
+    # (e.g. REQUEST_DEADLINE_EXPORT) are capped below it. Long exports need a threaded worker (GUNICORN_THREADS > 1),
+    # which is not killed while its requests run; only with it ADMISSION_EXPORT_LIMIT binds.
+    raw_env.append(f"REQUEST_DEADLINE_MAX={max(1, timeout - 1)}")
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+backlog = int(os.getenv("GUNICORN_BACKLOG", 2048))
+
+
+def on_starting(server):
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir)
+
+
+def post_fork(server, worker):
+    import app.orm
+    app.orm.init_engine()
+
+
+def child_exit(server, worker):
+    from app.monitoring import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,105 @@
+"""
+Microbenchmarks of the hot paths that run without a database:
+
+    $ python -m tests.benchmarks                                # run and print the results
+    $ python -m tests.benchmarks --save main                    # store the results as baseline "main"
+    $ python -m tests.benchmarks --compare main -k get_params   # compare the matching cases with baseline "main"
+
+Baselines are stored in ``tests/benchmarks/baselines/<name>.json``. Timings depend on the machine, so compare runs
+made on the same machine only.
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import timeit
+
+from app.orm import table_mapper
+from tests.benchmarks.cases import BenchmarkCase, collect_cases
+
+
+BASELINES_DIR = pathlib.Path(__file__).parent / "baselines"
+
+
+def run_case(case: BenchmarkCase, repeat: int, min_time: float) -> dict[str, float]:
+    """
+    Returns the median and the minimum time of one operation (seconds) over ``repeat`` rounds, each of which
+    calls the case as many times as fit into ``min_time`` seconds.
+    """
+    timer = timeit.Timer(case.func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    rounds = [duration / number / case.ops for duration in timer.repeat(repeat=repeat, number=number)]
+    return {"median": statistics.median(rounds), "min": min(rounds)}
+
+
+def format_duration(seconds: float) -> str:
+    for unit, factor in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= factor:
+            return f"{seconds / factor:.2f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def report(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float) -> int:
+    """
+    Prints the results, compared with the baseline if there is one, and returns the number of regressions, i.e.
+    cases slower than the baseline by more than ``tolerance``.
+    """
+    regressions = 0
+    name_width = max(len(name) for name in results)
+    header = f"{'case':<{name_width}}  {'median':>10}"
+    print(header + (f"  {'baseline':>10}  {'change':>8}" if baseline else ""))
+    for name, result in results.items():
+        line = f"{name:<{name_width}}  {format_duration(result['median']):>10}"
+        if name in baseline:
+            change = result["median"] / baseline[name]["median"] - 1
+            verdict = ""
+            if change > tolerance:
+                verdict, regressions = "SLOWER", regressions + 1
+            elif change < -tolerance:
+                verdict = "faster"
+            line += f"  {format_duration(baseline[name]['median']):>10}  {change:+8.1%}  {verdict}"
+        print(line)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Runs the microbenchmarks.")
+    parser.add_argument("-k", dest="keyword", default="", help="run only the cases containing the keyword")
+    parser.add_argument("--save", metavar="NAME", help="store the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare the results with a stored baseline")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimal duration of a round, seconds")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    # Entities are instrumented as when loaded by the ORM; no database connection is made.
+    table_mapper.start_mapping()
+    baseline: dict[str, dict[str, float]] = {}
+    if args.compare:
+        baseline = json.loads((BASELINES_DIR / f"{args.compare}.json").read_text())["results"]
+    results: dict[str, dict[str, float]] = {
+        case.name: run_case(case=case, repeat=args.repeat, min_time=args.min_time)
+        for case in collect_cases() if args.keyword in case.name
+    }
+    if not results:
+        print(f"No cases match {args.keyword!r}.")
+        return 1
+    regressions: int = report(results=results, baseline=baseline, tolerance=args.tolerance)
+    if args.save:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        (BASELINES_DIR / f"{args.save}.json").write_text(json.dumps({
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
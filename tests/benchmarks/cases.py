@@ -0,0 +1,121 @@
+import datetime
+import itertools
+import json
+from dataclasses import dataclass
+from typing import Callable
+
+import app.domain.errors
+from app.domain import services
+from app.domain.models import Advertisement, AdvertisementColumns, ModelClasses, User, UserColumns
+from app.pass_hashing_and_validation import pass_hashing, validation
+from app.repository.filtering import Comparison, Filter, FilterTypes, Params
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    func: Callable[[], object]
+    ops: int = 1  # operations per call of ``func``, the results are reported per operation
+
+
+class FakeQueryFiltered:
+    def __init__(self, count: int):
+        self._count = count
+
+    def count(self) -> int:
+        return self._count
+
+
+def _validate_params_sweep(model_class: type, filter_type: FilterTypes) -> BenchmarkCase:
+    columns = list(dict.fromkeys(c.value for c in itertools.chain(UserColumns, AdvertisementColumns)))
+    combinations = [
+        {"model_class": model_class, "filter_type": filter_type.value, "column": column, "comparison": comparison.value,
+         "column_value": "1000"}
+        for column, comparison in itertools.product(columns, Comparison)
+    ]
+
+    def sweep():
+        for data in combinations:
+            try:
+                Filter(session="fake_session")._validate_params(data=dict(data), params=Params)
+            except app.domain.errors.ValidationError:
+                pass
+
+    return BenchmarkCase(
+        name=f"filter_validate_params[{model_class.__name__}-{filter_type.value}]", func=sweep, ops=len(combinations)
+    )
+
+
+def _check_page_and_per_page(page, per_page, total: int) -> BenchmarkCase:
+    filter_object = Filter(session="fake_session")
+    filter_object.query_filtered = FakeQueryFiltered(count=total)
+    return BenchmarkCase(
+        name=f"filter_check_page_and_per_page[page={page!r}-per_page={per_page!r}]",
+        func=lambda: filter_object._check_page_and_per_page(page=page, per_page=per_page)
+    )
+
+
+def _get_params(model_class: type, size: int) -> BenchmarkCase:
+    creation_date = datetime.datetime(2024, 1, 1, 12, 30)
+    if model_class is User:
+        entities = [
+            User(id=i, name=f"user_{i}", email=f"user_{i}@example.com", password="hash", creation_date=creation_date)
+            for i in range(size)
+        ]
+    else:
+        entities = [
+            Advertisement(id=i, title=f"title_{i}", description=f"description {i}" * 5, user_id=i % 10,
+                          creation_date=creation_date)
+            for i in range(size)
+        ]
+    return BenchmarkCase(
+        name=f"services_get_params[{model_class.__name__}-{size}]",
+        func=lambda: [services.get_params(model=entity) for entity in entities]
+    )
+
+
+_validation_payloads = {
+    validation.CreateUser: {"name": "user_1", "email": "user_1@example.com", "password": "secret_password"},
+    validation.UpdateUser: {"name": "user_2"},
+    validation.CreateAdv: {"title": "title", "description": "description " * 20},
+    validation.EditAdv: {"description": "new description"},
+    validation.Login: {"email": "user_1@example.com", "password": "secret_password"},
+}
+
+
+def _validate_data(validation_model: type, raw: bool) -> BenchmarkCase:
+    data = _validation_payloads[validation_model]
+    if raw:
+        data = json.dumps(data).encode()
+    return BenchmarkCase(
+        name=f"validation_validate_data[{validation_model.__name__}-{'json' if raw else 'dict'}]",
+        func=lambda: validation.validate_data(validation_model=validation_model, data=data)
+    )
+
+
+def _hash_password(rounds: int) -> BenchmarkCase:
+    return BenchmarkCase(
+        name=f"pass_hashing_hash_password[rounds={rounds}]",
+        func=lambda: pass_hashing.hash_password(password="secret_password", rounds=rounds)
+    )
+
+
+def _check_password(rounds: int) -> BenchmarkCase:
+    hashed_password = pass_hashing.hash_password(password="secret_password", rounds=rounds)
+    return BenchmarkCase(
+        name=f"pass_hashing_check_password[rounds={rounds}]",
+        func=lambda: pass_hashing.check_password(hashed_password=hashed_password, password="secret_password")
+    )
+
+
+def collect_cases() -> list[BenchmarkCase]:
+    return [
+        *(_validate_params_sweep(model_class=mc.value, filter_type=ft) for mc in ModelClasses for ft in FilterTypes),
+        _check_page_and_per_page(page=3, per_page=10, total=100),
+        _check_page_and_per_page(page=50, per_page=500, total=100),
+        _check_page_and_per_page(page="INVALID", per_page="INVALID", total=100),
+        *(_get_params(model_class=mc, size=size) for mc in (User, Advertisement) for size in (10, 100, 1000)),
+        *(_validate_data(validation_model=vm, raw=raw) for vm in _validation_payloads for raw in (False, True)),
+        *(_hash_password(rounds=rounds) for rounds in (4, 8, 10, 12)),
+        *(_check_password(rounds=rounds) for rounds in (4, 8, 10, 12)),
+    ]
@@ -1,3 +1,4 @@
+import contextlib
 import datetime
 from typing import Optional
 
@@ -6,9 +7,10 @@ import sqlalchemy
 
 import app.orm
 import app.pass_hashing_and_validation.pass_hashing, app.domain.errors
-from app.flask_entrypoints import adv
+from app.flask_entrypoints import adv, authentication, views
 from app.orm import table_mapper
 from app.domain import services
+from app.service_layer import throttling
 
 
 @pytest.fixture(scope="session")
@@ -31,7 +33,11 @@ def clear_db_before_and_after_test(engine):
 
 
 @pytest.fixture
-def test_client():
+def test_client(monkeypatch):
+    monkeypatch.setattr(authentication.login_throttle, "store", throttling.LocalThrottleStore())
+    views.search_advs_cache.clear()
+    monkeypatch.setitem(adv.config, "QUERY_BUDGET_ENABLED", True)
+    monkeypatch.setitem(adv.config, "QUERY_BUDGET_STRICT", True)
     return adv.test_client()
 
 
@@ -110,8 +116,8 @@ def fake_check_current_user_func(user_id: int, get_cuid: bool = True):
 
 @pytest.fixture(scope="function")
 @return_func_deco
-def fake_validate_func(**data):
-    return data
+def fake_validate_func(data: dict):
+    return dict(data)
 
 
 @pytest.fixture(scope="function")
@@ -149,6 +155,23 @@ class FakeBaseRepo:
             return []
         return next(instance for instance in self.instances if instance.id == instance_id)
 
+    def get_columns(self, instance_id, columns):
+        instance = self.get(instance_id)
+        if not instance:
+            return None
+        return {column: getattr(instance, column) for column in columns}
+
+    def get_many(self, instance_ids):
+        return [instance for instance in self.instances if instance.id in instance_ids]
+
+    def stream_columns(self, column, column_value, columns, batch_size):
+        for instance in sorted(self.instances, key=lambda instance: instance.id):
+            if getattr(instance, column) == column_value:
+                yield {name: getattr(instance, name) for name in columns}
+
+    def count(self, column, column_value):
+        return sum(1 for instance in self.instances if getattr(instance, column) == column_value)
+
     def get_list_or_paginated_data(self, paginate: Optional[bool] = False, **kwargs):
         if paginate:
             return {"items": [services.get_params(model=item) for item in self.instances]}
@@ -200,6 +223,10 @@ class FakeUnitOfWork:
         if exc_type is not None:
             self.rollback()
 
+    @contextlib.contextmanager
+    def savepoint(self):
+        yield self
+
     def rollback(self):
         pass
 
@@ -1,3 +1,4 @@
+import json
 from typing import Literal
 import pytest
 from datetime import datetime
@@ -167,6 +168,60 @@ def test_create_adv_returns_401_when_user_is_not_authenticated(test_client, clea
     assert response.json == {"msg": "Missing Authorization Header"}
 
 
+@pytest.mark.parametrize("export_format", ("ndjson", "csv"))
+def test_export_related_advs_streams_all_advs_of_user(
+        clear_db_before_and_after_test, test_client, create_adv_through_http, access_token, export_format
+):
+    response = test_client.get(
+        f"http://127.0.0.1:5000/users/1/advertisements/export?format={export_format}",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    assert response.status_code == 200
+    assert response.is_streamed
+    lines: list[bytes] = response.get_data().splitlines()
+    if export_format == "ndjson":
+        assert [json.loads(line)["id"] for line in lines] == [create_adv_through_http]
+    else:
+        assert lines[0] == b"id,title,description,creation_date,user_id"
+        assert len(lines) == 2
+
+
+def test_create_adv_with_idempotency_key_is_not_repeated_on_retry(
+        clear_db_before_and_after_test, test_client, access_token, test_adv_params
+):
+    headers = {"Authorization": f"Bearer {access_token}", "Idempotency-Key": "test_key"}
+    first_response = test_client.post("http://127.0.0.1:5000/advertisements/", json=test_adv_params, headers=headers)
+    retry_response = test_client.post("http://127.0.0.1:5000/advertisements/", json=test_adv_params, headers=headers)
+    other_response = test_client.post(
+        "http://127.0.0.1:5000/advertisements/", json={**test_adv_params, "title": "other_title"}, headers=headers
+    )
+    assert first_response.status_code == retry_response.status_code == 201
+    assert retry_response.json == first_response.json
+    assert retry_response.headers["Idempotent-Replayed"] == "true"
+    assert other_response.status_code == 422
+    search_response = test_client.get(
+        f"http://127.0.0.1:5000/advertisements?column=title&column_value={test_adv_params['title']}"
+    )
+    assert search_response.json["total"] == 1
+
+
+def test_idempotency_keys_of_anonymous_clients_are_scoped_by_client_address(
+        clear_db_before_and_after_test, test_client, test_user_data
+):
+    headers = {"Idempotency-Key": "test_key"}
+    first_response = test_client.post(
+        "http://127.0.0.1:5000/users/", json=test_user_data, headers=headers,
+        environ_base={"REMOTE_ADDR": "10.0.0.1"}
+    )
+    other_client_response = test_client.post(
+        "http://127.0.0.1:5000/users/", json={**test_user_data, "email": "other_client@email.com"}, headers=headers,
+        environ_base={"REMOTE_ADDR": "10.0.0.2"}
+    )
+    assert first_response.status_code == other_client_response.status_code == 201
+    assert "Idempotent-Replayed" not in other_client_response.headers
+    assert other_client_response.json != first_response.json
+
+
 def test_get_user_data_returns_200(
         clear_db_before_and_after_test, test_client, access_token, test_date, test_user_data
 ):
@@ -193,6 +248,20 @@ def test_get_user_data_returns_403_when_other_user_is_authenticated(
     assert response.json == {"errors": "Unavailable operation."}
 
 
+def test_get_adv_params_with_matching_etag_returns_304(
+        clear_db_before_and_after_test, create_adv_through_http, test_client, access_token
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = test_client.get("http://127.0.0.1:5000/advertisements/1/", headers=headers)
+    etag: str = response.headers["ETag"]
+    conditional_response = test_client.get(
+        "http://127.0.0.1:5000/advertisements/1/", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert etag == '"advertisement-1-v1"'
+    assert conditional_response.status_code == 304
+
+
 def test_get_adv_params(clear_db_before_and_after_test, create_adv_through_http, test_client, access_token):
     response = test_client.get(
         "http://127.0.0.1:5000/advertisements/1/", headers={"Authorization": f"Bearer {access_token}"}
@@ -229,6 +298,70 @@ def test_get_adv_params_returns_404_when_adv_is_not_found(clear_db_before_and_af
     assert response.json == {"errors": "The advertisement with the provided parameters is not found."}
 
 
+def test_get_advs_batch_returns_found_missing_and_forbidden_ids(
+        clear_db_before_and_after_test, test_client, create_adv_through_http, access_token
+):
+    user_data_2 = {"name": "test_name_2", "email": "test_email_2", "password": "password_2"}
+    test_client.post("http://127.0.0.1:5000/users/", json=user_data_2)
+    access_token_2: str = test_client.post("http://127.0.0.1:5000/login/", json=user_data_2).json["access_token"]
+    other_adv_id: int = test_client.post(
+        "http://127.0.0.1:5000/advertisements/", json={"title": "title_2", "description": "description_2"},
+        headers={"Authorization": f"Bearer {access_token_2}"}
+    ).json["new_advertisement_id"]
+    response = test_client.get(
+        f"http://127.0.0.1:5000/advertisements/batch?ids={create_adv_through_http},{other_adv_id},100",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    assert response.status_code == 200
+    assert [adv["id"] for adv in response.json["found"]] == [create_adv_through_http]
+    assert response.json["forbidden"] == [other_adv_id]
+    assert response.json["missing"] == [100]
+
+
+def test_run_batch_commits_successful_operations_in_best_effort_mode(
+        clear_db_before_and_after_test, test_client, create_adv_through_http, access_token
+):
+    operations = [
+        {"op": "create_adv", "params": {"title": "batch_title", "description": "batch_description"}},
+        {"op": "update_adv", "adv_id": create_adv_through_http, "params": {"title": "new_title"}},
+        {"op": "delete_adv", "adv_id": 100},
+    ]
+    response = test_client.post(
+        "http://127.0.0.1:5000/batch", json={"operations": operations, "atomic": False},
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json["committed"] is True
+    assert [result["status"] for result in response.json["results"]] == ["ok", "ok", "failed"]
+    assert response.json["results"][2]["error"]["status"] == 404
+    new_adv_id: int = response.json["results"][0]["result"]["new_advertisement_id"]
+    assert test_client.get(
+        f"http://127.0.0.1:5000/advertisements/{new_adv_id}/", headers={"Authorization": f"Bearer {access_token}"}
+    ).status_code == 200
+
+
+def test_run_batch_rolls_back_atomic_batch_when_operation_fails(
+        clear_db_before_and_after_test, test_client, create_adv_through_http, access_token
+):
+    operations = [
+        {"op": "update_adv", "adv_id": create_adv_through_http, "params": {"title": "new_title"}},
+        {"op": "delete_adv", "adv_id": 100},
+        {"op": "delete_adv", "adv_id": create_adv_through_http},
+    ]
+    response = test_client.post(
+        "http://127.0.0.1:5000/batch", json={"operations": operations},
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    assert response.status_code == 404
+    assert response.json["committed"] is False
+    assert [result["status"] for result in response.json["results"]] == ["rolled_back", "failed", "skipped"]
+    adv_params: dict = test_client.get(
+        f"http://127.0.0.1:5000/advertisements/{create_adv_through_http}/",
+        headers={"Authorization": f"Bearer {access_token}"}
+    ).json
+    assert adv_params["title"] != "new_title"
+
+
 def test_update_user_returns_200(clear_db_before_and_after_test, test_client, access_token, test_user_data):
     new_data = {"name": "new_name"}
     response = test_client.patch(
@@ -430,6 +563,28 @@ def test_update_adv_returns_200(
     assert response.json["updated_adv_params"]["description"] == new_adv_params["description"]
 
 
+def test_update_adv_returns_409_when_if_match_has_outdated_version(
+        clear_db_before_and_after_test, test_client, create_adv_through_http, access_token
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    etag: str = test_client.get(
+        f"http://127.0.0.1:5000/advertisements/{create_adv_through_http}/", headers=headers
+    ).headers["ETag"]
+    first_response = test_client.patch(
+        f"http://127.0.0.1:5000/advertisements/{create_adv_through_http}/", json={"title": "first_title"},
+        headers={**headers, "If-Match": etag}
+    )
+    second_response = test_client.patch(
+        f"http://127.0.0.1:5000/advertisements/{create_adv_through_http}/", json={"title": "second_title"},
+        headers={**headers, "If-Match": etag}
+    )
+    assert first_response.status_code == 200
+    assert second_response.status_code == 409
+    assert test_client.get(
+        f"http://127.0.0.1:5000/advertisements/{create_adv_through_http}/", headers=headers
+    ).json["title"] == "first_title"
+
+
 def test_update_adv_returns_404_when_adv_is_not_found(
         clear_db_before_and_after_test, test_client, access_token, test_adv_id
 ):
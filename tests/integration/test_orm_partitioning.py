@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import sqlalchemy
+
+import app.repository.filtering
+from app.domain.models import Advertisement
+from app.orm import partitioning
+
+
+def test_partitions_of_coming_months_are_created_with_table(engine, clear_db_before_and_after_test):
+    current_month = partitioning.month_start(datetime.now())
+    with engine.connect() as conn:
+        partitions = partitioning.list_partitions(conn)
+    assert partitioning.DEFAULT_PARTITION in partitions
+    assert {partitioning.partition_name(partitioning.add_months(current_month, months))
+            for months in range(partitioning.MONTHS_AHEAD + 1)} <= set(partitions)
+
+
+def test_rows_of_default_partition_are_moved_to_partitions_of_their_months_and_detached(
+        engine, clear_db_before_and_after_test, create_test_users_and_advs, test_date
+):
+    with engine.begin() as conn:
+        assert partitioning.split_default_partition(conn) == [partitioning.partition_name(test_date)]
+        default_rows = conn.execute(sqlalchemy.text(f'SELECT count(*) FROM "{partitioning.DEFAULT_PARTITION}"'))
+        assert default_rows.scalar() == 0
+        assert partitioning.detach_partitions(conn=conn, before=datetime(1900, 2, 1), drop=True) == [
+            partitioning.partition_name(test_date)
+        ]
+        assert conn.execute(sqlalchemy.text("SELECT count(*) FROM adv")).scalar() == 0
+
+
+def test_filter_by_creation_date_scans_partition_of_its_month_only(
+        engine, session_maker, clear_db_before_and_after_test, create_test_users_and_advs, test_date
+):
+    with engine.begin() as conn:
+        partitioning.split_default_partition(conn)
+    with session_maker() as session:
+        result = app.repository.filtering.get_list_or_paginated_data(
+            session=session, model_class=Advertisement, filter_type="column_value", column="creation_date",
+            column_value="1900-01-01", comparison="is"
+        )
+        query = session.query(Advertisement).filter(app.repository.filtering.Filter._date_condition(
+            model_attr=Advertisement.creation_date, column="creation_date", column_value="1900-01-01",
+            comparison="is"
+        ))
+        plan = "\n".join(session.execute(sqlalchemy.text(
+            "EXPLAIN " + str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        )).scalars())
+    assert {adv.id for adv in result} == {1000, 1001, 1003, 1004}
+    assert partitioning.partition_name(test_date) in plan
+    assert partitioning.DEFAULT_PARTITION not in plan
@@ -98,6 +98,36 @@ def test_get_list_or_paginated_data_returns_paginated_data_with_correct_params(
         assert set([item["id"] for item in filter_result["items"]]) == {1000, 1001, 1003, 1004}
 
 
+@pytest.mark.parametrize(
+    "params,expected_ids",
+    (({"model_class": Advertisement, "column": "user_id", "column_value": "1000,1001", "comparison": "in"},
+      {1000, 1001, 1003, 1004}),
+     ({"model_class": Advertisement, "column": "id", "column_value": "1000,1004", "comparison": "in"}, {1000, 1004}),
+     ({"model_class": User, "column": "email", "column_value": "test_filter_1001@email.com", "comparison": "in"},
+      {1001}),
+     ({"model_class": Advertisement, "column": "id", "column_value": "1000,1001", "comparison": "between"},
+      {1000, 1001}),
+     ({"model_class": Advertisement, "column": "id", "column_value": "1000,1001", "comparison": "between_half_open"},
+      {1000}),
+     ({"model_class": Advertisement, "column": "creation_date", "column_value": "1900-01-01,1900-01-01",
+       "comparison": "between"},
+      {1000, 1001, 1003, 1004}),
+     ({"model_class": Advertisement, "column": "creation_date", "column_value": "1900-01-01,1900-01-01",
+       "comparison": "between_half_open"},
+      set()),
+     ({"model_class": User, "column": "creation_date", "column_value": "1899-12-31,1900-01-01", "comparison": "in"},
+      {1000, 1001}))
+)
+def test_get_list_or_paginated_data_filters_by_sets_and_ranges(
+        session_maker, create_test_users_and_advs, params, expected_ids
+):
+    with session_maker() as s:
+        result = app.repository.filtering.get_list_or_paginated_data(
+            session=s, filter_type="column_value", **params
+        )
+        assert {instance.id for instance in result if instance.id >= 1000} == expected_ids
+
+
 def test_get_list_or_paginated_data_returns_dict_when_all_params_are_correct_and_paginate_is_true(
         session_maker, create_test_users_and_advs, test_date
 ):
@@ -154,7 +184,7 @@ def test_get_list_or_paginated_data_raises_error_when_invalid_params_are_passed(
         "Valid values are: ['description', 'title', 'email', 'user_id', 'name', 'creation_date', 'id']"
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {app.repository.filtering.ValidParams.COMPARISON.value}"
     )
 
 
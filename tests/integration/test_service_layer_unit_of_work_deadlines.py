@@ -0,0 +1,32 @@
+import pytest
+import sqlalchemy
+
+import app.domain.errors
+from app.service_layer import deadlines
+from app.service_layer.unit_of_work import UnitOfWork
+
+
+def test_statement_running_past_deadline_is_cancelled(session_maker):
+    uow = UnitOfWork()
+    uow.session_maker = session_maker
+    token = deadlines.set_deadline(timeout=0.2)
+    try:
+        with pytest.raises(app.domain.errors.DeadlineExceededError):
+            with uow:
+                uow.session.execute(sqlalchemy.text("SELECT pg_sleep(5)"))
+    finally:
+        deadlines.reset_deadline(token)
+
+
+def test_statement_timeout_is_set_for_transaction_only(session_maker):
+    uow = UnitOfWork()
+    uow.session_maker = session_maker
+    token = deadlines.set_deadline(timeout=10)
+    try:
+        with uow:
+            statement_timeout = uow.session.execute(sqlalchemy.text("SHOW statement_timeout")).scalar()
+    finally:
+        deadlines.reset_deadline(token)
+    assert statement_timeout != "0"
+    with session_maker() as session:
+        assert session.execute(sqlalchemy.text("SHOW statement_timeout")).scalar() == "0"
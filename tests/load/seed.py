@@ -0,0 +1,29 @@
+import random
+
+import sqlalchemy
+
+import app.orm
+from app.bulk_loading import copying, sources
+from app.bulk_loading.sources import WORDS, adv_owner_id, user_email  # noqa: F401 (used by the scenarios)
+from app.orm import table_mapper
+from app.pass_hashing_and_validation import pass_hashing
+
+
+PASSWORD = "load_test_password"
+
+
+def seed(engine: sqlalchemy.engine.Engine, users: int, advs: int, chunk_size: int = 10000, seed_value: int = 0) -> None:
+    """
+    Recreates the tables and fills them with ``users`` users (ids ``1..users``, all with the password ``PASSWORD``)
+    and ``advs`` advertisements (ids ``1..advs``, owned by ``adv_owner_id()``) with titles and descriptions made of
+    ``WORDS``, loaded with ``COPY``. Refuses to recreate the tables of the app database (``POSTGRES_DSN``).
+    """
+    if engine.url == sqlalchemy.engine.make_url(app.orm.POSTGRES_DSN):
+        raise ValueError("The tables of the app database (POSTGRES_DSN) are not recreated for a load test.")
+    table_mapper.mapper.metadata.drop_all(bind=engine)
+    table_mapper.mapper.metadata.create_all(bind=engine)
+    copying.bulk_load(engine=engine, chunk_size=chunk_size, loads=[
+        (table_mapper.user_table,
+         sources.generate_users(count=users, password_hash=pass_hashing.hash_password(PASSWORD))),
+        (table_mapper.adv_table, sources.generate_advs(count=advs, users=users, rnd=random.Random(seed_value)))
+    ])
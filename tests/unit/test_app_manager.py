@@ -5,6 +5,7 @@ import pytest
 
 import app.domain.errors
 import app.flask_entrypoints.authentication
+from app.domain.models import Advertisement
 from app.service_layer import app_manager
 
 
@@ -171,6 +172,47 @@ def test_get_adv_params_raises_not_found_error(fake_check_current_user_func, fak
     assert e.value.message == "The advertisement with the provided parameters is not found."
 
 
+def test_get_advs_params_returns_found_missing_and_forbidden_ids(
+        fake_advs_repo, fake_unit_of_work, test_date
+):
+    own_adv = Advertisement(id=1, title="own_title", description="own_description", user_id=1, creation_date=test_date)
+    other_adv = Advertisement(id=2, title="other_title", description="other_description", user_id=2,
+                              creation_date=test_date)
+    uow = fake_unit_of_work(advs=fake_advs_repo(advs=[own_adv, other_adv]))
+
+    def check_current_user_func(user_id: int, get_cuid: bool = True):
+        if user_id != 1:
+            raise app.domain.errors.CurrentUserError
+        return user_id
+
+    result = app_manager.get_advs_params(adv_ids=[3, 2, 1], check_current_user_func=check_current_user_func, uow=uow)
+    assert result == {
+        "found": [{"id": 1, "title": "own_title", "description": "own_description",
+                   "creation_date": test_date.isoformat(), "user_id": 1}],
+        "missing": [3],
+        "forbidden": [2],
+    }
+
+
+def test_export_related_advs_checks_current_user_before_reading_advs(fake_advs_repo, fake_unit_of_work, test_date):
+    advs = [Advertisement(id=adv_id, title=f"title_{adv_id}", description="description", user_id=1,
+                          creation_date=test_date) for adv_id in (2, 1)]
+    uow = fake_unit_of_work(advs=fake_advs_repo(advs=advs))
+
+    def check_current_user_func(user_id: int, get_cuid: bool = True):
+        if user_id != 1:
+            raise app.domain.errors.CurrentUserError
+        return user_id
+
+    with pytest.raises(app.domain.errors.CurrentUserError):
+        app_manager.export_related_advs(user_id=2, check_current_user_func=check_current_user_func, uow=uow)
+    result = app_manager.export_related_advs(user_id=1, check_current_user_func=check_current_user_func, uow=uow)
+    assert list(result) == [
+        {"id": adv_id, "title": f"title_{adv_id}", "description": "description",
+         "creation_date": test_date.isoformat(), "user_id": 1} for adv_id in (1, 2)
+    ]
+
+
 def test_update_adv(fake_validate_func, fake_check_current_user_func, fake_uow_user_and_adv):
     adv_id, fake_uow = fake_uow_user_and_adv.adv_id, fake_uow_user_and_adv.fake_uow
     new_params = {"title": "new_title", "description": "new_description"}
@@ -186,6 +228,17 @@ def test_update_adv(fake_validate_func, fake_check_current_user_func, fake_uow_u
     assert result == adv_from_repo_params
 
 
+def test_update_adv_raises_conflict_error_when_expected_version_is_outdated(
+        fake_validate_func, fake_check_current_user_func, fake_uow_user_and_adv
+):
+    with pytest.raises(expected_exception=app.domain.errors.ConflictError):
+        app_manager.update_adv(
+            adv_id=fake_uow_user_and_adv.adv_id, new_params={"title": "new_title"},
+            check_current_user_func=fake_check_current_user_func, validate_func=fake_validate_func,
+            uow=fake_uow_user_and_adv.fake_uow, expected_version=2
+        )
+
+
 def test_update_adv_raises_not_found_error(fake_validate_func, fake_check_current_user_func, fake_uow_user_and_adv):
     adv_id, fake_uow, new_params = \
         fake_uow_user_and_adv.adv_id + 1, fake_uow_user_and_adv.fake_uow, {"title": "new_title"}
@@ -196,6 +249,48 @@ def test_update_adv_raises_not_found_error(fake_validate_func, fake_check_curren
         )
 
 
+@pytest.mark.parametrize(
+    "atomic,expected_statuses,committed",
+    ((False, ["ok", "failed", "ok"], True), (True, ["rolled_back", "failed", "skipped"], False))
+)
+def test_run_batch_reports_result_of_each_operation(
+        fake_get_auth_user_id_func, fake_check_current_user_func, fake_validate_func, fake_uow_user_and_adv, atomic,
+        expected_statuses, committed
+):
+    adv_id, fake_uow = fake_uow_user_and_adv.adv_id, fake_uow_user_and_adv.fake_uow
+    operations = [
+        {"op": "update_adv", "adv_id": adv_id, "params": {"title": "new_title"}},
+        {"op": "delete_adv", "adv_id": adv_id + 1},
+        {"op": "update_adv", "adv_id": adv_id, "params": {"description": "new_description"}},
+    ]
+    result = app_manager.run_batch(
+        operations=operations, get_auth_user_id_func=fake_get_auth_user_id_func,
+        check_current_user_func=fake_check_current_user_func, validate_creation_func=fake_validate_func,
+        validate_updating_func=fake_validate_func, uow=fake_uow, atomic=atomic
+    )
+    assert result["committed"] is committed
+    assert [operation_result["status"] for operation_result in result["results"]] == expected_statuses
+    assert isinstance(result["results"][1]["error"], app.domain.errors.NotFoundError)
+    if not atomic:
+        assert result["results"][2]["result"]["updated_adv_params"]["title"] == "new_title"
+
+
+class FakeNotFoundSubclassError(app.domain.errors.NotFoundError):
+    pass
+
+
+@pytest.mark.parametrize(
+    "error,expected_status",
+    (
+        (app.domain.errors.ConflictError(), 409),
+        (FakeNotFoundSubclassError(), 404),
+        (app.domain.errors.AccessDeniedError(), app_manager.BATCH_ERROR_DEFAULT_STATUS),
+    )
+)
+def test_get_batch_error_status_resolves_subclasses_and_unknown_errors(error, expected_status):
+    assert app_manager.get_batch_error_status(error) == expected_status
+
+
 def test_search_advs_by_text(test_adv_params, fake_uow_user_and_adv):
     fake_uow = fake_uow_user_and_adv.fake_uow
     column_value = "test"
@@ -231,3 +326,98 @@ def test_delete_adv_raises_not_found_error(fake_get_auth_user_id_func, fake_advs
     with pytest.raises(expected_exception=app.domain.errors.NotFoundError) as e:
         app_manager.delete_adv(adv_id=1, get_auth_user_id_func=fake_get_auth_user_id_func, uow=fake_uow)
     assert e.value.message == "The advertisement with the provided parameters is not found."
+
+
+def test_jwt_auth_does_not_check_password_when_throttled(fake_validate_func, fake_uow_user, test_user_data):
+    def fake_throttle_func(email: str, client_ip: str):
+        raise app.domain.errors.TooManyRequestsError(retry_after=1)
+
+    def fake_check_pass_func(**kwargs):
+        raise AssertionError("Password must not be checked for a throttled attempt.")
+
+    with pytest.raises(expected_exception=app.domain.errors.TooManyRequestsError):
+        app_manager.jwt_auth(
+            validate_func=fake_validate_func, check_pass_func=fake_check_pass_func,
+            grant_access_func=lambda identity: "", credentials=test_user_data, uow=fake_uow_user.fake_uow,
+            throttle_func=fake_throttle_func, client_ip="127.0.0.1"
+        )
+
+
+@pytest.mark.parametrize("password_is_valid,expected_failures", ((True, 0), (False, 1)))
+def test_jwt_auth_registers_only_failed_attempts(
+        fake_validate_func, fake_uow_user, test_user_data, monkeypatch, password_is_valid, expected_failures
+):
+    fake_uow = fake_uow_user.fake_uow
+    monkeypatch.setattr(fake_uow.users, "get_list_or_paginated_data", lambda **kwargs: list(fake_uow.users.instances))
+    failures: list[dict] = []
+
+    def fake_register_failure_func(**kwargs):
+        failures.append(kwargs)
+
+    try:
+        app_manager.jwt_auth(
+            validate_func=fake_validate_func, check_pass_func=lambda **kwargs: password_is_valid,
+            grant_access_func=lambda identity: "token", credentials=test_user_data, uow=fake_uow,
+            throttle_func=lambda **kwargs: None, register_failure_func=fake_register_failure_func,
+            client_ip="127.0.0.1"
+        )
+    except app.domain.errors.AccessDeniedError:
+        pass
+    assert failures == [{"email": test_user_data["email"], "client_ip": "127.0.0.1"}] * expected_failures
+
+
+def test_get_adv_version_returns_version_incremented_by_update(
+        fake_validate_func, fake_check_current_user_func, fake_uow_user_and_adv
+):
+    adv_id, fake_uow = fake_uow_user_and_adv.adv_id, fake_uow_user_and_adv.fake_uow
+    version_before_update: int = app_manager.get_adv_version(
+        adv_id=adv_id, check_current_user_func=fake_check_current_user_func, uow=fake_uow
+    )
+    app_manager.update_adv(
+        adv_id=adv_id, new_params={"title": "new_title"}, check_current_user_func=fake_check_current_user_func,
+        validate_func=fake_validate_func, uow=fake_uow
+    )
+    version_after_update: int = app_manager.get_adv_version(
+        adv_id=adv_id, check_current_user_func=fake_check_current_user_func, uow=fake_uow
+    )
+    assert version_before_update == 1
+    assert version_after_update == 2
+
+
+def test_get_adv_version_raises_not_found_error(fake_check_current_user_func, fake_advs_repo, fake_unit_of_work):
+    uow = fake_unit_of_work(advs=fake_advs_repo(advs=[]))
+    with pytest.raises(expected_exception=app.domain.errors.NotFoundError):
+        app_manager.get_adv_version(adv_id=1, check_current_user_func=fake_check_current_user_func, uow=uow)
+
+
+def test_get_user_version_returns_version(fake_check_current_user_func, fake_uow_user):
+    result: int = app_manager.get_user_version(
+        user_id=fake_uow_user.user_id, check_current_user_func=fake_check_current_user_func,
+        uow=fake_uow_user.fake_uow
+    )
+    assert result == 1
+
+
+def test_export_related_advs_rejects_more_advs_than_max_rows(fake_advs_repo, fake_unit_of_work, test_date):
+    advs = [Advertisement(id=adv_id, title=f"title_{adv_id}", description="description", user_id=1,
+                          creation_date=test_date) for adv_id in (1, 2, 3)]
+    uow = fake_unit_of_work(advs=fake_advs_repo(advs=advs))
+    with pytest.raises(app.domain.errors.DeadlineExceededError):
+        app_manager.export_related_advs(user_id=1, check_current_user_func=lambda user_id: user_id, uow=uow,
+                                        max_rows=2)
+    result = app_manager.export_related_advs(user_id=1, check_current_user_func=lambda user_id: user_id, uow=uow,
+                                             max_rows=3)
+    assert [adv_params["id"] for adv_params in result] == [1, 2, 3]
+
+
+def test_get_user_data_and_adv_params_with_version(fake_check_current_user_func, fake_uow_user_and_adv):
+    user_id, adv_id, fake_uow = \
+        fake_uow_user_and_adv.user_id, fake_uow_user_and_adv.adv_id, fake_uow_user_and_adv.fake_uow
+    user_data, user_version = app_manager.get_user_data_with_version(
+        user_id=user_id, check_current_user_func=fake_check_current_user_func, uow=fake_uow
+    )
+    adv_params, adv_version = app_manager.get_adv_params_with_version(
+        adv_id=adv_id, check_current_user_func=fake_check_current_user_func, uow=fake_uow
+    )
+    assert (user_data["id"], user_version) == (user_id, 1)
+    assert (adv_params["id"], adv_version) == (adv_id, 1)
@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+import sqlalchemy
+
+import app.domain.errors
+from app.bulk_loading import copying
+from app.orm import table_mapper
+
+
+class FakeCursor:
+    def __init__(self):
+        self.copied: list[tuple[str, str]] = []
+
+    def copy_expert(self, sql, file):
+        self.copied.append((sql, file.read()))
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        (None, r"\N"),
+        (7, "7"),
+        ("tab\there", r"tab\there"),
+        ("line\nbreak\r", r"line\nbreak\r"),
+        ("back\\slash", r"back\\slash"),
+        (datetime.datetime(2024, 1, 2, 3, 4, 5), "2024-01-02 03:04:05"),
+    )
+)
+def test_format_value(value, expected):
+    assert copying.format_value(value) == expected
+
+
+def test_copy_rows_loads_the_columns_of_the_first_row_in_chunks():
+    cursor = FakeCursor()
+    progress: list[tuple[str, int]] = []
+    rows = [{"user_id": number, "title": f"title_{number}"} for number in range(1, 6)]
+    rows[4] = {"title": "no owner"}
+    loaded = copying.copy_rows(cursor=cursor, table=table_mapper.adv_table, rows=iter(rows), chunk_size=2,
+                               progress=lambda table_name, count: progress.append((table_name, count)))
+    assert loaded == 5
+    assert progress == [("adv", 2), ("adv", 4), ("adv", 5)]
+    assert {sql for sql, _ in cursor.copied} == {'COPY "adv" ("title", "user_id") FROM STDIN'}
+    assert [data for _, data in cursor.copied] == [
+        "title_1\t1\ntitle_2\t2\n", "title_3\t3\ntitle_4\t4\n", "no owner\t\\N\n"
+    ]
+
+
+def test_copy_rows_rejects_the_columns_missing_in_the_first_row():
+    rows = [{"title": "title", "user_id": 1}, {"title": "title", "user_id": 1, "description": "description"}]
+    with pytest.raises(app.domain.errors.ValidationError):
+        copying.copy_rows(cursor=FakeCursor(), table=table_mapper.adv_table, rows=rows, chunk_size=10)
+
+
+def test_copy_rows_without_rows():
+    cursor = FakeCursor()
+    assert copying.copy_rows(cursor=cursor, table=table_mapper.adv_table, rows=[], chunk_size=10) == 0
+    assert cursor.copied == []
+
+
+def test_deferred_indexes_are_created_after_the_block():
+    engine = sqlalchemy.create_engine("sqlite://", poolclass=sqlalchemy.pool.StaticPool)
+    table_mapper.user_table.create(bind=engine)
+    with engine.begin() as conn:
+        with copying.deferred_indexes(conn=conn, tables=[table_mapper.user_table]):
+            assert sqlalchemy.inspect(conn).get_indexes("user") == []
+        assert {index["name"] for index in sqlalchemy.inspect(conn).get_indexes("user")} == {
+            "ix_user_creation_date", "ix_user_email"
+        }
+    engine.dispose()
+
+
+def test_check_unique_ids_rejects_ids_taken_by_several_rows():
+    engine = sqlalchemy.create_engine("sqlite://", poolclass=sqlalchemy.pool.StaticPool)
+    table = sqlalchemy.Table("loaded", sqlalchemy.MetaData(), sqlalchemy.Column("id", sqlalchemy.Integer))
+    table.create(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [{"id": 1}, {"id": 2}])
+        copying.check_unique_ids(conn=conn, table=table)
+        conn.execute(table.insert(), [{"id": 2}, {"id": 3}])
+        with pytest.raises(app.domain.errors.ValidationError) as e:
+            copying.check_unique_ids(conn=conn, table=table)
+    assert "[2]" in e.value.message
+    engine.dispose()
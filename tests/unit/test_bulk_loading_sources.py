@@ -0,0 +1,65 @@
+import io
+import random
+
+import pytest
+
+import app.domain.errors
+from app.bulk_loading import sources
+from app.pass_hashing_and_validation import pass_hashing
+
+
+PASSWORD_HASH = "$2b$12$" + "a" * 53
+
+
+def test_read_csv_and_ndjson():
+    csv_file = io.StringIO("title,description,user_id\r\nsofa,,1\r\n")
+    ndjson_file = io.StringIO('{"title": "sofa", "description": null, "user_id": 1}\n\n')
+    expected = [{"title": "sofa", "description": None, "user_id": "1"}]
+    assert list(sources.read_rows(file=csv_file, file_format="csv")) == expected
+    assert list(sources.read_rows(file=ndjson_file, file_format="ndjson")) == [{**expected[0], "user_id": 1}]
+
+
+@pytest.mark.parametrize("line", ("{not json", "[1, 2]"))
+def test_read_ndjson_rejects_lines_other_than_objects(line):
+    with pytest.raises(app.domain.errors.ValidationError) as e:
+        list(sources.read_ndjson(io.StringIO('{"title": "sofa"}\n' + line)))
+    assert e.value.message.startswith("Line 2:")
+
+
+def test_prepare_users_takes_password_hashes_as_is_and_hashes_passwords():
+    users = list(sources.prepare_users([
+        {"name": "first", "email": "first@example.com", "password_hash": PASSWORD_HASH},
+        {"name": "second", "email": "second@example.com", "password": "second_password"},
+    ]))
+    assert users[0] == {"name": "first", "email": "first@example.com", "password": PASSWORD_HASH}
+    assert pass_hashing.check_password(hashed_password=users[1]["password"], password="second_password")
+
+
+@pytest.mark.parametrize(
+    "row",
+    (
+        {"name": "name", "email": "email@example.com"},
+        {"name": "name", "email": "email@example.com", "password_hash": "plain_password"},
+        {"name": "name", "password_hash": PASSWORD_HASH},
+        {"name": "name", "email": "email@example.com", "password_hash": PASSWORD_HASH, "version": 2},
+    )
+)
+def test_prepare_users_rejects_invalid_rows(row):
+    with pytest.raises(app.domain.errors.ValidationError) as e:
+        list(sources.prepare_users([row]))
+    assert e.value.message.startswith("Row 1:")
+
+
+def test_prepare_advs_requires_title_and_owner():
+    assert list(sources.prepare_advs([{"title": "sofa", "user_id": 1}])) == [{"title": "sofa", "user_id": 1}]
+    with pytest.raises(app.domain.errors.ValidationError):
+        list(sources.prepare_advs([{"title": "sofa"}]))
+
+
+def test_generated_advs_are_owned_by_the_generated_users():
+    users = list(sources.generate_users(count=3, password_hash=PASSWORD_HASH, first_id=2))
+    advs = list(sources.generate_advs(count=7, users=4, rnd=random.Random(0)))
+    assert [user["id"] for user in users] == [2, 3, 4]
+    assert users[0]["email"] == sources.user_email(2)
+    assert [adv["user_id"] for adv in advs] == [1, 2, 3, 4, 1, 2, 3]
+    assert all(word in sources.WORDS for word in advs[0]["description"].split())
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+from flask_jwt_extended import decode_token
+
+from app.flask_entrypoints import adv, admission, authentication
+from app.service_layer.admission import Priority
+
+
+@pytest.fixture
+def access_token(monkeypatch):
+    monkeypatch.setitem(adv.config, "JWT_SECRET_KEY", "test_secret")
+    with adv.app_context():
+        return authentication.get_access_token(identity=1)
+
+
+@pytest.mark.parametrize(
+    "method,expected", (("GET", Priority.NORMAL), ("POST", Priority.HIGH), ("DELETE", Priority.HIGH))
+)
+def test_requests_with_valid_token_get_higher_priority(access_token, method, expected):
+    with adv.test_request_context("/advertisements/1", method=method,
+                                  headers={"Authorization": f"Bearer {access_token}"}):
+        assert admission.get_priority() == expected
+
+
+@pytest.mark.parametrize("headers", ({}, {"Authorization": "Bearer not_a_token"}, {"Authorization": "Basic abc"}))
+def test_requests_without_valid_token_get_low_priority(access_token, headers):
+    with adv.test_request_context("/advertisements/", method="POST", headers=headers):
+        assert admission.get_priority() == Priority.LOW
+
+
+def test_requests_with_revoked_token_get_low_priority(access_token, monkeypatch):
+    monkeypatch.setattr(authentication, "revoked_tokens", authentication.RevokedTokens())
+    with adv.test_request_context("/logout/", method="POST", headers={"Authorization": f"Bearer {access_token}"}):
+        authentication.revoked_tokens.revoke(jti=decode_token(access_token)["jti"], expires_at=time.time() + 60)
+        assert admission.get_priority() == Priority.LOW
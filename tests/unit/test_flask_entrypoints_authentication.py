@@ -0,0 +1,49 @@
+import time
+
+import pytest
+from flask_jwt_extended import decode_token
+
+import app.domain.errors
+from app.flask_entrypoints import adv, authentication
+
+
+@pytest.mark.parametrize("store_class", (authentication.RevokedTokens, authentication.SharedRevokedTokens))
+def test_revoked_token_is_rejected_until_it_expires(store_class):
+    revoked_tokens = store_class()
+    revoked_tokens.revoke(jti="revoked", expires_at=time.time() + 60)
+    revoked_tokens.revoke(jti="expired", expires_at=time.time() - 1)
+    assert revoked_tokens.is_revoked("revoked")
+    assert not revoked_tokens.is_revoked("expired")
+    assert not revoked_tokens.is_revoked("never_revoked")
+    assert not revoked_tokens.is_revoked(None)
+
+
+def test_shared_revoked_tokens_keep_revoked_tokens_when_expired_ones_are_purged():
+    revoked_tokens = authentication.SharedRevokedTokens(slots=64, bloom_filter_size_bits=1 << 12)
+    revoked_tokens.revoke(jti="expired", expires_at=time.time() - 1)
+    revoked_tokens.revoke(jti="revoked", expires_at=time.time() + 60)
+    revoked_tokens.revoke(jti="revoked_later", expires_at=time.time() + 60)
+    assert revoked_tokens.is_revoked("revoked") and revoked_tokens.is_revoked("revoked_later")
+    assert not revoked_tokens.is_revoked("expired")
+
+
+def test_shared_revoked_tokens_raise_overloaded_error_when_slots_are_taken():
+    revoked_tokens = authentication.SharedRevokedTokens(slots=2, probes=2, bloom_filter_size_bits=1 << 12)
+    revoked_tokens.revoke(jti="first", expires_at=time.time() + 60)
+    revoked_tokens.revoke(jti="second", expires_at=time.time() + 60)
+    with pytest.raises(app.domain.errors.OverloadedError):
+        revoked_tokens.revoke(jti="third", expires_at=time.time() + 60)
+    assert revoked_tokens.is_revoked("first") and revoked_tokens.is_revoked("second")
+
+
+def test_compact_access_token_keeps_configured_nbf_aud_and_iss_claims(monkeypatch):
+    for key, value in {
+        "JWT_SECRET_KEY": "test_secret", "JWT_COMPACT_CLAIMS": True, "JWT_ENCODE_NBF": True,
+        "JWT_ENCODE_AUDIENCE": "adv_clients", "JWT_DECODE_AUDIENCE": "adv_clients", "JWT_ENCODE_ISSUER": "adv",
+        "JWT_DECODE_ISSUER": "adv",
+    }.items():
+        monkeypatch.setitem(adv.config, key, value)
+    with adv.app_context():
+        claims: dict = decode_token(authentication.get_access_token(identity=1))
+    assert {"nbf", "aud", "iss"} <= set(claims)
+    assert (claims["aud"], claims["iss"], claims["sub"]) == ("adv_clients", "adv", 1)
@@ -0,0 +1,100 @@
+import gzip
+import json
+import time
+
+import flask
+import pytest
+
+from app.flask_entrypoints import compression
+from app.flask_entrypoints.caching import TTLLRUCache, BloomFilter, ResponseCache, get_if_match_version
+
+
+def test_ttl_lru_cache_evicts_least_recently_used_entry_when_full():
+    cache = TTLLRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_lru_cache_does_not_return_expired_entry():
+    cache = TTLLRUCache(max_size=2)
+    cache.set("a", 1, expires_at=time.time() - 1)
+    cache.set("b", 2, expires_at=time.time() + 60)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_bloom_filter_contains_added_items():
+    bloom_filter = BloomFilter(size_bits=1 << 12, hash_count=3)
+    items = [f"jti_{i}" for i in range(100)]
+    for item in items:
+        bloom_filter.add(item)
+    assert all(item in bloom_filter for item in items)
+    bloom_filter.clear()
+    assert not any(item in bloom_filter for item in items)
+
+
+def test_response_cache_returns_encoded_body_without_calling_view_again():
+    fake_app = flask.Flask("fake_app")
+    response_cache = ResponseCache(max_size=10, ttl=60)
+    calls = []
+
+    @fake_app.route("/items")
+    @response_cache.cached
+    def get_items():
+        calls.append(flask.request.args.get("page"))
+        return {"items": [1, 2, 3]}, 200
+
+    client = fake_app.test_client()
+    responses = [client.get("/items?page=1"), client.get("/items?page=1"), client.get("/items?page=2")]
+    assert [response.json for response in responses] == [{"items": [1, 2, 3]}] * 3
+    assert calls == ["1", "2"]
+    response_cache.clear()
+    client.get("/items?page=1")
+    assert calls == ["1", "2", "1"]
+
+
+def test_response_cache_compresses_cached_body_once_per_encoding(monkeypatch):
+    fake_app = flask.Flask("fake_app")
+    response_cache = ResponseCache(max_size=10, ttl=60)
+    compressed = []
+    original_compress = compression.compress
+    monkeypatch.setattr(
+        compression, "compress", lambda body, encoding: compressed.append(encoding) or original_compress(body, encoding)
+    )
+
+    @fake_app.route("/items")
+    @response_cache.cached
+    def get_items():
+        return {"items": ["test_description"] * 200}, 200
+
+    client = fake_app.test_client()
+    responses = [client.get("/items", headers={"Accept-Encoding": "gzip"}) for _ in range(2)]
+    plain_response = client.get("/items")
+    assert [response.headers["Content-Encoding"] for response in responses] == ["gzip", "gzip"]
+    assert json.loads(gzip.decompress(responses[1].data)) == plain_response.json
+    assert "Accept-Encoding" in plain_response.vary
+    assert "Content-Encoding" not in plain_response.headers
+    assert compressed == ["gzip"]
+
+
+@pytest.mark.parametrize(
+    "if_match,expected_version",
+    (
+            (None, None),
+            ("*", None),
+            ('"advertisement-5-v3"', 3),
+            ('"advertisement-5-v3-gzip"', 3),
+            ('"advertisement-50-v3"', 0),
+            ('"user-5-v3"', 0),
+    )
+)
+def test_get_if_match_version_returns_version_of_resource(if_match, expected_version):
+    headers = {"If-Match": if_match} if if_match else {}
+    with flask.Flask("fake_app").test_request_context("/", method="PATCH", headers=headers):
+        assert get_if_match_version(resource="advertisement", resource_id=5) == expected_version
@@ -0,0 +1,32 @@
+import csv
+import io
+import json
+
+from app.flask_entrypoints import exporting
+
+
+ROWS = [{"id": number, "title": f"title, {number}", "user_id": 1} for number in range(1, 6)]
+
+
+def consume_lazily(rows: list[dict], consumed: list[dict]):
+    for row in rows:
+        consumed.append(row)
+        yield row
+
+
+def test_encode_ndjson_yields_chunks_as_rows_come():
+    consumed = []
+    chunks = exporting.encode_ndjson(rows=consume_lazily(ROWS, consumed), chunk_size=1)
+    first_chunk: bytes = next(chunks)
+    assert len(consumed) == 1
+    lines = b"".join([first_chunk, *chunks]).splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+def test_encode_csv_writes_header_and_rows():
+    chunks = list(exporting.encode_csv(rows=iter(ROWS), columns=["id", "title", "user_id"], chunk_size=64))
+    assert len(chunks) > 1
+    reader = csv.DictReader(io.StringIO(b"".join(chunks).decode()))
+    assert [{key: row[key] for key in ("id", "title")} for row in reader] == [
+        {"id": str(row["id"]), "title": row["title"]} for row in ROWS
+    ]
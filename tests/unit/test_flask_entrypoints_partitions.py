@@ -0,0 +1,52 @@
+import contextlib
+import logging
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy
+
+import app.orm
+from app.flask_entrypoints import adv, partitions
+from app.orm import partitioning
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed: list[tuple[str, dict]] = []
+
+    def execute(self, statement, params=None):
+        self.executed.append((str(statement), params))
+
+
+@pytest.fixture
+def conn(monkeypatch) -> FakeConnection:
+    conn = FakeConnection()
+    monkeypatch.setattr(partitions, "_next_check_at", 0.0)
+    monkeypatch.setattr(app.orm, "engine", SimpleNamespace(begin=lambda: contextlib.nullcontext(conn)))
+    return conn
+
+
+def test_partition_check_creates_partitions_ahead_without_moving_rows(conn, monkeypatch):
+    calls: list[tuple[str, int]] = []
+    monkeypatch.setattr(partitioning, "create_partitions_ahead",
+                        lambda conn, months_ahead: calls.append(("create_partitions_ahead", months_ahead)) or [])
+    monkeypatch.setattr(partitioning, "split_default_partition",
+                        lambda conn: calls.append(("split_default_partition", 0)) or [])
+    partitions.ensure_partitions_if_due()
+    partitions.ensure_partitions_if_due()  # not due yet
+    assert calls == [("create_partitions_ahead", adv.config["ADV_PARTITION_MONTHS_AHEAD"])]
+    assert conn.executed == [
+        ("SELECT set_config('lock_timeout', :timeout, true)",
+         {"timeout": f"{adv.config['ADV_PARTITION_LOCK_TIMEOUT_MS']}ms"})
+    ]
+
+
+def test_partition_check_gives_up_on_lock_timeout_until_next_check(conn, monkeypatch, caplog):
+    def create_partitions_ahead(conn, months_ahead):
+        raise sqlalchemy.exc.OperationalError("CREATE TABLE", {}, SimpleNamespace(pgcode=partitions.LOCK_NOT_AVAILABLE))
+
+    monkeypatch.setattr(partitioning, "create_partitions_ahead", create_partitions_ahead)
+    with caplog.at_level(logging.INFO, logger="adv.partitions"):
+        partitions.ensure_partitions_if_due()
+    assert [record.levelno for record in caplog.records] == [logging.INFO]
+    assert partitions._next_check_at > 0
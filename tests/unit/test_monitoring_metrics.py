@@ -0,0 +1,47 @@
+import pytest
+
+from app.domain import errors
+from app.flask_entrypoints import adv
+from app.monitoring import metrics
+from app.monitoring.operations import operation
+
+
+@operation
+def fake_failing_operation():
+    raise errors.NotFoundError
+
+
+def get_operations_count(error: str) -> float:
+    return metrics.OPERATIONS.labels(operation="fake_failing_operation", error=error)._value.get()
+
+
+def test_operation_calls_are_counted_by_error_class():
+    count_before = get_operations_count(error="NotFoundError")
+    with pytest.raises(errors.NotFoundError):
+        fake_failing_operation()
+    assert get_operations_count(error="NotFoundError") == count_before + 1
+
+
+def test_get_metrics_exports_request_latency(test_client, monkeypatch):
+    monkeypatch.setitem(adv.config, "METRICS_TOKEN", "fake_token")
+    test_client.post("/login/", data="{}")
+    response = test_client.get("/metrics", headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert b'adv_http_request_duration_seconds_count{endpoint="login",method="POST",status="400"}' in response.data
+    assert b'endpoint="get_metrics"' not in response.data
+
+
+@pytest.mark.parametrize(
+    "token,headers,expected_status",
+    (
+        (None, {"Authorization": "Bearer fake_token"}, 404),
+        ("fake_token", {}, 401),
+        ("fake_token", {"Authorization": "Bearer wrong_token"}, 401),
+    )
+)
+def test_get_metrics_requires_configured_token(test_client, monkeypatch, token, headers, expected_status):
+    monkeypatch.setitem(adv.config, "METRICS_TOKEN", token)
+    response = test_client.get("/metrics", headers=headers)
+    assert response.status_code == expected_status
+    assert b"adv_http_request_duration_seconds" not in response.data
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from app.monitoring import profiling
+
+
+def fake_busy_func(seconds: float):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_stack_sampler_attributes_samples_to_root_and_functions():
+    sampler = profiling.StackSampler(
+        thread_id=threading.get_ident(), interval=0.001, max_duration=5, root="GET fake_view"
+    )
+    sampler.start()
+    fake_busy_func(seconds=0.05)
+    sampler.stop()
+    lines = sampler.folded().splitlines()
+    assert lines
+    assert all(line.startswith("GET fake_view;") for line in lines)
+    assert any(f"{__name__}:fake_busy_func" in line for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == sum(sampler.stacks.values())
+
+
+def test_profiling_budget_limits_concurrent_profiles_and_profiles_per_minute():
+    budget = profiling.ProfilingBudget(max_concurrent=1, max_per_minute=2)
+    assert budget.try_acquire() is True
+    assert budget.try_acquire() is False
+    budget.release()
+    assert budget.try_acquire() is True
+    budget.release()
+    assert budget.try_acquire() is False
+
+
+def test_write_profile_drops_profiles_over_max_files(tmp_path):
+    assert profiling.write_profile(directory=str(tmp_path), name="first", folded="a;b 1\n", max_files=1) == \
+           str(tmp_path / "first.folded")
+    assert (tmp_path / "first.folded").read_text() == "a;b 1\n"
+    assert profiling.write_profile(directory=str(tmp_path), name="second", folded="a;b 1\n", max_files=1) is None
+
+
+def test_request_with_profiling_token_is_profiled(test_client, tmp_path, monkeypatch):
+    from app.flask_entrypoints import adv
+    monkeypatch.setitem(adv.config, "PROFILING_ENABLED", True)
+    monkeypatch.setitem(adv.config, "PROFILING_TOKEN", "fake_token")
+    monkeypatch.setitem(adv.config, "PROFILING_DIR", str(tmp_path))
+    response = test_client.post("/login/", data="{}", headers={"X-Profile": "fake_token"})
+    not_profiled = test_client.post("/login/", data="{}", headers={"X-Profile": "wrong_token"})
+    assert (tmp_path / f'{response.headers["X-Profile-Id"]}.folded').exists()
+    assert "X-Profile-Id" not in not_profiled.headers
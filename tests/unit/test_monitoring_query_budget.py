@@ -0,0 +1,56 @@
+import pytest
+import sqlalchemy
+
+from app.monitoring import query_budget
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = sqlalchemy.create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_statement_shape_does_not_depend_on_whitespace_and_length_of_placeholder_lists():
+    assert query_budget.statement_shape("SELECT id\n  FROM adv WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == \
+           query_budget.statement_shape("SELECT id FROM adv WHERE id IN (%(id_1_1)s)") == \
+           "SELECT id FROM adv WHERE id IN (?)"
+
+
+def test_statements_and_round_trips_of_started_counting_are_recorded(sqlite_engine):
+    token = query_budget.start()
+    with sqlite_engine.connect() as conn:
+        for user_id in range(3):
+            conn.execute(sqlalchemy.text("SELECT :user_id"), {"user_id": user_id})
+        conn.commit()
+    queries = query_budget.finish(token)
+    assert queries.as_dict() == {"statements": 3, "round_trips": 4}
+    assert queries.repeated_shapes(threshold=3) == {"SELECT ?": 3}
+    assert queries.repeated_shapes(threshold=4) == {}
+
+
+def test_statements_are_not_recorded_when_counting_is_not_started(sqlite_engine):
+    with sqlite_engine.connect() as conn:
+        conn.execute(sqlalchemy.text("SELECT 1"))
+    token = query_budget.start()
+    assert query_budget.finish(token).as_dict() == {"statements": 0, "round_trips": 0}
+
+
+def test_check_budget_raises_when_budget_is_exceeded(sqlite_engine):
+    token = query_budget.start()
+    with sqlite_engine.connect() as conn:
+        conn.execute(sqlalchemy.text("SELECT 1"))
+        conn.execute(sqlalchemy.text("SELECT 2"))
+    queries = query_budget.finish(token)
+    query_budget.check_budget(queries=queries, budget=2, name="GET /fake/")
+    with pytest.raises(query_budget.QueryBudgetExceededError) as e:
+        query_budget.check_budget(queries=queries, budget=1, name="GET /fake/")
+    assert e.value.message == "GET /fake/ executed 2 SQL statements, the budget is 1."
+
+
+def test_session_settings_and_savepoints_are_counted_as_round_trips_only():
+    queries = query_budget.RequestQueries()
+    for statement in ("SET LOCAL statement_timeout = 100", "SAVEPOINT sa_savepoint_1", "SELECT 1",
+                      "RELEASE SAVEPOINT sa_savepoint_1", "ROLLBACK TO SAVEPOINT sa_savepoint_2"):
+        queries.add_statement(statement=statement, parameters={}, executemany=False)
+    assert queries.as_dict() == {"statements": 1, "round_trips": 5}
@@ -0,0 +1,85 @@
+import datetime
+import logging
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy
+
+from app.flask_entrypoints import adv
+from app.monitoring import slow_queries
+
+
+def test_redact_replaces_text_values_only():
+    parameters = {"title_1": "secret text", "id_1": 10, "creation_date_1": datetime.date(2024, 1, 2), "anon": None}
+    assert slow_queries.redact(parameters) == {
+        "title_1": "<redacted str, 11 chars>", "id_1": 10, "creation_date_1": "2024-01-02", "anon": None
+    }
+    assert slow_queries.redact(("text", 1)) == ["<redacted str, 4 chars>", 1]
+
+
+def test_statements_over_threshold_are_logged_with_redacted_parameters(monkeypatch, caplog):
+    engine = sqlalchemy.create_engine("sqlite://")
+    monkeypatch.setitem(adv.config, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+    with caplog.at_level(logging.WARNING, logger="adv.slow_queries"), engine.connect() as conn:
+        conn.execute(sqlalchemy.text("SELECT :value"), {"value": "secret text"})
+    record = caplog.records[-1]
+    assert record.statement == "SELECT ?"
+    assert record.parameters == ["<redacted str, 11 chars>"]
+    assert record.operation == "unknown"
+    assert record.plan is None
+    assert "secret text" not in record.getMessage()
+
+
+def test_statements_under_threshold_are_not_logged(monkeypatch, caplog):
+    engine = sqlalchemy.create_engine("sqlite://")
+    monkeypatch.setitem(adv.config, "SLOW_QUERY_THRESHOLD_MS", 60_000.0)
+    with caplog.at_level(logging.WARNING, logger="adv.slow_queries"), engine.connect() as conn:
+        conn.execute(sqlalchemy.text("SELECT 1"))
+    assert not caplog.records
+
+
+class FakeCursor:
+    def __init__(self, executed: list[str], fail_explain: bool):
+        self.executed = executed
+        self.fail_explain = fail_explain
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement.split(" (")[0])
+        if self.fail_explain and statement.startswith("EXPLAIN"):
+            raise RuntimeError("canceling statement due to statement timeout")
+
+    def fetchall(self):
+        return [("Seq Scan on adv",)]
+
+    def close(self):
+        pass
+
+
+def fake_connection(executed: list[str], fail_explain: bool = False):
+    cursor = FakeCursor(executed=executed, fail_explain=fail_explain)
+    return SimpleNamespace(
+        dialect=SimpleNamespace(name="postgresql"),
+        connection=SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=lambda: cursor))
+    )
+
+
+@pytest.mark.parametrize(
+    "fail_explain,expected_plan,expected_statements",
+    (
+        (False, "Seq Scan on adv", ["SAVEPOINT slow_query_explain", "EXPLAIN", "RELEASE SAVEPOINT slow_query_explain"]),
+        (True, "EXPLAIN failed: canceling statement due to statement timeout",
+         ["SAVEPOINT slow_query_explain", "EXPLAIN", "ROLLBACK TO SAVEPOINT slow_query_explain"]),
+    )
+)
+def test_explain_runs_in_savepoint(fail_explain, expected_plan, expected_statements):
+    executed: list[str] = []
+    conn = fake_connection(executed=executed, fail_explain=fail_explain)
+    assert slow_queries.explain(conn=conn, statement="SELECT * FROM adv", parameters={}) == expected_plan
+    assert executed == expected_statements
+
+
+def test_explain_skips_statements_other_than_selects():
+    executed: list[str] = []
+    conn = fake_connection(executed=executed)
+    assert slow_queries.explain(conn=conn, statement="UPDATE adv SET title = 'x'", parameters={}) is None
+    assert executed == []
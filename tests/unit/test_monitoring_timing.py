@@ -0,0 +1,44 @@
+from app.monitoring import timing
+from app.monitoring.operations import operation
+
+
+@timing.timed("fake_span")
+def fake_timed_func():
+    with timing.span("fake_nested_span"):
+        return "result"
+
+
+@operation
+def fake_operation():
+    return fake_timed_func()
+
+
+@operation
+def fake_batch_operation():
+    return [fake_operation(), fake_operation()]
+
+
+def test_spans_are_not_recorded_when_timing_is_not_started():
+    assert fake_operation() == "result"
+    assert timing.span("fake_span").__class__.__name__ == "nullcontext"
+
+
+def test_spans_and_operations_are_recorded_when_timing_is_started():
+    token = timing.start()
+    fake_operation()
+    fake_operation()
+    timings = timing.finish(token)
+    result = timings.as_dict()
+    assert {name: value["count"] for name, value in result.items()} == {
+        "fake_nested_span": 2, "fake_span": 2, "app_manager": 2, "total": 1
+    }
+    assert result["total"]["dur"] >= result["app_manager"]["dur"] >= result["fake_span"]["dur"]
+    assert timings.server_timing_header().startswith("fake_nested_span;dur=")
+
+
+def test_nested_operations_are_recorded_as_part_of_calling_operation():
+    token = timing.start()
+    fake_batch_operation()
+    result = timing.finish(token).as_dict()
+    assert result["app_manager"]["count"] == 1
+    assert result["fake_span"]["count"] == 2
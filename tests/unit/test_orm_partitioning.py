@@ -0,0 +1,23 @@
+from datetime import datetime
+
+import pytest
+
+from app.orm import partitioning
+
+
+@pytest.mark.parametrize(
+    "month,months,expected",
+    (
+        (datetime(2024, 1, 1), 1, datetime(2024, 2, 1)),
+        (datetime(2024, 11, 1), 3, datetime(2025, 2, 1)),
+        (datetime(2024, 1, 1), -1, datetime(2023, 12, 1)),
+    )
+)
+def test_add_months(month, months, expected):
+    assert partitioning.add_months(month, months) == expected
+
+
+def test_partition_name_and_month():
+    assert partitioning.partition_name(partitioning.month_start(datetime(2024, 3, 31, 23, 59))) == "adv_2024_03"
+    assert partitioning.partition_month("adv_2024_03") == datetime(2024, 3, 1)
+    assert partitioning.partition_month(partitioning.DEFAULT_PARTITION) is None
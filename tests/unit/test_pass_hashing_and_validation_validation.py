@@ -1,7 +1,9 @@
 import pytest
 
 import app.domain.errors
-from app.pass_hashing_and_validation.validation import validate_data, CreateAdv, CreateUser, Login
+from app.pass_hashing_and_validation.validation import (
+    validate_data, validate_ids, validate_batch, CreateAdv, CreateUser, EditAdv, Login
+)
 
 
 @pytest.mark.parametrize(
@@ -64,3 +66,60 @@ def test_validate_data_if_incorrect_data_is_provided(input_data, incorrect_field
 def test_validate_data_if_correct_data_is_provided(input_data, validation_model):
     result = validate_data(validation_model=validation_model, data=input_data)
     assert result == input_data
+
+
+@pytest.mark.parametrize(
+    "input_data, validation_model, expected_result",
+    (
+            (b'{"name": "test_name", "email": "test@email.com", "password": "test_pass"}', CreateUser,
+             {"name": "test_name", "email": "test@email.com", "password": "test_pass"}),
+            (b'{"title": "test_title", "description": "test_description", "user_id": 1}', CreateAdv,
+             {"title": "test_title", "description": "test_description"}),
+            ('{"title": "test_title"}', EditAdv, {"title": "test_title"}),
+    )
+)
+def test_validate_data_validates_raw_json(input_data, validation_model, expected_result):
+    assert validate_data(validation_model=validation_model, data=input_data) == expected_result
+
+
+def test_validate_data_raises_validation_error_when_raw_json_is_invalid():
+    with pytest.raises(app.domain.errors.ValidationError) as e:
+        validate_data(validation_model=Login, data=b'{"email": "test@email.com", ')
+    assert e.value.message[0]["type"] == "json_invalid"
+
+
+def test_validate_ids_returns_unique_ids_in_given_order():
+    assert validate_ids(ids="3,1,3,2", max_count=3) == [3, 1, 2]
+
+
+@pytest.mark.parametrize("ids", ("", "1,a", "0", "1,,2", "1,2,3,4"))
+def test_validate_ids_raises_validation_error_when_ids_are_invalid_or_too_many(ids):
+    with pytest.raises(app.domain.errors.ValidationError):
+        validate_ids(ids=ids, max_count=3)
+
+
+def test_validate_ids_rejects_too_many_ids_before_validating_them():
+    with pytest.raises(app.domain.errors.ValidationError) as e:
+        validate_ids(ids="a,b,c,d", max_count=3)
+    assert e.value.message == "At most 3 ids can be requested at once."
+
+
+def test_validate_batch_returns_operations():
+    batch = b'{"operations": [{"op": "create_adv", "params": {"title": "t"}}, {"op": "delete_adv", "adv_id": 1}]}'
+    assert validate_batch(batch=batch, max_count=2) == {
+        "operations": [{"op": "create_adv", "params": {"title": "t"}}, {"op": "delete_adv", "adv_id": 1}]
+    }
+
+
+@pytest.mark.parametrize(
+    "batch",
+    (
+            {"operations": []},
+            {"operations": [{"op": "update_adv", "params": {}}]},
+            {"operations": [{"op": "delete_user", "adv_id": 1}]},
+            {"operations": [{"op": "delete_adv", "adv_id": adv_id} for adv_id in (1, 2, 3)]},
+    )
+)
+def test_validate_batch_raises_validation_error_when_operations_are_invalid_or_too_many(batch):
+    with pytest.raises(app.domain.errors.ValidationError):
+        validate_batch(batch=batch, max_count=2)
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.orm import table_mapper
+from app.repository.filtering import Filter
+
+
+@pytest.mark.parametrize(
+    "comparison,expected",
+    (
+        ("is", "adv.creation_date >= '2024-03-31 00:00:00' AND adv.creation_date < '2024-04-01 00:00:00'"),
+        ("is_not", "adv.creation_date < '2024-03-31 00:00:00' OR adv.creation_date >= '2024-04-01 00:00:00'"),
+        ("<", "adv.creation_date < '2024-03-31 00:00:00'"),
+        ("<=", "adv.creation_date < '2024-04-01 00:00:00'"),
+        (">", "adv.creation_date >= '2024-04-01 00:00:00'"),
+        (">=", "adv.creation_date >= '2024-03-31 00:00:00'"),
+    )
+)
+def test_date_condition_compares_column_itself_with_day_range(comparison, expected):
+    condition = Filter._date_condition(
+        model_attr=table_mapper.adv_table.c.creation_date, column="creation_date", column_value="2024-03-31",
+        comparison=comparison
+    )
+    compiled = condition.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    assert str(compiled) == expected
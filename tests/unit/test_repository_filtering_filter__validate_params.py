@@ -39,7 +39,7 @@ def test_validate_params_raises_validation_error_when_all_params_are_invalid(dat
         "Valid values are: ['description', 'creation_date', 'user_id', 'name', 'email', 'id', 'title']"
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -199,7 +199,7 @@ def test_validate_params_raises_validation_error_when_comparison_is_invalid(mode
     assert set(e.value.message["invalid_params"].keys()) == {"comparison"}
     assert e.value.message["params_passed"] == data
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -222,7 +222,7 @@ def test_validate_params_raises_validation_error_when_comparison_and_column_are_
         f'For model class "{model_class.__name__}" valid values for "column" are: {columns}.'
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -239,7 +239,7 @@ def test_validate_params_raises_validation_error_when_filter_type_and_comparison
         "Valid values are: ['column_value', 'search_text']"
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -255,7 +255,7 @@ def test_validate_params_raises_validation_error_when_model_class_and_comparison
         "Valid values are: [<class 'app.models.User'>, <class 'app.models.Advertisement'>]"
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -275,7 +275,7 @@ def test_validate_params_raises_validation_error_when_model_class_filter_type_an
         "Valid values are: ['column_value', 'search_text']"
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -451,7 +451,7 @@ def test_validate_params_raises_validation_error_when_model_class_comparison_and
         "Valid values are: [<class 'app.models.User'>, <class 'app.models.Advertisement'>]"
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -486,7 +486,7 @@ def test_validate_params_raises_validation_error_when_filter_type_comparison_and
         "Valid values are: ['column_value', 'search_text']"
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
@@ -525,7 +525,62 @@ def test_validate_params_raises_validation_error_when_comparison_column_column_v
         f'For model class "{model_class.__name__}" valid values for "column" are: {columns}.'
     )
     assert set(e.value.message["invalid_params"]["comparison"]) == set(
-        "Valid values are: ['is', 'is_not', '<', '>', '>=', '<=']"
+        f"Valid values are: {ValidParams.COMPARISON.value}"
     )
 
 
+
+
+@pytest.mark.parametrize(
+    "model_class,comparison,column,column_value",
+    (
+            (Advertisement, "in", "user_id", "1,2,3"),
+            (Advertisement, "not_in", "id", [1, 2]),
+            (User, "in", "email", "a@email.com,b@email.com"),
+            (Advertisement, "between", "id", "1,10"),
+            (Advertisement, "between_half_open", "creation_date", "2024-01-01,2024-02-01"),
+            (User, "in", "creation_date", "2024-01-01, 2024-01-03"),
+    )
+)
+def test_validate_params_does_not_raise_error_when_set_or_range_values_are_correct(
+        model_class, comparison, column, column_value
+):
+    data = {"model_class": model_class, "filter_type": "column_value", "comparison": comparison, "column": column,
+            "column_value": column_value}
+    filter_instance = Filter("fake_session")
+    filter_instance._validate_params(data=data, params=Params)
+    assert filter_instance.params_info.invalid_params == {}
+
+
+@pytest.mark.parametrize(
+    "comparison,column,column_value,message",
+    (
+            ("in", "user_id", "1,,3", 'When "comparison" is "in", "column_value" must be a comma-separated list '
+                                      'of values.'),
+            ("in", "user_id", "1,a", 'When "column" is "user_id", "column_value" must be comma-separated digits.'),
+            ("between", "id", "1,2,3", 'When "comparison" is "between", "column_value" must be two comma-separated '
+                                       'values: the lower and the upper bound.'),
+            ("between_half_open", "id", "10,1", 'When "comparison" is "between_half_open", the lower bound in '
+                                                '"column_value" must not be greater than the upper one.'),
+            ("between", "creation_date", "2024-01-01,01/02/2024",
+             'When "column" is "creation_date", "column_value" must be comma-separated date strings of the '
+             'following format: "YYYY-MM-DD".'),
+    )
+)
+def test_validate_params_raises_validation_error_when_set_or_range_values_are_invalid(
+        comparison, column, column_value, message
+):
+    data = {"model_class": Advertisement, "filter_type": "column_value", "comparison": comparison, "column": column,
+            "column_value": column_value}
+    with pytest.raises(app.domain.errors.ValidationError) as e:
+        Filter("fake_session")._validate_params(data=data, params=Params)
+    assert e.value.message["invalid_params"] == {"column_value": message}
+
+
+@pytest.mark.parametrize("comparison", ("between", "between_half_open"))
+def test_validate_params_raises_validation_error_when_column_is_a_text_field_and_comparison_is_a_range(comparison):
+    data = {"model_class": Advertisement, "filter_type": "column_value", "comparison": comparison, "column": "title",
+            "column_value": "a,b"}
+    with pytest.raises(app.domain.errors.ValidationError) as e:
+        Filter("fake_session")._validate_params(data=data, params=Params)
+    assert set(e.value.message["invalid_params"].keys()) == {"comparison"}
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+import app.domain.errors
+from app.service_layer.admission import AdmissionController, Priority
+
+
+@pytest.fixture
+def admission_controller():
+    return AdmissionController(
+        route_limits={"fake_search": 1}, default_limit=2, max_in_flight=4, low_priority_share=0.5,
+        max_queue_times={Priority.LOW: 0.01, Priority.NORMAL: 0.01, Priority.HIGH: 0.01}, retry_after=3
+    )
+
+
+def test_requests_over_route_limit_are_shed(admission_controller):
+    admission_controller.admit(route="fake_search", priority=Priority.LOW)
+    with pytest.raises(app.domain.errors.OverloadedError) as e:
+        admission_controller.admit(route="fake_search", priority=Priority.LOW)
+    assert e.value.retry_after == 3
+    assert admission_controller.in_flight == 1
+    admission_controller.release(route="fake_search")
+    admission_controller.admit(route="fake_search", priority=Priority.LOW)
+
+
+def test_low_priority_requests_are_shed_first(admission_controller):
+    admission_controller.admit(route="fake_view_1", priority=Priority.HIGH)
+    admission_controller.admit(route="fake_view_2", priority=Priority.NORMAL)
+    with pytest.raises(app.domain.errors.OverloadedError):
+        admission_controller.admit(route="fake_view_3", priority=Priority.LOW)
+    admission_controller.admit(route="fake_view_3", priority=Priority.HIGH)
+    admission_controller.admit(route="fake_view_3", priority=Priority.HIGH)
+    with pytest.raises(app.domain.errors.OverloadedError):
+        admission_controller.admit(route="fake_view_4", priority=Priority.HIGH)
+
+
+def test_requests_queued_upstream_for_longer_than_queue_time_are_shed(admission_controller):
+    with pytest.raises(app.domain.errors.OverloadedError):
+        admission_controller.admit(route="fake_view", priority=Priority.HIGH, queued_for=0.02)
+    assert admission_controller.in_flight == 0
+
+
+def test_request_queued_upstream_for_too_long_gets_503(test_client):
+    response = test_client.post(
+        "/login/", data="{}", headers={"X-Request-Start": f"t={int((time.time() - 60) * 1000)}"}
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert test_client.post("/login/", data="{}").status_code == 400
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+import sqlalchemy
+
+import app.domain.errors
+from app.service_layer import deadlines
+from app.service_layer.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def sqlite_session_maker():
+    engine = sqlalchemy.create_engine("sqlite://")
+    yield sqlalchemy.orm.sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_remaining_is_none_when_deadline_is_not_set():
+    assert deadlines.remaining() is None
+    deadlines.check_deadline()
+
+
+def test_check_deadline_raises_deadline_exceeded_error_when_deadline_has_passed():
+    token = deadlines.set_deadline(timeout=0.001)
+    try:
+        time.sleep(0.002)
+        with pytest.raises(app.domain.errors.DeadlineExceededError):
+            deadlines.check_deadline()
+    finally:
+        deadlines.reset_deadline(token)
+    assert deadlines.remaining() is None
+
+
+def test_unit_of_work_is_not_started_when_deadline_has_passed(sqlite_session_maker):
+    uow = UnitOfWork()
+    uow.session_maker = sqlite_session_maker
+    token = deadlines.set_deadline(timeout=-1)
+    try:
+        with pytest.raises(app.domain.errors.DeadlineExceededError):
+            with uow:
+                pass
+    finally:
+        deadlines.reset_deadline(token)
+
+
+def test_unit_of_work_runs_statements_before_deadline(sqlite_session_maker):
+    uow = UnitOfWork()
+    uow.session_maker = sqlite_session_maker
+    token = deadlines.set_deadline(timeout=10)
+    try:
+        with uow:
+            assert uow.session.execute(sqlalchemy.text("SELECT 1")).scalar() == 1
+    finally:
+        deadlines.reset_deadline(token)
+
+
+def test_request_past_deadline_gets_504(test_client, monkeypatch):
+    from app.flask_entrypoints import adv
+    monkeypatch.setitem(adv.config["REQUEST_DEADLINES"], "login", -1)
+    response = test_client.post("/login/", json={"email": "user@email.com", "password": "password"})
+    assert response.status_code == 504
+    assert response.json == {"errors": app.domain.errors.DeadlineExceededError().message}
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy
+
+import app.domain.errors
+from app.domain import models
+from app.orm import table_mapper
+from app.repository.repository import IdempotencyKeyRepository
+from app.service_layer import idempotency
+from app.service_layer.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def uow():
+    engine = sqlalchemy.create_engine("sqlite://", poolclass=sqlalchemy.pool.StaticPool)
+    table_mapper.start_mapping()
+    table_mapper.idempotency_key_table.create(bind=engine)
+    uow = UnitOfWork()
+    uow.session_maker = sqlalchemy.orm.sessionmaker(bind=engine)
+    yield uow
+    engine.dispose()
+
+
+@pytest.fixture
+def now():
+    return datetime(2024, 1, 1)
+
+
+def test_completed_request_is_replayed(uow, now):
+    assert idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now) is None
+    idempotency.save_response(key="k", status_code=201, response=b'{"id": 1}', ttl=3600, uow=uow, now=now)
+    record = idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    assert (record.status_code, record.response) == (201, b'{"id": 1}')
+
+
+def test_key_of_request_in_progress_or_of_another_request_is_rejected(uow, now):
+    idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    with pytest.raises(app.domain.errors.RequestInProgressError):
+        idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    with pytest.raises(app.domain.errors.IdempotencyKeyMismatchError):
+        idempotency.claim_key(key="k", request_hash="other", lock_timeout=60, uow=uow, now=now)
+
+
+@pytest.mark.parametrize("completed", (True, False))
+def test_expired_key_can_be_claimed_again(uow, now, completed):
+    idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    if completed:
+        idempotency.save_response(key="k", status_code=201, response=b"{}", ttl=3600, uow=uow, now=now)
+    later = now + timedelta(seconds=3601)
+    assert idempotency.claim_key(key="k", request_hash="other", lock_timeout=60, uow=uow, now=later) is None
+
+
+def test_expired_key_reclaimed_by_concurrent_request_is_in_progress(uow, now, monkeypatch):
+    idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    later = now + timedelta(seconds=61)
+    assert idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=later) is None
+    # The record read before the concurrent request reclaimed the key.
+    stale_record = models.IdempotencyRecord(key="k", request_hash="h", expires_at=now + timedelta(seconds=60))
+    monkeypatch.setattr(IdempotencyKeyRepository, "get", lambda self, key: stale_record)
+    with pytest.raises(app.domain.errors.RequestInProgressError):
+        idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=later)
+
+
+def test_response_is_committed_with_changes_flushed_in_savepoint(uow, now):
+    uow.scoped = True
+    idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    with uow.savepoint():
+        uow.idempotency_keys.add(models.IdempotencyRecord(key="made_by_view", request_hash="h", expires_at=now))
+        uow.commit()
+    idempotency.save_response(key="k", status_code=201, response=b"{}", ttl=3600, uow=uow, now=now)
+    uow.close()
+    with uow:
+        assert uow.idempotency_keys.get("made_by_view") is not None
+        assert uow.idempotency_keys.get("k").status_code == 201
+
+
+def test_released_key_can_be_claimed_again(uow, now):
+    idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    idempotency.release_key(key="k", uow=uow)
+    assert idempotency.claim_key(key="k", request_hash="h", lock_timeout=60, uow=uow, now=now) is None
+
+
+def test_sweep_deletes_expired_keys_in_batches(uow, now):
+    for number in range(5):
+        idempotency.claim_key(key=f"expired_{number}", request_hash="h", lock_timeout=60, uow=uow, now=now)
+    idempotency.claim_key(key="live", request_hash="h", lock_timeout=600, uow=uow, now=now)
+    later = now + timedelta(seconds=61)
+    assert idempotency.sweep_expired(uow=uow, batch_size=2, max_batches=2, now=later) == 4
+    assert idempotency.sweep_expired(uow=uow, batch_size=2, max_batches=2, now=later) == 1
+    with pytest.raises(app.domain.errors.RequestInProgressError):
+        idempotency.claim_key(key="live", request_hash="h", lock_timeout=60, uow=uow, now=later)
@@ -0,0 +1,68 @@
+import pytest
+
+import app.domain.errors
+from app.service_layer import throttling
+
+
+@pytest.mark.parametrize("store_class", (throttling.LocalThrottleStore, throttling.SharedMemoryThrottleStore))
+def test_hit_counts_attempts_within_one_window(store_class):
+    store = store_class()
+    results = [store.hit(key="email:test@email.test", window=60, now=120.0) for _ in range(3)]
+    assert results == [1, 2, 3]
+
+
+@pytest.mark.parametrize("store_class", (throttling.LocalThrottleStore, throttling.SharedMemoryThrottleStore))
+def test_hit_weights_previous_window_by_its_remaining_share(store_class):
+    store = store_class()
+    for _ in range(4):
+        store.hit(key="ip:127.0.0.1", window=60, now=61.0)
+    assert store.hit(key="ip:127.0.0.1", window=60, now=135.0) == 4 * 0.75 + 1
+
+
+@pytest.mark.parametrize("store_class", (throttling.LocalThrottleStore, throttling.SharedMemoryThrottleStore))
+def test_hit_forgets_attempts_older_than_previous_window(store_class):
+    store = store_class()
+    for _ in range(4):
+        store.hit(key="ip:127.0.0.1", window=60, now=1.0)
+    assert store.hit(key="ip:127.0.0.1", window=60, now=181.0) == 1
+
+
+@pytest.mark.parametrize("store_class", (throttling.LocalThrottleStore, throttling.SharedMemoryThrottleStore))
+def test_count_does_not_register_attempt(store_class):
+    store = store_class()
+    assert store.count(key="ip:127.0.0.1", window=60, now=61.0) == 0
+    for _ in range(4):
+        store.hit(key="ip:127.0.0.1", window=60, now=61.0)
+    assert store.count(key="ip:127.0.0.1", window=60, now=62.0) == 4
+    assert store.count(key="ip:127.0.0.1", window=60, now=135.0) == 4 * 0.75
+    assert store.hit(key="ip:127.0.0.1", window=60, now=135.0) == 4 * 0.75 + 1
+
+
+def test_login_throttle_raises_too_many_requests_error_when_email_limit_is_exceeded():
+    login_throttle = throttling.LoginThrottle(
+        store=throttling.LocalThrottleStore(), email_limit=2, ip_limit=100, window=60
+    )
+    login_throttle.register_failure(email="test@email.test", client_ip="127.0.0.1")
+    login_throttle.check(email="TEST@email.test", client_ip="127.0.0.2")
+    login_throttle.register_failure(email="TEST@email.test", client_ip="127.0.0.2")
+    with pytest.raises(app.domain.errors.TooManyRequestsError) as e:
+        login_throttle.check(email="test@email.test", client_ip="127.0.0.3")
+    assert 1 <= e.value.retry_after <= 60
+
+
+def test_login_throttle_raises_too_many_requests_error_when_ip_limit_is_exceeded():
+    login_throttle = throttling.LoginThrottle(
+        store=throttling.LocalThrottleStore(), email_limit=100, ip_limit=2, window=60
+    )
+    login_throttle.register_failure(email="test_1@email.test", client_ip="127.0.0.1")
+    login_throttle.register_failure(email="test_2@email.test", client_ip="127.0.0.1")
+    with pytest.raises(app.domain.errors.TooManyRequestsError):
+        login_throttle.check(email="test_3@email.test", client_ip="127.0.0.1")
+
+
+def test_login_throttle_does_not_count_checked_attempts():
+    login_throttle = throttling.LoginThrottle(
+        store=throttling.LocalThrottleStore(), email_limit=1, ip_limit=1, window=60
+    )
+    for _ in range(3):
+        login_throttle.check(email="test@email.test", client_ip="127.0.0.1")
@@ -0,0 +1,110 @@
+import pytest
+import sqlalchemy
+
+import app.domain.errors
+from app.domain import services
+from app.domain.models import User
+from app.orm import table_mapper
+from app.service_layer.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = sqlalchemy.create_engine("sqlite://", poolclass=sqlalchemy.pool.StaticPool)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE fake (id INTEGER PRIMARY KEY)"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def commits(sqlite_engine):
+    commits = []
+    sqlalchemy.event.listen(sqlite_engine, "commit", lambda conn: commits.append(conn))
+    return commits
+
+
+def create_uow(engine, scoped: bool = False) -> UnitOfWork:
+    uow = UnitOfWork(scoped=scoped)
+    uow.session_maker = sqlalchemy.orm.sessionmaker(bind=engine)
+    return uow
+
+
+def test_connection_is_checked_out_on_first_statement_only(sqlite_engine):
+    checkouts = []
+    sqlalchemy.event.listen(sqlite_engine, "checkout", lambda *args: checkouts.append(args))
+    uow = create_uow(sqlite_engine)
+    with uow:
+        assert checkouts == []
+        uow.session.scalar(sqlalchemy.select(sqlalchemy.literal(1)))
+        assert len(checkouts) == 1
+    assert uow.session is None
+
+
+def test_scoped_unit_of_work_shares_session_between_blocks_until_closed(sqlite_engine):
+    uow = create_uow(sqlite_engine, scoped=True)
+    with uow:
+        session = uow.session
+        with uow:
+            assert uow.session is session
+    with uow:
+        assert uow.session is session
+    uow.close()
+    assert uow.session is None
+
+
+def test_commit_is_skipped_for_read_only_work(sqlite_engine, commits):
+    uow = create_uow(sqlite_engine)
+    with uow:
+        uow.session.scalar(sqlalchemy.select(sqlalchemy.literal(1)))
+        uow.commit()
+    assert commits == []
+
+
+def test_writes_are_committed(sqlite_engine, commits):
+    uow = create_uow(sqlite_engine, scoped=True)
+    with uow:
+        uow.session.execute(sqlalchemy.text("INSERT INTO fake (id) VALUES (1)"))
+        uow.commit()
+    uow.close()
+    assert len(commits) == 1
+    with sqlite_engine.connect() as conn:
+        assert conn.scalar(sqlalchemy.text("SELECT count(*) FROM fake")) == 1
+
+
+def test_failed_savepoint_is_rolled_back_alone_and_the_rest_is_committed_once(sqlite_engine, commits):
+    uow = create_uow(sqlite_engine)
+    with uow:
+        with uow.savepoint():
+            uow.session.execute(sqlalchemy.text("INSERT INTO fake (id) VALUES (1)"))
+            uow.commit()
+        with pytest.raises(ValueError):
+            with uow.savepoint():
+                with uow:
+                    uow.session.execute(sqlalchemy.text("INSERT INTO fake (id) VALUES (2)"))
+                    raise ValueError
+        assert commits == []
+        uow.commit()
+    assert len(commits) == 1
+    with sqlite_engine.connect() as conn:
+        assert conn.scalars(sqlalchemy.text("SELECT id FROM fake")).all() == [1]
+
+
+def test_update_of_row_changed_by_concurrent_transaction_raises_conflict_error(sqlite_engine):
+    table_mapper.start_mapping()
+    table_mapper.user_table.create(bind=sqlite_engine)
+    with create_uow(sqlite_engine) as uow:
+        uow.users.add(User(name="name", email="email", password="password"))
+        uow.commit()
+    first_uow, second_uow = create_uow(sqlite_engine, scoped=True), create_uow(sqlite_engine, scoped=True)
+    with first_uow, second_uow:
+        first_user, second_user = first_uow.users.get(1), second_uow.users.get(1)
+        services.update_instance(instance=first_user, new_attrs={"name": "first"})
+        first_uow.commit()
+        services.update_instance(instance=second_user, new_attrs={"name": "second"})
+        with pytest.raises(app.domain.errors.ConflictError):
+            second_uow.commit()
+    first_uow.close()
+    second_uow.close()
+    with sqlite_engine.connect() as conn:
+        assert conn.execute(sqlalchemy.text('SELECT name, version FROM "user"')).one() == ("first", 2)